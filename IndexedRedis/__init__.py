@@ -6,18 +6,23 @@
 
 # vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
 
+import binascii
 import copy
 import codecs
+import os
 import pprint
 import random
 import redis
 import sys
+import threading
 import uuid
+import weakref
 
 from collections import defaultdict, OrderedDict
 
 from . import fields
-from .fields import IRField, IRFieldChain, IRClassicField, IRNullType, irNull, IR_NULL_STR, IRForeignLinkFieldBase
+from .fields import IRField, IRFieldChain, IRClassicField, IRNullType, irNull, isIrNull, IR_NULL_STR, IRForeignLinkFieldBase, getIndexHashRaw
+from .fields.foreign import ForeignLinkDataBase, ForeignLinkMultiData, isSameForeignLink, linkSiblings
 from .compat_str import to_unicode, tobytes, setDefaultIREncoding, getDefaultIREncoding
 from .utils import hashDictOneLevel, KeyList
 
@@ -31,7 +36,7 @@ from .deprecated import deprecated, toggleDeprecatedMessages, deprecatedMessage
 __all__ = ('INDEXED_REDIS_PREFIX', 'INDEXED_REDIS_VERSION', 'INDEXED_REDIS_VERSION_STR', 
 	'IndexedRedisDelete', 'IndexedRedisHelper', 'IndexedRedisModel', 'IndexedRedisQuery', 'IndexedRedisSave',
 	'isIndexedRedisModel', 'setIndexedRedisEncoding', 'getIndexedRedisEncoding', 'InvalidModelException',
-	'fields', 'IRField', 'IRFieldChain', 'IRForeignLinkFieldBase', 'irNull',
+	'fields', 'IRField', 'IRFieldChain', 'IRForeignLinkFieldBase', 'irNull', 'isIrNull',
 	'setDefaultIREncoding', 'getDefaultIREncoding',
 	'setDefaultRedisConnectionParams', 'getDefaultRedisConnectionParams',
 	'toggleDeprecatedMessages',
@@ -63,6 +68,78 @@ RedisPools = {}
 global _redisManagedConnectionParams
 _redisManagedConnectionParams = {}
 
+# _DESTROY_KEYS_SCRIPT - Lua script which deletes, on the server, every key matching the pattern KEYS[1], returning the number of keys deleted.
+#   Keys are deleted in batches of 1000 per DEL (under Lua's unpack limit), rather than one DEL per key.
+#   The pattern is passed as a key rather than formatted into the script, so the script body (and thus its sha) is the same for every model.
+_DESTROY_KEYS_SCRIPT = """
+local matchingKeys = redis.call('KEYS', KEYS[1])
+
+for i = 1, #matchingKeys, 1000 do
+	redis.call('DEL', unpack(matchingKeys, i, math.min(i + 999, #matchingKeys)))
+end
+
+return #matchingKeys
+"""
+
+# _hsetTakesMapping - If redis-py's hset takes a "mapping" of several fields (redis-py 3.5+), which replaces the deprecated hmset
+_hsetTakesMapping = bool('mapping' in redis.Redis.hset.__code__.co_varnames)
+
+def _setHashFields(pipeline, key, fieldValues):
+	'''
+		_setHashFields - Set several fields on a hash with a single command,
+		  HSET with a mapping, or HMSET on older redis-py. Internal.
+
+		@param pipeline - Connection or pipeline to send (or queue) the command on
+		@param key <str> - Key of the hash
+		@param fieldValues <dict> - Map of field name -> value
+	'''
+	if _hsetTakesMapping:
+		pipeline.hset(key, mapping=fieldValues)
+	else:
+		pipeline.hmset(key, fieldValues)
+
+# _IR_VERSION_FIELD - Hidden field in the hash of each object of a model with VERSIONED_RELOAD, holding a random token which is replaced
+#   whenever the object is saved with changes. reload compares it on the server to skip refetching an object which has not changed since it was fetched or saved.
+_IR_VERSION_FIELD = '_ir_ver'
+
+def _newObjVersion():
+	'''
+		_newObjVersion - Generate a new version token for a saved object.
+		  Random rather than a counter, so forked processes or other clients will not repeat each other. Internal.
+
+		@return <str>
+	'''
+	return to_unicode(binascii.hexlify(os.urandom(8)))
+
+# _RELOAD_SCRIPT - Lua script which returns 0 if the hash KEYS[1] still has the version token ARGV[2] in field ARGV[1],
+#   otherwise the result of HGETALL on that hash (empty if it does not exist).
+_RELOAD_SCRIPT = """
+if redis.call('HGET', KEYS[1], ARGV[1]) == ARGV[2] then
+	return 0
+end
+
+return redis.call('HGETALL', KEYS[1])
+"""
+
+# _registeredScripts - Map of Lua script source -> registered (sha-cached) redis Script object. @see _getRegisteredScript
+_registeredScripts = {}
+
+def _getRegisteredScript(conn, script):
+	'''
+		_getRegisteredScript - Get a registered Lua script. Calling it runs EVALSHA,
+		  falling back to loading the script if the server does not have it cached.
+
+		@param conn - A redis connection, used to register the script the first time
+		@param script <str> - The Lua source, like _DESTROY_KEYS_SCRIPT
+
+		@return <redis.client.Script>
+	'''
+	try:
+		return _registeredScripts[script]
+	except KeyError:
+		registeredScript = _registeredScripts[script] = conn.register_script(script)
+		return registeredScript
+
 def setDefaultRedisConnectionParams( connectionParams ):
 	'''
 		setDefaultRedisConnectionParams - Sets the default parameters used when connecting to Redis.
@@ -228,7 +305,14 @@ def getRedisPool(params):
 			params['connection_pool'] = RedisPools[hashValue]
 			return RedisPools[hashValue]
 
-	connectionPool = redis.ConnectionPool(**params)
+	# Cap the pool at REDIS_DEFAULT_POOL_MAX_SIZE connections, unless "max_connections" is explicitly given.
+	#   The default cap blocks waiting for a free connection once all are in use (rather than raising, as a
+	#   plain ConnectionPool does), so more concurrent users than that just wait their turn.
+	if 'max_connections' not in params:
+		connectionPool = redis.BlockingConnectionPool(max_connections=REDIS_DEFAULT_POOL_MAX_SIZE, **params)
+	else:
+		connectionPool = redis.ConnectionPool(**params)
+
 	origParams['connection_pool'] = params['connection_pool'] = connectionPool
 	RedisPools[hashValue] = connectionPool
 
@@ -269,6 +353,55 @@ decodeDict = lambda origDict : {to_unicode(key) : origDict[key] for key in origD
 global validatedModels
 validatedModels = set()
 
+# _modelGenerations - Count of writes (saves, deletes, reindexes) through this process, by KEY_NAME.
+#   Used to invalidate the results cached by IndexedRedisQuery.allCached / firstCached
+_modelGenerations = defaultdict(int)
+
+# _queryResultsCache - Results cached by IndexedRedisQuery.allCached / firstCached, least recently used first.
+#   Maps (connection pool, KEY_NAME, filter index keys, not-filter index keys) -> (generation, list<dict> of raw hashes with "_id", ordered by pk)
+_queryResultsCache = OrderedDict()
+
+# _QUERY_RESULTS_CACHE_SIZE - Most distinct queries to keep in the allCached / firstCached cache.
+#   When more are cached, the least recently used are dropped.
+_QUERY_RESULTS_CACHE_SIZE = 128
+
+# _queuedWriteModels - KEY_NAMEs of models with saves or deletes queued on a caller's pipeline, which may not have been executed yet.
+#   allCached / firstCached do not use or store cached results for these, until IndexedRedisQuery.clearCached is called.
+_queuedWriteModels = set()
+
+# _queryResultsCacheLock - Held while reading or changing _queryResultsCache, _modelGenerations, or _queuedWriteModels
+_queryResultsCacheLock = threading.Lock()
+
+def _bumpModelGeneration(keyName):
+	'''
+		_bumpModelGeneration - Mark that objects of the model with KEY_NAME #keyName have been written,
+		  invalidating any cached query results for it. Internal.
+	'''
+	with _queryResultsCacheLock:
+		_modelGenerations[keyName] += 1
+
+def _markQueuedWrite(keyName):
+	'''
+		_markQueuedWrite - Mark that saves or deletes of the model with KEY_NAME #keyName were queued on a caller's pipeline. Internal.
+
+		  IndexedRedis cannot know when the caller executes it, so cached query results are not used for this model
+		    until IndexedRedisQuery.clearCached is called on it.
+	'''
+	with _queryResultsCacheLock:
+		_modelGenerations[keyName] += 1
+		_queuedWriteModels.add(keyName)
+
+def _getLoadedInstance(identityMap, pk):
+	'''
+		_getLoadedInstance - Get the instance loaded for #pk from a model's identity map (@see IndexedRedisModel.IDENTITY_MAP). Internal.
+
+		@return <IndexedRedisModel/None> - The loaded instance, or None if there is none (or #pk is not a valid pk, like None)
+	'''
+	try:
+		return identityMap.get(int(pk))
+	except (TypeError, ValueError):
+		return None
+
 def isIndexedRedisModel(model):
 	return hasattr(model, '_is_ir_model')
 
@@ -343,9 +476,56 @@ class IndexedRedisModel(object):
 	'''
 	REDIS_CONNECTION_PARAMS = {}
 
+	'''
+		IDENTITY_MAP - Default False. If True, fetching by pk (get, getMultiple, all, first, and foreign links) returns the
+			instance already loaded in this process for that pk, if one is still alive, without fetching it again.
+			So every loaded object of a pk is the same instance, including any unsaved changes on it.
+			Saved objects are remembered, and deleted ones forgotten.
+
+			NOTE: Writes from other processes (or directly to Redis) are NOT seen on an instance which is still alive.
+			  Use #reload to refresh one.
+	'''
+	IDENTITY_MAP = False
+
+	'''
+		VERSIONED_RELOAD - Default False. If True, #reload of an object with no unsaved changes (and, with cascadeObjects,
+			no fetched foreign links) first checks the version token stored in its hash, and only refetches it if that changed.
+			This makes reloading an unchanged object about 1.7x faster.
+
+			The token is stored in a hidden "_ir_ver" field, which is only written while this is set.
+
+			NOTE: Only saves through this version of IndexedRedis (or later) with this set change the version token. Changes made any other way
+			  (older IndexedRedis, saves while this was not set, HSET directly, other tools) are NOT seen by reload with this enabled.
+	'''
+	VERSIONED_RELOAD = False
+
+	'''
+		SIBLING_FETCH_SIZE - Default 100. When objects of this model are fetched together (like by all), accessing a foreign link
+			on one of them fetches that link on up to this many of them (in order) in one round trip, rather than one round trip each.
+			Until one of them is accessed, the objects in each group reference each other.
+
+			Set to 0 to fetch each link on its own, only when accessed.
+	'''
+	SIBLING_FETCH_SIZE = 100
+
 	# Internal property to check inheritance
 	_is_ir_model = True
 
+	# Internal - names of the foreign link fields in FIELDS, set by validateModel
+	_foreignFieldNames = frozenset()
+
+	# Internal - names (as plain str) of the fields in FIELDS, in order, set by validateModel
+	_fieldNames = ()
+
+	# Internal - if IDENTITY_MAP, map of pk -> loaded instance (weak values), set by validateModel. Otherwise None
+	_identityMap = None
+
+	# Internal - names of the fields in FIELDS which are not foreign links, in order, set by validateModel
+	_plainFieldNames = ()
+
+	# Internal - version token of the stored hash this object was last fetched from or saved as, or None if unknown. @see reload
+	_irVer = None
+
 	def __init__(self, *args, **kwargs):
 		'''
 			__init__ - Set the values on this object. MAKE SURE YOU CALL THE SUPER HERE, or else things will not work.
@@ -355,11 +535,17 @@ class IndexedRedisModel(object):
 		osetattr = object.__setattr__
 		ogetattr = object.__getattribute__
 
-		osetattr(self, '_origData', {})
+		# Framework code on models reads attributes with object.__getattribute__ (or keeps a local, like here),
+		#   as our __getattribute__ runs Python code on every access.
+		origData = {}
+		osetattr(self, '_origData', origData)
 
 		# Figure out if we are getting data straight from Redis, or from direct input
 		#  and select the appropriate conversion function
-		if kwargs.get('__fromRedis', False) is True:
+		if kwargs.get('__fromRedisConverted', False) is True:
+			# Already converted from storage, like through IndexedRedisQuery._redisResultsToObjs
+			convertFunctionName = None
+		elif kwargs.get('__fromRedis', False) is True:
 			convertFunctionName = 'fromStorage'
 		else:
 			convertFunctionName = 'fromInput'
@@ -373,7 +559,8 @@ class IndexedRedisModel(object):
 				val = thisField.getDefaultValue()
 			else:
 				val = kwargs[thisField]
-				val = getattr(thisField, convertFunctionName) ( val )
+				if convertFunctionName is not None:
+					val = getattr(thisField, convertFunctionName) ( val )
 
 
 			osetattr(self, thisField, val)
@@ -382,11 +569,11 @@ class IndexedRedisModel(object):
 			try:
 				# If we can deepcopy, do it (i.e. a json with a dict and a list
 				#  as a value )
-				self._origData[thisField] = copy.deepcopy(val)
+				origData[thisField] = copy.deepcopy(val)
 			except:
 				try:
 					# If that fails, try a regular copy
-					self._origData[thisField] = copy.copy(val)
+					origData[thisField] = copy.copy(val)
 				except:
 					# Welp, we tried. There's no way to copy this data,
 					#  so it's not json and odds are you can't pickle it..
@@ -401,13 +588,18 @@ class IndexedRedisModel(object):
 
 					# Go ahead and set it for them and hope for the best.
 					#  Probably won't be an issue.. probably.
-					self._origData[thisField] = val
+					origData[thisField] = val
 				
 
 		_id = kwargs.get('_id', None)
 		if _id:
 			_id = int(_id)
-		object.__setattr__(self, '_id', _id)
+		osetattr(self, '_id', _id)
+
+		if self.__class__.VERSIONED_RELOAD:
+			_irVer = kwargs.get(_IR_VERSION_FIELD, None)
+			if _irVer is not None:
+				osetattr(self, '_irVer', to_unicode(_irVer))
 
 
 	def __setattr__(self, keyName, value):
@@ -429,7 +621,18 @@ class IndexedRedisModel(object):
 				idx = -1
 
 			if idx != -1:
-				value = fields[idx].fromInput(value)
+				thisField = fields[idx]
+				if keyName in oga(self, '_foreignFieldNames'):
+					try:
+						currentValue = oga(self, keyName)
+					except AttributeError:
+						# Not set yet, like from __setstate__
+						value = thisField.fromInput(value)
+					else:
+						# Keep the current link (and any fetched object) if linking to the same thing
+						value = thisField.fromInputKeepLink(value, currentValue)
+				else:
+					value = thisField.fromInput(value)
 
 		object.__setattr__(self, keyName, value)
 	
@@ -446,21 +649,12 @@ class IndexedRedisModel(object):
 
 		val = oga(self, keyName)
 
-		fields = oga(self, 'FIELDS')
-
-		if keyName not in fields:
-			return val
-
-		if not isinstance( fields, KeyList):
-			fields = KeyList(fields)
-			object.__setattr__(self, 'FIELDS', fields)
-
-		thisField = fields[keyName]
-
-		if not issubclass(thisField.__class__, IRForeignLinkFieldBase):
+		# Only foreign link fields need unwrapping. Check the set of their names (built in validateModel)
+		#   rather than searching FIELDS, as this runs on every attribute access.
+		if keyName not in oga(self, '_foreignFieldNames'):
 			return val
 
-		if val in (None, irNull):
+		if val is None or isIrNull(val):
 			return irNull
 
 		if isIdKey:
@@ -483,21 +677,24 @@ class IndexedRedisModel(object):
 
 			@return - Dictionary reprensetation of this object and all fields
 		'''
-		ret = {}
-		for thisField in self.FIELDS:
-			val = object.__getattribute__(self, thisField)
+		oga = object.__getattribute__
 
-			if forStorage is True:
-				val = thisField.toStorage(val)
+		fields = oga(self, 'FIELDS')
 
-			if strKeys:
-				ret[str(thisField)] = val
+		# Field values are read straight from __dict__, so foreign links are never fetched here
+		selfDict = oga(self, '__dict__')
+		if strKeys:
+			if forStorage is True:
+				ret = { fieldName : thisField.toStorage(selfDict[thisField]) for thisField, fieldName in zip(fields, oga(self, '_fieldNames')) }
 			else:
-				ret[thisField] = val
-
+				ret = { fieldName : selfDict[fieldName] for fieldName in oga(self, '_fieldNames') }
+		elif forStorage is True:
+			ret = { thisField : thisField.toStorage(selfDict[thisField]) for thisField in fields }
+		else:
+			ret = { thisField : selfDict[thisField] for thisField in fields }
 
 		if includeMeta is True:
-			ret['_id'] = getattr(self, '_id', None)
+			ret['_id'] = oga(self, '_id')
 		return ret
 
 	toDict = asDict
@@ -521,12 +718,15 @@ class IndexedRedisModel(object):
 
 			@return <bool> - True if any fields have changed since last fetch, or if never saved. Otherwise, False
 		'''
-		if not self._id or not self._origData:
+		oga = object.__getattribute__
+
+		origData = oga(self, '_origData')
+		if not oga(self, '_id') or not origData:
 			return True
 
-		for thisField in self.FIELDS:
-			thisVal = object.__getattribute__(self, thisField)
-			if self._origData.get(thisField, '') != thisVal:
+		for thisField in oga(self, 'FIELDS'):
+			thisVal = oga(self, thisField)
+			if origData.get(thisField, '') != thisVal:
 				return True
 
 			if cascadeObjects is True and issubclass(thisField.__class__, IRForeignLinkFieldBase):
@@ -546,14 +746,25 @@ class IndexedRedisModel(object):
 
 			fieldName may be a string or may implement IRField (which implements string, and can be used just like a string)
 		'''
-		updatedFields = {}
-		for thisField in self.FIELDS:
-			thisVal = object.__getattribute__(self, thisField)
-			if self._origData.get(thisField, '') != thisVal:
-				updatedFields[thisField] = (self._origData[thisField], thisVal)
+		oga = object.__getattribute__
 
-			if cascadeObjects is True and issubclass(thisField.__class__, IRForeignLinkFieldBase) and thisVal.objHasUnsavedChanges():
-				updatedFields[thisField] = (self._origData[thisField], thisVal)
+		origData = oga(self, '_origData')
+		foreignFieldNames = oga(self, '_foreignFieldNames')
+
+		updatedFields = {}
+		for thisField in oga(self, 'FIELDS'):
+			thisVal = oga(self, thisField)
+			origVal = origData.get(thisField, '')
+
+			if thisField in foreignFieldNames:
+				# Compare just the linked pks, so foreign objects are never fetched here
+				if not isSameForeignLink(origVal, thisVal):
+					updatedFields[thisField] = (origVal, thisVal)
+				elif cascadeObjects is True and thisVal and thisVal.objHasUnsavedChanges():
+					updatedFields[thisField] = (origVal, thisVal)
+
+			elif origVal != thisVal:
+				updatedFields[thisField] = (origVal, thisVal)
 					
 		return updatedFields
 
@@ -699,13 +910,7 @@ class IndexedRedisModel(object):
 		conn = cls.objects._get_new_connection()
 
 		transaction = conn.pipeline()
-		transaction.eval("""
-		local matchingKeys = redis.call('KEYS', '%s*')
-
-		for _,key in ipairs(matchingKeys) do
-			redis.call('DEL', key)
-		end
-		""" %( ''.join([INDEXED_REDIS_PREFIX, cls.KEY_NAME, ':']), ), 0)
+		transaction.eval(_DESTROY_KEYS_SCRIPT, 1, ''.join([INDEXED_REDIS_PREFIX, cls.KEY_NAME, ':*']))
 		saver = IndexedRedisSave(cls)
 		nextID = 1
 		for newObj in newObjs:
@@ -714,6 +919,10 @@ class IndexedRedisModel(object):
 		transaction.set(saver._get_next_id_key(), nextID)
 		transaction.execute()
 
+		_bumpModelGeneration(cls.KEY_NAME)
+		if cls._identityMap is not None:
+			cls._identityMap.clear()
+
 		return list( range( 1, nextID, 1) )
 
 
@@ -730,18 +939,29 @@ class IndexedRedisModel(object):
 
 			@return <bool> - True if all fields have the same value, otherwise False
 		'''
-		if self.FIELDS != other.FIELDS:
+		oga = object.__getattribute__
+
+		fields = oga(self, 'FIELDS')
+		otherFields = oga(other, 'FIELDS')
+		if fields is not otherFields and fields != otherFields:
 			return False
 
-		oga = object.__getattribute__
+		# Compare the plain values first, straight from each object's __dict__, as they are cheap
+		#   and a difference there means we never need to look at (or fetch) any foreign objects.
+		thisDict = oga(self, '__dict__')
+		otherDict = oga(other, '__dict__')
+		for fieldName in oga(self, '_plainFieldNames'):
+			if thisDict[fieldName] != otherDict[fieldName]:
+				return False
 
-		for field in self.FIELDS:
-			thisVal = oga(self, field)
-			otherVal = oga(other, field)
-			if thisVal != otherVal:
+		for field in oga(self, 'foreignFields'):
+			thisVal = thisDict[field]
+			otherVal = otherDict[field]
+
+			if not isSameForeignLink(thisVal, otherVal):
 				return False
 
-			if cascadeObject is True and issubclass(field.__class__, IRForeignLinkFieldBase):
+			if cascadeObject is True:
 				if thisVal and thisVal.isFetched():
 					if otherVal and otherVal.isFetched():
 						theseForeign = thisVal.getObjs()
@@ -919,8 +1139,9 @@ class IndexedRedisModel(object):
 
 		'''
 		if type(redisCon) == dict:
-			conn = redis.Redis(**redisCon)
-		elif hasattr(conn, '__class__') and issubclass(conn.__class__, redis.Redis):
+			# Copy so the managed "connection_pool" is not set on the caller's dict. The pool is still shared between calls.
+			conn = redis.Redis(connection_pool=getRedisPool(copy.copy(redisCon)))
+		elif hasattr(redisCon, '__class__') and issubclass(redisCon.__class__, redis.Redis):
 			conn = redisCon
 		else:
 			raise ValueError('saveToExternal "redisCon" param must either be a dictionary of connection parameters, or redis.Redis, or extension thereof')
@@ -948,22 +1169,64 @@ class IndexedRedisModel(object):
 
 		    NOTE: Currently, this will cause a fetch of all Foreign Link objects, one level
 
+		    NOTE: If the model sets VERSIONED_RELOAD = True, an object with no unsaved changes is only refetched if the version
+		      token stored with it changed, so changes not made by saving through IndexedRedis are missed. @see IndexedRedisModel.VERSIONED_RELOAD
+
 		'''
 		_id = self._id
 		if not _id:
 			raise KeyError('Object has never been saved! Cannot reload.')
 
-		currentData = self.asDict(False, forStorage=False)
+		oga = object.__getattribute__
+
+		foreignFields = oga(self, 'foreignFields')
+
+		# If we know the version we were fetched from / saved as, have no local changes to revert,
+		#   and no fetched foreign objects to compare, then an unchanged version means nothing to update.
+		#   In that case we only need one round trip which checks the version on the server, and returns the hash only if it differs.
+		if oga(self, 'VERSIONED_RELOAD'):
+			knownVersion = oga(self, '_irVer')
+		else:
+			knownVersion = None
+		if knownVersion is not None and cascadeObjects is True:
+			for foreignField in foreignFields:
+				foreignValue = oga(self, str(foreignField))
+				if isinstance(foreignValue, ForeignLinkDataBase) and foreignValue.isFetched():
+					knownVersion = None
+					break
+
+		if knownVersion is not None and not self.hasUnsavedChanges():
+			objects = self.objects
+			conn = objects._get_connection()
+
+			result = _getRegisteredScript(conn, _RELOAD_SCRIPT)(keys=[objects._get_key_for_id(_id)], args=[_IR_VERSION_FIELD, knownVersion], client=conn)
+			if result == 0:
+				if not foreignFields:
+					return []
+				return {}
+
+			if not result:
+				raise KeyError('Object with id=%d is not in database. Cannot reload.' %(_id,))
+
+			newDataDict = dict(zip(result[::2], result[1::2]))
+			newDataDict['_id'] = _id
+			newDataObj = objects._redisResultsToObjs( [newDataDict] )[0]
+		else:
+			# Get the object, and compare the unconverted "asDict" repr.
+			#  If any changes, we will apply the already-convered value from
+			#  the object, but we compare the unconverted values (what's in the DB).
+			#  Always from Redis, as with IDENTITY_MAP get would return this same object.
+			newDataObj = self.objects._fetchOne(_id)
+			if not newDataObj:
+				raise KeyError('Object with id=%d is not in database. Cannot reload.' %(_id,))
 
-		# Get the object, and compare the unconverted "asDict" repr.
-		#  If any changes, we will apply the already-convered value from
-		#  the object, but we compare the unconverted values (what's in the DB).
-		newDataObj = self.objects.get(_id)
-		if not newDataObj:
-			raise KeyError('Object with id=%d is not in database. Cannot reload.' %(_id,))
+		# After applying any differences below we match what is stored
+		object.__setattr__(self, '_irVer', oga(newDataObj, '_irVer'))
+
+		currentData = self.asDict(False, forStorage=False)
 
 		newData = newDataObj.asDict(False, forStorage=False)
-		if currentData == newData and not self.foreignFields:
+		if currentData == newData and not foreignFields:
 			return []
 
 		updatedFields = {}
@@ -1112,6 +1375,8 @@ class IndexedRedisModel(object):
 		for thisField in fieldSet:
 			if thisField == '_id':
 				raise InvalidModelException('%s You cannot have a field named _id, it is reserved for the primary key.' %(failedValidationStr,))
+			if thisField == _IR_VERSION_FIELD and model.VERSIONED_RELOAD:
+				raise InvalidModelException('%s You cannot have a field named %s, it is reserved for the object version.' %(failedValidationStr, _IR_VERSION_FIELD))
 
 			# XXX: Is this ascii requirement still needed since all is unicode now?
 			try:
@@ -1154,6 +1419,14 @@ class IndexedRedisModel(object):
 			raise InvalidModelException('%s All INDEXED_FIELDS must also be present in FIELDS. %s exist only in INDEXED_FIELDS' %(failedValidationStr, str(list(indexedFieldSet - fieldSet)), ) )
 
 		model.foreignFields = foreignFields
+		model._foreignFieldNames = frozenset( [ str(foreignField) for foreignField in foreignFields ] )
+		model._fieldNames = tuple( [ str(thisField) for thisField in model.FIELDS ] )
+
+		if model.IDENTITY_MAP:
+			model._identityMap = weakref.WeakValueDictionary()
+		else:
+			model._identityMap = None
+		model._plainFieldNames = tuple( [ str(thisField) for thisField in model.FIELDS if thisField not in model._foreignFieldNames ] )
 		
 		validatedModels.add(model)
 		return True
@@ -1276,6 +1549,28 @@ class IndexedRedisHelper(object):
 			conn = self._get_connection()
 		conn.sadd(self._get_key_for_index(indexedField, val), pk)
 
+	def _add_ids_to_index(self, indexedField, pks, vals, conn=None):
+		'''
+			_add_ids_to_index - Adds a list of ids to an index, one SADD per distinct value
+			internal
+
+			@param indexedField <IRField> - The indexed field
+			@param pks list - Primary keys
+			@param vals list - Value of field on each of #pks
+		'''
+		if conn is None:
+			conn = self._get_connection()
+
+		pksByKey = {}
+		for pk, key in zip(pks, self._get_keys_for_index(indexedField, vals)):
+			if key in pksByKey:
+				pksByKey[key].append(pk)
+			else:
+				pksByKey[key] = [pk]
+
+		for key, keyPks in pksByKey.items():
+			conn.sadd(key, *keyPks)
+
 	def _rem_id_from_index(self, indexedField, pk, val, conn=None):
 		'''
 			_rem_id_from_index - Removes an id from an index
@@ -1296,15 +1591,36 @@ class IndexedRedisHelper(object):
 			@return - Key name string, potentially hashed.
 		'''
 		# If provided an IRField, use the toIndex from that (to support compat_ methods
-		if hasattr(indexedField, 'toIndex'):
-			val = indexedField.toIndex(val)
-		else:
+		if not hasattr(indexedField, 'toIndex'):
 		# Otherwise, look up the indexed field from the model
-			val = self.fields[indexedField].toIndex(val)
+			indexedField = self.fields[indexedField]
 
+		if indexedField.isIndexHashed is True and getIndexHashRaw() is True:
+			# Key ends in the raw digest, @see IndexedRedis.fields.setIndexHashRaw
+			return tobytes(''.join( [INDEXED_REDIS_PREFIX, self.keyName, ':idx:', indexedField, ':'] )) + indexedField.toIndexRaw(val)
+
+		val = indexedField.toIndex(val)
 
 		return ''.join( [INDEXED_REDIS_PREFIX, self.keyName, ':idx:', indexedField, ':', val] )
 
+	def _get_keys_for_index(self, indexedField, vals):
+		'''
+			_get_keys_for_index - Returns the key names that would hold the indexes on each of a list of values
+			Internal - @see _get_key_for_index
+
+			@param indexedField <IRField> - The indexed field
+			@param vals list - Values of field
+
+			@return list - Key names, in the same order as #vals
+		'''
+		keyPrefix = ''.join( [INDEXED_REDIS_PREFIX, self.keyName, ':idx:', indexedField, ':'] )
+
+		if indexedField.isIndexHashed is True and getIndexHashRaw() is True:
+			keyPrefix = tobytes(keyPrefix)
+			return [ keyPrefix + indexVal for indexVal in indexedField.toIndexMany(vals, raw=True) ]
+
+		return [ keyPrefix + indexVal for indexVal in indexedField.toIndexMany(vals) ]
+
 	def _compat_get_str_key_for_index(self, indexedField, val):
 		'''
 			_compat_get_str_key_for_index - Return the key name as a string, even if it is a hashed index field.
@@ -1373,6 +1689,21 @@ class IndexedRedisHelper(object):
 			conn = self._get_connection()
 		return int(conn.incr(self._get_next_id_key()))
 
+	def _getNextIDs(self, count, conn=None):
+		'''
+			_getNextIDs - Get (and increment past) the next #count primary keys for this model,
+				with a single INCRBY rather than an INCR per key.
+				Internal.
+
+			@param count <int> - Number of primary keys to allocate
+
+			@return list<int> - next #count pks, in order
+		'''
+		if conn is None:
+			conn = self._get_connection()
+		lastID = int(conn.incrby(self._get_next_id_key(), count))
+		return list(range(lastID - count + 1, lastID + 1))
+
 	def _getTempKey(self):
 		'''
 			_getTempKey - Generates a temporary key for intermediate storage
@@ -1410,6 +1741,48 @@ class IndexedRedisQuery(IndexedRedisHelper):
 		obj = self.mdl(**decodedDict)
 
 		return obj
+
+	def _redisResultsToObjs(self, theDicts):
+		'''
+			_redisResultsToObjs - Convert many results from Redis into objects. Same as _redisResultToObj on each,
+			  but the values are converted one field at a time through each field's fromStorageBatch,
+			  so fields which support it can convert many values at once (like IRCompressedField)
+
+			@param theDicts list<dict> - Results from Redis, with "_id" set
+
+			@return list<IndexedRedisModel> - The objects, same order as #theDicts
+		'''
+		decodedDicts = [ decodeDict(theDict) for theDict in theDicts ]
+
+		for thisField in self.fields:
+			fieldName = str(thisField)
+
+			haveFieldDicts = [ decodedDict for decodedDict in decodedDicts if fieldName in decodedDict ]
+			if not haveFieldDicts:
+				continue
+
+			convertedValues = thisField.fromStorageBatch( [ decodedDict[fieldName] for decodedDict in haveFieldDicts ] )
+			for decodedDict, convertedValue in zip(haveFieldDicts, convertedValues):
+				decodedDict[fieldName] = convertedValue
+
+		mdl = self.mdl
+		ret = []
+		for decodedDict in decodedDicts:
+			if '_id' in decodedDict:
+				decodedDict['_id'] = int(decodedDict['_id'])
+			decodedDict['__fromRedisConverted'] = True
+
+			ret.append( mdl(**decodedDict) )
+
+		# Accessing a foreign link on one of these fetches that link on up to SIBLING_FETCH_SIZE of them together
+		siblingFetchSize = mdl.SIBLING_FETCH_SIZE
+		if siblingFetchSize and len(ret) > 1:
+			oga = object.__getattribute__
+			for foreignField in mdl.foreignFields:
+				fieldName = str(foreignField)
+				linkSiblings( [ oga(obj, fieldName) for obj in ret ], siblingFetchSize )
+
+		return ret
 	
 
 	def filter(self, **kwargs):
@@ -1592,6 +1965,116 @@ class IndexedRedisQuery(IndexedRedisHelper):
 
 		return IRQueryableList([], mdl=self.mdl)
 
+	def _getCachedResults(self):
+		'''
+			_getCachedResults - Get the raw results (with "_id" set, ordered by pk) matching the current filters,
+			  from the cache if nothing of this model has been written by this process since they were fetched. Internal.
+
+			  @see allCached
+
+			@return list<dict> - Raw hashes from Redis. Do not modify.
+		'''
+		keyName = self.keyName
+
+		cacheKey = ( getRedisPool(self.mdl.REDIS_CONNECTION_PARAMS), keyName,
+			tuple(sorted( [ tobytes(self._get_key_for_index(fieldName, value)) for fieldName, value in self.filters ] )),
+			tuple(sorted( [ tobytes(self._get_key_for_index(fieldName, value)) for fieldName, value in self.notFilters ] )),
+		)
+		with _queryResultsCacheLock:
+			generation = _modelGenerations[keyName]
+			useCache = keyName not in _queuedWriteModels
+
+			if useCache is True:
+				cached = _queryResultsCache.pop(cacheKey, None)
+				if cached is not None and cached[0] == generation:
+					# Re-add, to mark as most recently used
+					_queryResultsCache[cacheKey] = cached
+					return cached[1]
+
+		pks = self.getPrimaryKeys(sortByAge=True)
+
+		results = []
+		if pks:
+			pipeline = self._get_connection().pipeline(transaction=False)
+			for pk in pks:
+				pipeline.hgetall(self._get_key_for_id(pk))
+
+			for pk, res in zip(pks, pipeline.execute()):
+				if res:
+					res['_id'] = pk
+					results.append(res)
+
+		if useCache is True:
+			with _queryResultsCacheLock:
+				# Unless something was written while fetching
+				if _modelGenerations[keyName] == generation and keyName not in _queuedWriteModels:
+					_queryResultsCache[cacheKey] = (generation, results)
+					while len(_queryResultsCache) > _QUERY_RESULTS_CACHE_SIZE:
+						_queryResultsCache.popitem(last=False)
+
+		return results
+
+	def clearCached(self):
+		'''
+			clearCached - Forget the results cached by allCached / firstCached for this model. Call as MyModel.objects.clearCached()
+
+			  Saves and deletes through IndexedRedis do this already. But after queueing saves or deletes of this model onto
+			   your own pipeline (like save(..., usePipeline=False, conn=pipeline) or destroyModel(pipeline)), cached results are
+			   not used for this model until this is called, as only you know when that pipeline is executed.
+			   Call this after executing it.
+		'''
+		keyName = self.keyName
+		with _queryResultsCacheLock:
+			_modelGenerations[keyName] += 1
+			_queuedWriteModels.discard(keyName)
+
+	def allCached(self, cascadeFetch=False):
+		'''
+			allCached - Same as #all (though ordered oldest -> newest), but repeating the same query returns objects made from the
+			  same fetched data, without going to Redis, until any object of this model is saved or deleted through this process.
+
+			  Each call returns new objects, so changing them does not affect the cache.
+
+			  NOTE: Writes from other processes (or directly to Redis) are NOT seen while cached. Only use this where
+			    this process is the only writer of this model, or where slightly stale results are okay.
+
+			  After saves or deletes of this model are queued on your own pipeline (like save(..., usePipeline=False, conn=pipeline)),
+			    results are fetched from Redis (not cached) until you call #clearCached, after executing that pipeline.
+
+			  Only the most recently used 128 distinct queries are kept.
+
+			@param cascadeFetch <bool> Default False, If True, all Foreign objects associated with this model
+			   will be fetched immediately (these are not cached). If False, foreign objects will be fetched on-access.
+
+			@return - Objects of the Model instance associated with this query
+		'''
+		ret = IRQueryableList(self._redisResultsToObjs(self._getCachedResults()), mdl=self.mdl)
+
+		if cascadeFetch is True:
+			self._doCascadeFetchMany(ret)
+
+		return ret
+
+	def firstCached(self, cascadeFetch=False):
+		'''
+			firstCached - Same as #first, but cached like #allCached. @see allCached
+
+			@param cascadeFetch <bool> Default False, If True, all Foreign objects associated with this model
+			   will be fetched immediately (these are not cached). If False, foreign objects will be fetched on-access.
+
+			@return - Instance of Model object, or None if no items match current filters
+		'''
+		results = self._getCachedResults()
+		if not results:
+			return None
+
+		obj = self._redisResultsToObjs( [ results[0] ] )[0]
+
+		if cascadeFetch is True:
+			self._doCascadeFetch(obj)
+
+		return obj
+
 	def allByAge(self, cascadeFetch=False):
 		'''
 			allByAge - Get the underlying objects which match the filter criteria, ordered oldest -> newest
@@ -1721,6 +2204,34 @@ class IndexedRedisQuery(IndexedRedisHelper):
 
 			@param pk - internal primary key (can be found via .getPk() on an item)
 		'''
+		identityMap = self.mdl._identityMap
+		if identityMap is not None:
+			ret = _getLoadedInstance(identityMap, pk)
+			if ret is not None:
+				if cascadeFetch is True:
+					self._doCascadeFetch(ret)
+				return ret
+
+		ret = self._fetchOne(pk)
+		if ret is None:
+			return None
+
+		if identityMap is not None:
+			ret = identityMap.setdefault(ret._id, ret)
+
+		if cascadeFetch is True:
+			self._doCascadeFetch(ret)
+		return ret
+
+	
+	def _fetchOne(self, pk):
+		'''
+			_fetchOne - Fetch a single object from Redis (never from the identity map). Internal, @see get
+
+			@param pk - internal primary key
+
+			@return - The object, or None if there is no object with that pk
+		'''
 		conn = self._get_connection()
 		key = self._get_key_for_id(pk)
 		res = conn.hgetall(key)
@@ -1728,41 +2239,99 @@ class IndexedRedisQuery(IndexedRedisHelper):
 			return None
 		res['_id'] = pk
 
-		ret = self._redisResultToObj(res)
-		if cascadeFetch is True:
-			self._doCascadeFetch(ret)
-		return ret
+		return self._redisResultToObj(res)
 
-	
 	@staticmethod
 	def _doCascadeFetch(obj):
 		'''
 			_doCascadeFetch - Takes an object and performs a cascading fetch on all foreign links, and all theirs, and so on.
 
 			@param obj <IndexedRedisModel> - A fetched model
+
+			@see _doCascadeFetchMany
+		'''
+		IndexedRedisQuery._doCascadeFetchMany([obj])
+
+	@staticmethod
+	def _doCascadeFetchMany(objs):
 		'''
-		obj.validateModel()
+			_doCascadeFetchMany - Takes a list of objects and performs a cascading fetch on all foreign links, and all theirs, and so on.
 
-		if not obj.foreignFields:
-			return
+			  This works one level of links at a time: all the unfetched links at a level are fetched together,
+			   with one getMultiple (one pipeline) per foreign model, and then the same is done for the links on those.
 
-		  # NOTE: Currently this fetches using one transaction per object. Implementation for actual resolution is in
-		  #   IndexedRedisModel.__getattribute__ 
+			  Each object (by model and pk, or by instance if unsaved) is only cascaded once, so links which
+			   cycle back (A.b -> B, B.a -> A) stop there rather than fetching forever. The links on the object
+			   reached again are left to be fetched on access.
 
-		for foreignField in obj.foreignFields:
-			subObjsData = object.__getattribute__(obj, foreignField)
-			if not subObjsData:
-				setattr(obj, str(foreignField), irNull)
-				continue
-			subObjs = subObjsData.getObjs()
-			
-			for subObj in subObjs:
-				if isIndexedRedisModel(subObj):
-					IndexedRedisQuery._doCascadeFetch(subObj)
+			@param objs list<IndexedRedisModel> - Fetched models
+		'''
+		oga = object.__getattribute__
+
+		# Objects already cascaded, by (model, pk) or id() if not saved
+		seen = set()
+
+		levelObjs = [ obj for obj in objs if obj ]
+		while levelObjs:
+			nextLevelObjs = []
+
+			# foreignModel -> [ (linkData, objIdx or None, pk), ... ]  Ordered so fetches happen in a consistent order
+			toFetch = OrderedDict()
+
+			for obj in levelObjs:
+				pk = oga(obj, '_id')
+				if pk:
+					seenKey = (obj.__class__, pk)
+				else:
+					seenKey = id(obj)
+
+				if seenKey in seen:
+					continue
+				seen.add(seenKey)
+
+				obj.validateModel()
+
+				if not obj.foreignFields:
+					continue
+
+				for foreignField in obj.foreignFields:
+					subObjsData = oga(obj, foreignField)
+					if not subObjsData:
+						setattr(obj, str(foreignField), irNull)
+						continue
+
+					if issubclass(subObjsData.__class__, ForeignLinkMultiData):
+						subObjs = subObjsData.obj
+						subPks = subObjsData.pk
+						for i in range(len(subObjs)):
+							if subObjs[i] is None:
+								if subPks[i]:
+									toFetch.setdefault(subObjsData.foreignModel, []).append( (subObjsData, i, subPks[i]) )
+							else:
+								nextLevelObjs.append(subObjs[i])
+					elif subObjsData.obj is None:
+						if subObjsData.pk:
+							toFetch.setdefault(subObjsData.foreignModel, []).append( (subObjsData, None, subObjsData.pk) )
+					else:
+						nextLevelObjs.append(subObjsData.obj)
+
+			for foreignModel, links in toFetch.items():
+				fetchedObjs = foreignModel.objects.getMultiple( [ link[2] for link in links ] )
+
+				for (subObjsData, objIdx, pk), fetchedObj in zip(links, fetchedObjs):
+					if objIdx is None:
+						subObjsData.obj = fetchedObj
+					else:
+						subObjsData.obj[objIdx] = fetchedObj
+
+					if fetchedObj:
+						nextLevelObjs.append(fetchedObj)
+
+			levelObjs = [ subObj for subObj in nextLevelObjs if isIndexedRedisModel(subObj) ]
 
 	def getMultiple(self, pks, cascadeFetch=False):
 		'''
-			getMultiple - Gets multiple objects with a single atomic operation
+			getMultiple - Gets multiple objects with a single round trip
 
 
 			@param cascadeFetch <bool> Default False, If True, all Foreign objects associated with this model
@@ -1778,33 +2347,59 @@ class IndexedRedisQuery(IndexedRedisHelper):
 			# Optimization to not pipeline on 1 id
 			return IRQueryableList([self.get(pks[0], cascadeFetch=cascadeFetch)], mdl=self.mdl)
 
+		identityMap = self.mdl._identityMap
+		if identityMap is None:
+			ret = self._fetchMultiple(pks)
+		else:
+			# Use the instances already loaded, and only fetch (and remember) the rest
+			ret = IRQueryableList( [ _getLoadedInstance(identityMap, pk) for pk in pks ], mdl=self.mdl)
+
+			needIdxs = [ i for i in range(len(pks)) if ret[i] is None ]
+			if needIdxs:
+				for i, obj in zip(needIdxs, self._fetchMultiple( [ pks[i] for i in needIdxs ] )):
+					if obj is not None:
+						ret[i] = identityMap.setdefault(obj._id, obj)
+
+		if cascadeFetch is True:
+			# Fetch the links of all the objects together
+			self._doCascadeFetchMany(ret)
+			
+		return ret
+
+	def _fetchMultiple(self, pks):
+		'''
+			_fetchMultiple - Fetch multiple objects from Redis, with a single round trip. Internal, @see getMultiple
+
+			@param pks - list of internal keys
+
+			@return IRQueryableList - The objects, same order as #pks (None where there is no object)
+		'''
 		conn = self._get_connection()
-		pipeline = conn.pipeline()
+		# Reads only, so no need to wrap in MULTI/EXEC. Still one round trip.
+		pipeline = conn.pipeline(transaction=False)
 		for pk in pks:
 			key = self._get_key_for_id(pk)
 			pipeline.hgetall(key)
 
 		res = pipeline.execute()
 		
-		ret = IRQueryableList(mdl=self.mdl)
+		ret = IRQueryableList( [None] * len(pks), mdl=self.mdl)
+
+		foundIdxs = []
+		foundDicts = []
 		i = 0
 		pksLen = len(pks)
 		while i < pksLen:
-			if res[i] is None:
-				ret.append(None)
-				i += 1
-				continue
-			res[i]['_id'] = pks[i]
-			obj = self._redisResultToObj(res[i])
-			ret.append(obj)
+			# A missing key gives an empty dict (None on some older redis-py)
+			if res[i]:
+				res[i]['_id'] = pks[i]
+				foundIdxs.append(i)
+				foundDicts.append(res[i])
 			i += 1
 
-		if cascadeFetch is True:
-			for obj in ret:
-				if not obj:
-					continue
-				self._doCascadeFetch(obj)
-			
+		for i, obj in zip(foundIdxs, self._redisResultsToObjs(foundDicts)):
+			ret[i] = obj
+
 		return ret
 
 	def getOnlyFields(self, pk, fields, cascadeFetch=False):
@@ -1869,7 +2464,7 @@ class IndexedRedisQuery(IndexedRedisHelper):
 			return IRQueryableList([self.getOnlyFields(pks[0], fields, cascadeFetch=cascadeFetch)], mdl=self.mdl)
 
 		conn = self._get_connection()
-		pipeline = conn.pipeline()
+		pipeline = conn.pipeline(transaction=False)
 
 		for pk in pks:
 			key = self._get_key_for_id(pk)
@@ -1907,8 +2502,8 @@ class IndexedRedisQuery(IndexedRedisHelper):
 			i += 1
 
 		if cascadeFetch is True:
-			for obj in ret:
-				self._doCascadeFetch(obj)
+			# Fetch the links of all the objects together
+			self._doCascadeFetchMany(ret)
 			
 		return ret
 
@@ -1989,6 +2584,23 @@ class IndexedRedisQuery(IndexedRedisHelper):
 					continue
 				saver.compat_convertHashedIndexes([obj])
 
+	def convertHashedIndexesRaw(self):
+		'''
+			convertHashedIndexesRaw - Convert the keys of all hashed indexes on this model to the form selected by
+			  IndexedRedis.fields.setIndexHashRaw (raw digest, or hex string). Call this once after changing that setting.
+
+			For an IndexedRedisModel class named "MyModel", call as "MyModel.objects.convertHashedIndexesRaw()"
+
+			This renames the index keys in place, no objects are fetched. Filters on this model are ignored.
+
+			This method is intended to be used while your application is offline,
+			  as it doesn't make sense to be changing your model while applications are actively using it.
+
+			@return <int> - Number of index keys converted
+		'''
+		saver = IndexedRedisSave(self.mdl)
+		return saver.convertHashedIndexesRaw()
+
 
 
 class IndexedRedisSave(IndexedRedisHelper):
@@ -1997,7 +2609,7 @@ class IndexedRedisSave(IndexedRedisHelper):
 			Except for advanced usage, this is probably for internal only.
 	'''
 
-	def save(self, obj, usePipeline=True, forceID=False, cascadeSave=True, conn=None):
+	def save(self, obj, usePipeline=True, forceID=False, cascadeSave=True, conn=None, _queuedModels=None):
 		'''
 			save - Save an object / objects associated with this model. 
 			
@@ -2016,6 +2628,10 @@ class IndexedRedisSave(IndexedRedisHelper):
 
 			@param conn - A connection or None
 
+			  NOTE: If you pass your own pipeline (with usePipeline=False), call MyModel.objects.clearCached() after executing it. @see IndexedRedisQuery.clearCached
+
+			@param _queuedModels <None/set> - Internal. Set of KEY_NAMEs queued onto a pipeline which the caller (a cascading save) executes.
+
 			@note - if no ID is specified
 
 			@return - List of pks
@@ -2037,23 +2653,26 @@ class IndexedRedisSave(IndexedRedisHelper):
 
 		if usePipeline is True:
 			pipeline = conn.pipeline()
+			# Models this (and any cascaded saves) queue onto our pipeline, to invalidate once it is executed
+			queuedModels = set()
 		else:
 			pipeline = conn
+			queuedModels = _queuedModels
 
 		oga = object.__getattribute__
 
 		if cascadeSave is True:
 
-			# TODO: Confirm that this pipeline logic works even when doPipeline is False
-			#   (i.e. that cascading works through calls to reset)
-#			foreignPipelines = OrderedDict()
-			foreignSavers = {}
+			# Gather the foreign objects which need saving, grouped by model, so each model
+			#   is saved with one call (allocating all its new pks at once) into the current pipeline
+			foreignObjsByModel = OrderedDict()
+			seenForeignObjIds = set()
 
 			for thisObj in objs:
-				if not thisObj.foreignFields:
+				foreignFields = oga(thisObj, 'foreignFields')
+				if not foreignFields:
 					continue
 
-				foreignFields = thisObj.foreignFields
 				for foreignField in foreignFields:
 
 					rawObj = oga(thisObj, str(foreignField))
@@ -2064,32 +2683,25 @@ class IndexedRedisSave(IndexedRedisHelper):
 					foreignObjects = oga(thisObj, str(foreignField)).getObjs()
 
 					for foreignObject in foreignObjects:
+						# The same object may be linked more than once, only save it once
+						if id(foreignObject) in seenForeignObjIds:
+							continue
+
 						doSaveForeign = False
-						if getattr(foreignObject, '_id', None):
+						if oga(foreignObject, '_id'):
 							if foreignObject.hasUnsavedChanges(cascadeObjects=True):
 								doSaveForeign = True
 						else:
 							doSaveForeign = True
 
-						# OLD:
-						# Assemble each level of Foreign fields into an ordered pipeline. Based on semi-recursion,
-						#   we will save the deepest level first in a pipeline, then the next up, on until we complete any subs
-
-						# NEW:
-						#   Assemble all foreign fields into current pipeline and execute all in one block
 						if doSaveForeign is True:
-							if foreignField not in foreignSavers:
-#								foreignPipelines[foreignField] = self._get_new_connection().pipeline()
-								foreignSavers[foreignField] = IndexedRedisSave(foreignObject.__class__)
+							seenForeignObjIds.add(id(foreignObject))
+							if foreignObject.__class__ not in foreignObjsByModel:
+								foreignObjsByModel[foreignObject.__class__] = []
+							foreignObjsByModel[foreignObject.__class__].append(foreignObject)
 
-							#foreignSavers[foreignField].save(foreignObject, usePipeline=False, cascadeSave=True, conn=foreignPipelines[foreignField])
-							foreignSavers[foreignField].save(foreignObject, usePipeline=False, cascadeSave=True, conn=pipeline)
-
-#			if foreignPipelines:
-#				for foreignPipeline in foreignPipelines.values():
-#					foreignPipeline.execute()
-
-				
+			for foreignModel, foreignObjs in foreignObjsByModel.items():
+				IndexedRedisSave(foreignModel).save(foreignObjs, usePipeline=False, cascadeSave=True, conn=pipeline, _queuedModels=queuedModels)
 
 		objsLen = len(objs)
 
@@ -2100,35 +2712,69 @@ class IndexedRedisSave(IndexedRedisHelper):
 			else:
 				forceIDs = [forceID]
 			isInserts = [] 
+			needIDIdxs = []
 			i = 0
 			while i < objsLen:
 				if forceIDs[i] is not False:
 					objs[i]._id = forceIDs[i]
 					isInserts.append(True)
 				else:
-					isInsert = not bool(getattr(obj, '_id', None))
+					isInsert = not bool(oga(objs[i], '_id'))
 					if isInsert is True:
-						objs[i]._id = self._getNextID(idConn)
+						needIDIdxs.append(i)
 					isInserts.append(isInsert)
 				i += 1
 		else:
-			isInserts = []
-			for obj in objs:
-				isInsert = not bool(getattr(obj, '_id', None))
-				if isInsert is True:
-					obj._id = self._getNextID(idConn)
-				isInserts.append(isInsert)
-				
+			isInserts = [ not bool(oga(obj, '_id')) for obj in objs ]
+			needIDIdxs = [ i for i in range(objsLen) if isInserts[i] is True ]
+
+		# Allocate the pks for all new objects at once
+		if needIDIdxs:
+			for i, newID in zip(needIDIdxs, self._getNextIDs(len(needIDIdxs), idConn)):
+				objs[i]._id = newID
+
+		# Convert all the inserted objects for storage together, one field at a time,
+		#   so fields which support it can convert many values at once (like IRCompressedField)
+		newDicts = [None] * objsLen
+		insertIdxs = [ i for i in range(objsLen) if isInserts[i] is True ]
+		if insertIdxs:
+			for i, newDict in zip(insertIdxs, self._getStorageDicts( [ objs[i] for i in insertIdxs ] ) ):
+				newDicts[i] = newDict
 
 		ids = [] # Note ids can be derived with all information above..
 		i = 0
 		while i < objsLen:
-			self._doSave(objs[i], isInserts[i], conn, pipeline)
-			ids.append(objs[i]._id)
+			self._doSave(objs[i], isInserts[i], conn, pipeline, newDicts[i], addIndexes=False)
+			ids.append(oga(objs[i], '_id'))
 			i += 1
 
+		# Index the inserted objects together, one field at a time
+		if insertIdxs:
+			insertObjs = [ objs[i] for i in insertIdxs ]
+			insertPks = [ ids[i] for i in insertIdxs ]
+			insertOrigDatas = [ oga(insertObj, '_origData') for insertObj in insertObjs ]
+			for indexedField in self.indexedFields:
+				self._add_ids_to_index(indexedField, insertPks, [ origData[indexedField] for origData in insertOrigDatas ], pipeline)
+
 		if usePipeline is True:
 			pipeline.execute()
+			_bumpModelGeneration(self.keyName)
+			for queuedKeyName in queuedModels:
+				_bumpModelGeneration(queuedKeyName)
+		elif queuedModels is not None:
+			queuedModels.add(self.keyName)
+		elif hasattr(pipeline, 'execute'):
+			_markQueuedWrite(self.keyName)
+		else:
+			# A plain connection, the writes already ran
+			_bumpModelGeneration(self.keyName)
+
+		# Only objects saved to this model's own Redis are the loaded instances for their pks
+		#   (saveToExternal saves a copy, under a pk from another Redis)
+		identityMap = self.mdl._identityMap
+		if identityMap is not None and getattr(conn, 'connection_pool', None) is getRedisPool(self.mdl.REDIS_CONNECTION_PARAMS):
+			for thisObj, pk in zip(objs, ids):
+				identityMap[pk] = thisObj
 
 		return ids
 
@@ -2142,7 +2788,27 @@ class IndexedRedisSave(IndexedRedisHelper):
 		return self.save(objs)
 		
 
-	def _doSave(self, obj, isInsert, conn, pipeline=None):
+	def _getStorageDicts(self, objs):
+		'''
+			_getStorageDicts - Convert the values on a list of objects for storage, one field at a time
+			  using each field's toStorageBatch. Internal.
+
+			  @param objs list<IndexedRedisModel> - Objects to convert
+
+			  @return list<dict> - For each object, the same as obj.asDict(forStorage=True)
+		'''
+		oga = object.__getattribute__
+
+		storageDicts = [ {} for obj in objs ]
+		for thisField in self.fields:
+			fieldName = str(thisField)
+			storageValues = thisField.toStorageBatch( [ oga(obj, fieldName) for obj in objs ] )
+			for storageDict, storageValue in zip(storageDicts, storageValues):
+				storageDict[thisField] = storageValue
+
+		return storageDicts
+
+	def _doSave(self, obj, isInsert, conn, pipeline=None, newDict=None, addIndexes=True):
 		'''
 			_doSave - Internal function to save a single object. Don't call this directly. 
 			            Use "save" instead.
@@ -2155,48 +2821,76 @@ class IndexedRedisSave(IndexedRedisHelper):
 			  @param isInsert - Bool, if insert or update. Either way, obj._id is expected to be set.
 			  @param conn - Redis connection
 			  @param pipeline - Optional pipeline, if present the items will be queued onto it. Otherwise, go directly to conn.
+			  @param newDict - Optional, on insert the result of obj.asDict(forStorage=True) if already converted.
+			  @param addIndexes - If False, on insert do not add the object to the indexes (the caller batches them).
 		'''
 
 		if pipeline is None:
 			pipeline = conn
 
-		newDict = obj.asDict(forStorage=True)
-		key = self._get_key_for_id(obj._id)
+		oga = object.__getattribute__
+
+		pk = oga(obj, '_id')
+		origData = oga(obj, '_origData')
+
+		key = self._get_key_for_id(pk)
 
 		if isInsert is True:
+			if newDict is None:
+				newDict = obj.asDict(forStorage=True)
+
+			fieldValues = {}
 			for thisField in self.fields:
 
 				fieldValue = newDict.get(thisField, thisField.getDefaultValue())
 
-				pipeline.hset(key, thisField, fieldValue)
+				fieldValues[thisField] = fieldValue
 
 				# Update origData with the new data
 				if fieldValue == IR_NULL_STR:
-					obj._origData[thisField] = irNull
+					origData[thisField] = irNull
 				else:
-					obj._origData[thisField] = object.__getattribute__(obj, str(thisField))
+					origData[thisField] = oga(obj, str(thisField))
+
+			# All fields in one command
+			if self.mdl.VERSIONED_RELOAD:
+				newVersion = fieldValues[_IR_VERSION_FIELD] = _newObjVersion()
+				_setHashFields(pipeline, key, fieldValues)
+				object.__setattr__(obj, '_irVer', newVersion)
+			else:
+				_setHashFields(pipeline, key, fieldValues)
 
-			self._add_id_to_keys(obj._id, pipeline)
+			self._add_id_to_keys(pk, pipeline)
 
-			for indexedField in self.indexedFields:
-				self._add_id_to_index(indexedField, obj._id, obj._origData[indexedField], pipeline)
+			if addIndexes is True:
+				for indexedField in self.indexedFields:
+					self._add_id_to_index(indexedField, pk, origData[indexedField], pipeline)
 		else:
 			updatedFields = obj.getUpdatedFields()
+			if not updatedFields:
+				return
+
+			fieldValues = {}
 			for thisField, fieldValue in updatedFields.items():
 				(oldValue, newValue) = fieldValue
 
-				oldValueForStorage = thisField.toStorage(oldValue)
-				newValueForStorage = thisField.toStorage(newValue)
-
-				pipeline.hset(key, thisField, newValueForStorage)
+				fieldValues[thisField] = thisField.toStorage(newValue)
 
+				# Index the converted values, same as on insert
 				if thisField in self.indexedFields:
-					self._rem_id_from_index(thisField, obj._id, oldValueForStorage, pipeline)
-					self._add_id_to_index(thisField, obj._id, newValueForStorage, pipeline)
+					self._rem_id_from_index(thisField, pk, oldValue, pipeline)
+					self._add_id_to_index(thisField, pk, newValue, pipeline)
 
 				# Update origData with the new data
-				obj._origData[thisField] = newValue
+				origData[thisField] = newValue
 
+			# All changed fields in one command
+			if self.mdl.VERSIONED_RELOAD:
+				newVersion = fieldValues[_IR_VERSION_FIELD] = _newObjVersion()
+				_setHashFields(pipeline, key, fieldValues)
+				object.__setattr__(obj, '_irVer', newVersion)
+			else:
+				_setHashFields(pipeline, key, fieldValues)
 
 	def reindex(self, objs, conn=None):
 		'''
@@ -2210,15 +2904,20 @@ class IndexedRedisSave(IndexedRedisHelper):
 
 		pipeline = conn.pipeline()
 
-		objDicts = [obj.asDict(True, forStorage=True) for obj in objs]
+		# Index the converted values, same as save does (not the storage form, like the packed bytes of an IRPackedIntField)
+		objDicts = [obj.asDict(True, forStorage=False) for obj in objs]
 
-		for indexedFieldName in self.indexedFields:
-			for objDict in objDicts:
-				self._rem_id_from_index(indexedFieldName, objDict['_id'], objDict[indexedFieldName], pipeline)
-				self._add_id_to_index(indexedFieldName, objDict['_id'], objDict[indexedFieldName], pipeline)
+		for indexedField in self.indexedFields:
+			# The same key is removed from and added to, so only get them once
+			keys = self._get_keys_for_index(indexedField, [ objDict[indexedField] for objDict in objDicts ])
+			for objDict, key in zip(objDicts, keys):
+				pipeline.srem(key, objDict['_id'])
+				pipeline.sadd(key, objDict['_id'])
 
 		pipeline.execute()
 
+		_bumpModelGeneration(self.keyName)
+
 	def compat_convertHashedIndexes(self, objs, conn=None):
 		'''
 			compat_convertHashedIndexes - Reindex all fields for the provided objects, where the field value is hashed or not.
@@ -2263,7 +2962,8 @@ class IndexedRedisSave(IndexedRedisHelper):
 
 			fields.append ( (origField, regField, hashingField) )
 
-		objDicts = [obj.asDict(True, forStorage=True) for obj in objs]
+		# Index the converted values, same as save and reindex do
+		objDicts = [obj.asDict(True, forStorage=False) for obj in objs]
 
 		# Iterate over all values. Remove the possibly stringed index, the possibly hashed index, and then put forth the hashed index.
 
@@ -2283,6 +2983,61 @@ class IndexedRedisSave(IndexedRedisHelper):
 			# Launch all at once
 			pipeline.execute()
 
+		_bumpModelGeneration(self.keyName)
+
+	def convertHashedIndexesRaw(self, conn=None):
+		'''
+			convertHashedIndexesRaw - Convert the keys of all hashed indexes on this model to the form selected by
+			  IndexedRedis.fields.setIndexHashRaw. Call as MyModel.objects.convertHashedIndexesRaw()
+
+			  Keys already in the selected form are left alone. If both forms of a key exist, they are merged.
+
+			@param conn <redis.Redis or None> - Specific Redis connection or None to reuse.
+
+			@return <int> - Number of index keys converted
+		'''
+		if conn is None:
+			conn = self._get_connection()
+
+		toRaw = getIndexHashRaw()
+
+		numConverted = 0
+		for indexedField in self.indexedFields:
+			if indexedField.isIndexHashed is False:
+				continue
+
+			keyPrefix = tobytes(''.join( [INDEXED_REDIS_PREFIX, self.keyName, ':idx:', indexedField, ':'] ))
+			keyPrefixLen = len(keyPrefix)
+
+			# Escape any glob characters in the model's key name
+			matchPattern = b''.join( [ (b'\\' + c if c in b'*?[]\\' else c) for c in [ keyPrefix[i:i+1] for i in range(keyPrefixLen) ] ] ) + b'*'
+
+			pipeline = conn.pipeline()
+			for key in conn.scan_iter(match=matchPattern):
+				key = tobytes(key)
+				indexVal = key[keyPrefixLen:]
+
+				# The hex form is always 32 characters, the raw form is the 16-byte digest
+				if toRaw is True and len(indexVal) == 32:
+					try:
+						newKey = keyPrefix + binascii.unhexlify(indexVal)
+					except (TypeError, ValueError):
+						continue
+				elif toRaw is False and len(indexVal) == 16:
+					newKey = keyPrefix + binascii.hexlify(indexVal)
+				else:
+					continue
+
+				pipeline.sunionstore(newKey, [newKey, key])
+				pipeline.delete(key)
+				numConverted += 1
+
+			pipeline.execute()
+
+		_bumpModelGeneration(self.keyName)
+
+		return numConverted
+
 
 
 class IndexedRedisDelete(IndexedRedisHelper):
@@ -2298,28 +3053,49 @@ class IndexedRedisDelete(IndexedRedisHelper):
 			@param obj - object to delete
 			@param conn - Connection to reuse, or None
 
+			  NOTE: If you pass your own pipeline, call MyModel.objects.clearCached() after executing it. @see IndexedRedisQuery.clearCached
+
 			@return - number of items deleted (0 or 1)
 		'''
-		if not getattr(obj, '_id', None):
-			return 0
-
 		if conn is None:
 			conn = self._get_connection()
 			pipeline = conn.pipeline()
-			executeAfter = True
-		else:
-			pipeline = conn # In this case, we are inheriting a pipeline
-			executeAfter = False
-		
-		pipeline.delete(self._get_key_for_id(obj._id))
-		self._rem_id_from_keys(obj._id, pipeline)
+			if not self._queueDelete(obj, pipeline):
+				return 0
+			pipeline.execute()
+			_bumpModelGeneration(self.keyName)
+			return 1
+
+		# In this case, we are inheriting a pipeline
+		if not self._queueDelete(obj, conn):
+			return 0
+
+		_markQueuedWrite(self.keyName)
+		return 1
+
+	def _queueDelete(self, obj, pipeline):
+		'''
+			_queueDelete - Queue the delete of one object onto #pipeline. Internal.
+
+			@return - number of items deleted (0 or 1)
+		'''
+		# obj may be None (like from getMultiple on a deleted pk)
+		pk = getattr(obj, '_id', None)
+		if not pk:
+			return 0
+
+		origData = object.__getattribute__(obj, '_origData')
+
+		pipeline.delete(self._get_key_for_id(pk))
+		self._rem_id_from_keys(pk, pipeline)
 		for indexedFieldName in self.indexedFields:
-			self._rem_id_from_index(indexedFieldName, obj._id, obj._origData[indexedFieldName], pipeline)
+			self._rem_id_from_index(indexedFieldName, pk, origData[indexedFieldName], pipeline)
 
 		obj._id = None
 
-		if executeAfter is True:
-			pipeline.execute()
+		identityMap = self.mdl._identityMap
+		if identityMap is not None:
+			identityMap.pop(pk, None)
 
 		return 1
 
@@ -2346,9 +3122,10 @@ class IndexedRedisDelete(IndexedRedisHelper):
 		numDeleted = 0
 
 		for obj in objs:
-			numDeleted += self.deleteOne(obj, pipeline)
+			numDeleted += self._queueDelete(obj, pipeline)
 
 		pipeline.execute()
+		_bumpModelGeneration(self.keyName)
 
 		return numDeleted
 
@@ -2369,7 +3146,7 @@ class IndexedRedisDelete(IndexedRedisHelper):
 		objs = self.mdl.objects.getMultipleOnlyIndexedFields(pks)
 		return self.deleteMultiple(objs)
 
-	def destroyModel(self):
+	def destroyModel(self, conn=None):
 		'''
 			destroyModel - Destroy everything related to this model in one swoop.
 
@@ -2377,20 +3154,40 @@ class IndexedRedisDelete(IndexedRedisHelper):
 
 			    This function is called if you do Model.objects.delete() with no filters set.
 
+			@param conn - A pipeline to queue the destroy onto, or None to run it right away.
+			  Destroying several models that share a Redis, queue them all onto one pipeline to do it in one round trip:
+
+			     pipeline = MyModel.deleter._get_connection().pipeline()
+			     for model in (MyModel, MyOtherModel):
+			         model.deleter.destroyModel(pipeline)
+			     pipeline.execute()
+			     for model in (MyModel, MyOtherModel):
+			         model.objects.clearCached()
+
+			  (clearCached lets allCached / firstCached cache results for the model again, @see IndexedRedisQuery.clearCached)
+
 			@return - Number of keys deleted. Note, this is NOT number of models deleted, but total keys.
+			   If #conn is given, returns None (the number of keys deleted is the result of this command on execute).
 		'''
-		conn = self._get_connection()
-		pipeline = conn.pipeline()
-		pipeline.eval("""
-		local matchingKeys = redis.call('KEYS', '%s*')
+		keyPattern = ''.join([INDEXED_REDIS_PREFIX, self.mdl.KEY_NAME, ':*'])
+
+		if self.mdl._identityMap is not None:
+			self.mdl._identityMap.clear()
+
+		if conn is None:
+			# Run on its own, via EVALSHA (a single command needs no pipeline)
+			conn = self._get_connection()
+			numDeleted = _getRegisteredScript(conn, _DESTROY_KEYS_SCRIPT)(keys=[keyPattern], client=conn)
+			_bumpModelGeneration(self.keyName)
+			return numDeleted
+
+		_markQueuedWrite(self.keyName)
 
-		for _,key in ipairs(matchingKeys) do
-			redis.call('DEL', key)
-		end
+		# In this case, we are inheriting a pipeline. Queue a plain EVAL, as a registered script
+		#   on a pipeline costs an extra SCRIPT EXISTS round trip on execute.
+		conn.eval(_DESTROY_KEYS_SCRIPT, 1, keyPattern)
 
-		return #matchingKeys
-		""" %( ''.join([INDEXED_REDIS_PREFIX, self.mdl.KEY_NAME, ':']), ), 0)
-		return pipeline.execute()[0]
+		return None
 		
 	
 
@@ -59,6 +59,10 @@ if bytes == str:
 
 			@return - "x" as a unicode type
 		'''
+		# Most values are already unicode, so return those right away
+		if x.__class__ is unicode:
+			return x
+
 		if encoding is None:
 			global defaultIREncoding
 			encoding = defaultIREncoding
@@ -80,6 +84,9 @@ if bytes == str:
 
 			@return - "x" as a bytes (str on python2) type
 		'''
+		if x.__class__ is str:
+			return x
+
 		if encoding is None:
 			global defaultIREncoding
 			encoding = defaultIREncoding
@@ -136,6 +143,10 @@ else:
 
 			@return - "x" as a unicode (str on python3) type
 		'''
+		# Most values are already str, so return those right away
+		if x.__class__ is str:
+			return x
+
 		if encoding is None:
 			global defaultIREncoding
 			encoding = defaultIREncoding
@@ -153,6 +164,9 @@ else:
 
 			@return - "x" as a bytes type
 		'''
+		if x.__class__ is bytes:
+			return x
+
 		if encoding is None:
 			global defaultIREncoding
 			encoding = defaultIREncoding
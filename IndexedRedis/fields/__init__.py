@@ -6,23 +6,33 @@
 
 # vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
 
-__all__ = ('IRField', 'IRNullType', 'irNull', 'IRPickleField', 
+__all__ = ('IRField', 'IRNullType', 'irNull', 'isIrNull', 'IRPickleField', 'IRMsgPackField', 
 	'IRCompressedField', 'IRUnicodeField', 'IRRawField', 'IRBase64Field', 
-	'IRFixedPointField', 'IRDatetimeValue', 'IRJsonValue', 
+	'IRFixedPointField', 'IRPackedIntField', 'IRDatetimeValue', 'IRJsonValue', 
 	'IRBytesField', 'IRClassicField',
 	'IRForeignLinkFieldBase', 'IRForeignLinkField', 'IRForeignMultiLinkField',
-	'IR_NULL_STR', 'IR_NULL_BYTES', 'IR_NULL_UNICODE', 'IR_NULL_STRINGS' )
+	'IR_NULL_STR', 'IR_NULL_BYTES', 'IR_NULL_UNICODE', 'IR_NULL_STRINGS',
+	'INDEX_HASH_MD5', 'INDEX_HASH_BLAKE2B', 'setIndexHashAlgorithm', 'getIndexHashAlgorithm',
+	'setIndexHashRaw', 'getIndexHashRaw' )
 
+import os
 import sys
 from datetime import datetime
 
 from ..compat_str import to_unicode, tobytes
 from ..deprecated import deprecatedMessage, deprecated
 
-from .null import irNull, IR_NULL_STRINGS, IR_NULL_STR, IR_NULL_BYTES, IR_NULL_UNICODE, IRNullType
+from .null import irNull, isIrNull, IR_NULL_STRINGS, IR_NULL_STR, IR_NULL_BYTES, IR_NULL_UNICODE, IRNullType
 
+from functools import partial
 from hashlib import md5
 
+try:
+	from hashlib import blake2b
+except ImportError:
+	# python < 3.6
+	blake2b = None
+
 
 try:
 	unicode
@@ -30,6 +40,92 @@ except NameError:
 	unicode = str
 
 
+# INDEX_HASH_MD5 - Hash indexes (fields with hashIndex=True, like IRCompressedField) with md5. This is the default.
+INDEX_HASH_MD5 = 'md5'
+
+# INDEX_HASH_BLAKE2B - Hash indexes with blake2b (128-bit digest). Several times faster than md5 on large values, python 3.6+
+INDEX_HASH_BLAKE2B = 'blake2b'
+
+global _indexHashAlgorithm
+_indexHashAlgorithm = INDEX_HASH_MD5
+
+# _indexHasher - Constructor of the hash object used by IRField.toIndex on hashed indexes. Changed by setIndexHashAlgorithm
+global _indexHasher
+_indexHasher = md5
+
+def setIndexHashAlgorithm(algorithm):
+	'''
+		setIndexHashAlgorithm - Set the algorithm used to hash indexes on fields with hashIndex=True (and those that force it, like IRCompressedField)
+
+		  The initial value may also be set through the environment variable IR_INDEX_HASH
+
+		  NOTE: Changing this changes the keys used for all hashed indexes, so existing hashed indexes will no longer match
+		   on filter. After changing, reindex existing objects with:  MyModel.reset(MyModel.objects.all())
+
+		@param algorithm <str> - One of the INDEX_HASH_* constants in this module ( "md5" or "blake2b" )
+
+		@raises ValueError - If algorithm is unknown, or not available in this python
+	'''
+	global _indexHashAlgorithm
+	global _indexHasher
+
+	if algorithm == INDEX_HASH_MD5:
+		hasher = md5
+	elif algorithm == INDEX_HASH_BLAKE2B:
+		if blake2b is None:
+			raise ValueError('setIndexHashAlgorithm was provided "%s", which requires python 3.6 or greater.' %(INDEX_HASH_BLAKE2B, ))
+		hasher = partial(blake2b, digest_size=16)
+	else:
+		raise ValueError('setIndexHashAlgorithm was provided an unknown algorithm, "%s". Should be one of the IndexedRedis.fields.INDEX_HASH_* constants.' %(str(algorithm), ))
+
+	_indexHashAlgorithm = algorithm
+	_indexHasher = hasher
+
+def getIndexHashAlgorithm():
+	'''
+		getIndexHashAlgorithm - Get the algorithm used to hash indexes. @see setIndexHashAlgorithm
+
+		@return <str> - One of the INDEX_HASH_* constants in this module
+	'''
+	global _indexHashAlgorithm
+	return _indexHashAlgorithm
+
+if os.environ.get('IR_INDEX_HASH'):
+	setIndexHashAlgorithm(os.environ['IR_INDEX_HASH'])
+
+# _indexHashRaw - If True, hashed index keys end in the raw digest rather than its hex string. Changed by setIndexHashRaw
+global _indexHashRaw
+_indexHashRaw = False
+
+def setIndexHashRaw(useRaw):
+	'''
+		setIndexHashRaw - Set whether the keys of hashed indexes (fields with hashIndex=True, and those that force it, like IRCompressedField)
+		  end in the raw 16-byte digest rather than the 32-character hex string. This makes every such key 16 bytes shorter,
+		  in Redis memory and on every save and filter. Default False.
+
+		  The initial value may also be set through the environment variable IR_RAW_INDEX_BYTES ( "1" or "true" )
+
+		  NOTE: Changing this changes the keys used for all hashed indexes. After changing, convert the existing keys
+		    (without fetching any objects) with:  MyModel.objects.convertHashedIndexesRaw()
+
+		@param useRaw <bool> - True to use the raw digest, False for the hex string
+	'''
+	global _indexHashRaw
+	_indexHashRaw = bool(useRaw)
+
+def getIndexHashRaw():
+	'''
+		getIndexHashRaw - Get whether hashed index keys end in the raw digest. @see setIndexHashRaw
+
+		@return <bool>
+	'''
+	global _indexHashRaw
+	return _indexHashRaw
+
+if os.environ.get('IR_RAW_INDEX_BYTES', '').lower() in ('1', 'true'):
+	setIndexHashRaw(True)
+
+
 class IRField(str):
 	'''
 		IRField - An advanced field
@@ -93,7 +189,7 @@ class IRField(str):
 
 			@param defaultValue <any> (default irNull) - The value assigned to this field as a "default", i.e. when no value has yet been set. Generally, it makes sense to keep this as irNull, but you may want a different default.
 
-			@param hashIndex <bool> (default False) - If true, the md5 hash of the value will be used for indexing and filtering. This may be useful for very long fields.
+			@param hashIndex <bool> (default False) - If true, the hash (md5 by default, @see setIndexHashAlgorithm) of the value will be used for indexing and filtering. This may be useful for very long fields.
 
 			An IRField may be indexable (depending on the type), and has the option to hash the index
 
@@ -139,6 +235,12 @@ class IRField(str):
 				raise TypeError('set types are not supported types. Use IRPickleField to store pickles of any type (which allow storing objects, etc), or use IRField(.. valueType=IRJsonValue) to store basic data (strings, integers) in lists.')
 		self.valueType = valueType
 
+		# Plain IRFields of other types (like int, float, or the FieldValueTypes) convert by calling the type directly,
+		#   saving a python-level call for every value fetched or assigned
+		if self.__class__ is IRField and '_fromStorage' not in self.__dict__:
+			self._fromStorage = valueType
+			self._fromInput = valueType
+
 		if valueType in (str, unicode, int, bool):
 			self.CAN_INDEX = True
 		elif hasattr(valueType, 'CAN_INDEX'):
@@ -163,11 +265,25 @@ class IRField(str):
 			@param value - The value of the item to convert
 			@return A string value suitable for storing.
 		'''
-		if value == irNull or None:
+		if isIrNull(value):
 			return IR_NULL_STR
 		
 		return self._toStorage(value)
 
+	def toStorageBatch(self, values):
+		'''
+			toStorageBatch - Convert a list of values for storage. @see toStorage
+
+			  This is used when saving multiple objects at once. The default implementation just calls toStorage on each value,
+			   extending types which can convert many values at once more efficiently (like IRCompressedField) override this.
+
+			@param values list - The values to convert
+
+			@return list - Values suitable for storing, in the same order as #values
+		'''
+		toStorage = self.toStorage
+		return [ toStorage(value) for value in values ]
+
 	def _toStorage(self, value):
 		'''
 			_toStorage - Convert the value to a string for storage.
@@ -196,6 +312,19 @@ class IRField(str):
 
 		return self._fromStorage(value)
 
+	def fromStorageBatch(self, values):
+		'''
+			fromStorageBatch - Convert a list of values from storage. @see fromStorage
+
+			  The default implementation just calls fromStorage on each value, extending types may override this.
+
+			@param values list - Values to convert
+
+			@return list - The converted values, in the same order as #values
+		'''
+		fromStorage = self.fromStorage
+		return [ fromStorage(value) for value in values ]
+
 	def _fromStorage(self, value):
 		'''
 			_fromStorage - Convert the value from storage to the value type.
@@ -221,7 +350,7 @@ class IRField(str):
 
 			@return - Converted value
 		'''
-		if value == irNull:
+		if isIrNull(value):
 			return irNull
 
 		return self._fromInput(value)
@@ -252,7 +381,7 @@ class IRField(str):
 			toIndex - An optional method which will return the value prepped for index.
 
 			By default, "toStorage" will be called. If you provide "hashIndex=True" on the constructor,
-			the field will be md5summed for indexing purposes. This is useful for large strings, etc.
+			the field will be hashed for indexing purposes (@see setIndexHashAlgorithm). This is useful for large strings, etc.
 		'''
 		if self._isIrNull(value):
 			ret = IR_NULL_STR
@@ -262,7 +391,56 @@ class IRField(str):
 		if self.isIndexHashed is False:
 			return ret
 
-		return md5(tobytes(ret)).hexdigest()
+		return _indexHasher(tobytes(ret)).hexdigest()
+
+	def toIndexRaw(self, value):
+		'''
+			toIndexRaw - Like toIndex, but returns bytes. When the index is hashed, this is the raw digest (16 bytes)
+			  rather than the 32-character hex string toIndex returns.
+
+			  If the index is not hashed, this is the same value as toIndex, as bytes.
+
+			  NOTE: toIndex is not built on this, hexdigest() measures faster than hexlify(digest()).
+
+			@return <bytes> - The index value
+		'''
+		if self._isIrNull(value):
+			ret = IR_NULL_STR
+		else:
+			ret = self._toIndex(value)
+
+		if self.isIndexHashed is False:
+			return tobytes(ret)
+
+		return _indexHasher(tobytes(ret)).digest()
+
+	def toIndexMany(self, values, raw=False):
+		'''
+			toIndexMany - Get the index value of each of a list of values. @see toIndex
+
+			  This is used when saving or reindexing multiple objects, so the hashing (when the index is hashed)
+			   runs in one tight loop.
+
+			@param values list - The values
+
+			@param raw <bool> default False - If True, return the same as toIndexRaw on each value instead
+
+			@return list<str> - The same as toIndex (or toIndexRaw, if #raw) on each value, in the same order as #values
+		'''
+		_isIrNull = self._isIrNull
+		_toIndex = self._toIndex
+
+		rets = [ IR_NULL_STR if _isIrNull(value) else _toIndex(value) for value in values ]
+
+		if self.isIndexHashed is False:
+			if raw is True:
+				return [ tobytes(ret) for ret in rets ]
+			return rets
+
+		hasher = _indexHasher
+		if raw is True:
+			return [ hasher(tobytes(ret)).digest() for ret in rets ]
+		return [ hasher(tobytes(ret)).hexdigest() for ret in rets ]
 
 	def getDefaultValue(self):
 		'''
@@ -306,9 +484,9 @@ class IRField(str):
 		if self._isNullValue(value):
 			return irNull
 		xvalue = value.lower()
-		if xvalue in ('true', '1'):
+		if xvalue == 'true' or xvalue == '1':
 			return True
-		elif xvalue in ('false', '0'):
+		elif xvalue == 'false' or xvalue == '0':
 			return False
 
 		# I'm not sure what to do here... Should we raise an exception because the data is invalid? Should just return True?
@@ -322,11 +500,14 @@ class IRField(str):
 
 			convert and toStorage should test if value is null and return null (for most types)
 		'''
-		return bool(value in (b'', '', irNull, None) or value in IR_NULL_STRINGS )
+		# Most values are str, which can skip comparing against irNull (a python-level __eq__)
+		if value.__class__ is str:
+			return bool(value == '' or value in IR_NULL_STRINGS)
+		return bool(value is None or value == b'' or value == '' or isIrNull(value) or value in IR_NULL_STRINGS )
 	
 	@staticmethod
 	def _isIrNull(value):
-		return bool( value == irNull or value in IR_NULL_STRINGS )
+		return bool( isIrNull(value) or value in IR_NULL_STRINGS )
 
 	def _getReprProperties(self):
 		'''
@@ -392,11 +573,13 @@ class IRField(str):
 
 from .compressed import IRCompressedField
 from .pickle_field import IRPickleField
+from .msgpack_field import IRMsgPackField
 from .unicode_field import IRUnicodeField
 from .raw import IRRawField
 from .chain import IRFieldChain
 from .b64 import IRBase64Field
 from .fixedpoint import IRFixedPointField
+from .packed_int import IRPackedIntField
 from .bytes_field import IRBytesField
 from .foreign import IRForeignLinkField, IRForeignLinkFieldBase, IRForeignMultiLinkField
 
@@ -9,13 +9,23 @@
 
 import zlib
 import bz2
+import threading
 
-from . import IRField, irNull
+from functools import partial
+
+try:
+	from functools import lru_cache
+except ImportError:
+	# python2
+	lru_cache = None
+
+from . import IRField, irNull, isIrNull
+from .null import IR_NULL_BYTES
 
 from ..compat_str import tobytes, isEmptyString, getDefaultIREncoding, isStringy
 
 
-__all__ = ('COMPRESS_MODE_BZ2', 'COMPRESS_MODE_ZLIB', 'IRCompressedField')
+__all__ = ('COMPRESS_MODE_BZ2', 'COMPRESS_MODE_ZLIB', 'COMPRESS_MODE_ZSTD', 'MIN_COMPRESS_BYTES', 'IRCompressedField')
 
 # COMPRESS_MODE_ZLIB - Use to compress using zlib (gzip)
 COMPRESS_MODE_ZLIB = 'zlib'
@@ -35,9 +45,96 @@ COMPRESS_MODE_LZMA = 'lzma'
 # All aliases for lzma compression
 _COMPRESS_MODE_ALIASES_LZMA = ('xz', )
 
+# COMPRESS_MODE_ZSTD - Use to compress using zstandard (requires the external "zstandard" module)
+COMPRESS_MODE_ZSTD = 'zstd'
+
+# All aliases for zstandard compression
+_COMPRESS_MODE_ALIASES_ZSTD = ('zstandard', 'zst')
+
+# The header of zlib and bz2 data depends on the level it was compressed with.
+#   Data compressed at any level is recognized when read back.
+_ZLIB_HEADERS = tuple(sorted(set( [ zlib.compress(b'', level)[:2] for level in range(0, 10) ] )))
+_BZ2_HEADERS = tuple( [ bz2.compress(b'', level)[:4] for level in range(1, 10) ] )
+
+# Errors raised decompressing data which is not actually compressed (zlib raises zlib.error, bz2 OSError/IOError or ValueError)
+_DECOMPRESS_ERRORS = (zlib.error, IOError, OSError, ValueError, EOFError)
+
+# MIN_COMPRESS_BYTES - A good value for "minCompressBytes" on IRCompressedField. Values shorter than this rarely
+#   get smaller when compressed (the zlib header and checksum alone are 6 bytes), so compressing them just costs time.
+MIN_COMPRESS_BYTES = 64
+
+# COMPRESS_CACHE_MAX_BYTES - Values up to this many bytes have their compressed form remembered (the most recent
+#   COMPRESS_CACHE_SIZE, shared by all IRCompressedFields), so saving the same value again (like a repeated tag
+#   or template) does not compress it again. Set to 0 to disable.
+COMPRESS_CACHE_MAX_BYTES = 4096
+
+# COMPRESS_CACHE_SIZE - Number of compressed values remembered. @see COMPRESS_CACHE_MAX_BYTES
+COMPRESS_CACHE_SIZE = 256
+
+if lru_cache is not None:
+	@lru_cache(maxsize=COMPRESS_CACHE_SIZE)
+	def _compressCached(compress, extraCompressArgs, valueBytes):
+		# Compression is deterministic for the same function and arguments, so this is safe to share
+		return compress(valueBytes, *extraCompressArgs)
+else:
+	_compressCached = None
+
 global _lzmaMod
 _lzmaMod = None
 
+global _zstdMod
+_zstdMod = None
+
+def _getZstdMod():
+	'''
+		_getZstdMod - Import and return the "zstandard" module.
+
+		@raises ImportError if "zstandard" is not installed
+	'''
+	global _zstdMod
+	if _zstdMod is not None:
+		return _zstdMod
+	try:
+		import zstandard
+	except ImportError:
+		raise ImportError('Requested compress mode is zstd and could not import the "zstandard" module. Please install it (pip install zstandard), or to use an alternate implementation, set IndexedRedis.fields.compressed._zstdMod to a module providing ZstdCompressor and ZstdDecompressor.')
+	_zstdMod = zstandard
+	return _zstdMod
+
+# ZstdCompressor / ZstdDecompressor objects are expensive to create relative to compressing a small value,
+#   but are not safe to share between threads. So keep one of each per thread.
+_zstdLocal = threading.local()
+
+def _getZstdCompressor(level=9):
+	try:
+		compressors = _zstdLocal.compressors
+	except AttributeError:
+		compressors = _zstdLocal.compressors = {}
+	try:
+		return compressors[level]
+	except KeyError:
+		compressor = compressors[level] = _getZstdMod().ZstdCompressor(level=level)
+		return compressor
+
+def _zstdCompress(data, level=9):
+	return _getZstdCompressor(level).compress(data)
+
+def _zstdCompressMany(datas, level=9):
+	compressor = _getZstdCompressor(level)
+	# multi_compress_to_buffer is only provided by the C backend of zstandard
+	multiCompress = getattr(compressor, 'multi_compress_to_buffer', None)
+	if multiCompress is None:
+		return [ compressor.compress(data) for data in datas ]
+	return [ segment.tobytes() for segment in multiCompress(datas) ]
+
+def _zstdDecompress(data):
+	try:
+		decompressor = _zstdLocal.decompressor
+	except AttributeError:
+		decompressor = _zstdLocal.decompressor = _getZstdMod().ZstdDecompressor()
+	return decompressor.decompress(data)
+
+
 class IRCompressedField(IRField):
 	'''
 		IRCompressedField - A field that automatically compresses/decompresses going to/from Redis.
@@ -56,8 +153,7 @@ class IRCompressedField(IRField):
 	CAN_INDEX = True
 	hashIndex = True
 
-	# NOTE: We don't support different compression levels, as doing so changes header and would prevent indexing.
-	def __init__(self, name='', compressMode=COMPRESS_MODE_ZLIB, defaultValue=irNull):
+	def __init__(self, name='', compressMode=COMPRESS_MODE_ZLIB, defaultValue=irNull, compressLevel=None, minCompressBytes=0):
 		'''
 			__init__ - Create this object
 
@@ -75,41 +171,141 @@ class IRCompressedField(IRField):
 			       NOTE: This is provided in python3 by default, but in python2 you will need an external module.
 			        IndexedRedis will automatically detect if "backports.lzma" or "lzmaffi" are installed, and use them
 				if the core "lzma" module is not available.
+
+			     "zstd" / "zstandard" / "zst" - zstandard compression. Much faster than the others at a similar ratio.
+			       NOTE: This requires the external "zstandard" module.
 			
 			@param defaultValue - The default value for this field
 
+			@param compressLevel <None/int> default None - The compression level to use. None uses 9 for zlib, bz2, and zstd,
+			  and 6 for lzma (its default preset).
+
+			  zlib supports 0-9, bz2 1-9, lzma 0-9, and zstd 1-22. Lower levels are faster; zlib at level 6 is about
+			   three times faster than at level 9, usually for a few percent larger output.
+
+			  NOTE: The index on this field is a hash of the compressed value, so changing the level of an existing field
+			    changes its index. After changing it, re-save all objects with  MyModel.reset(MyModel.objects.all())
+			    so they can be filtered on this field. Values already stored at any level can still be read.
+
+			@param minCompressBytes <int> default 0 - Values shorter than this many bytes are stored uncompressed.
+			  Short values often grow when compressed, and compressing them costs more than any space saved.
+			   MIN_COMPRESS_BYTES in this module is a good value. Default 0 compresses everything.
+
+			  NOTE: Like compressLevel, changing this changes the index on existing short values,
+			    so reindex with  MyModel.reset(MyModel.objects.all())  after changing it.
+
 			An IRCompressedField is indexable, and forces the index to be hashed.
 		'''
 		self.valueType = None
 		self.defaultValue = defaultValue
+		self.minCompressBytes = int(minCompressBytes or 0)
+
+		if compressLevel is not None:
+			try:
+				compressLevel = int(compressLevel)
+			except:
+				raise ValueError('Invalid compressLevel, %s, for field "%s". Should be an integer.' %(repr(compressLevel), name))
 
 		if compressMode == COMPRESS_MODE_ZLIB or compressMode in _COMPRESS_MODE_ALIASES_ZLIB:
 			self.compressMode = COMPRESS_MODE_ZLIB
-			self.header = b'x\xda'
-			self.extraCompressArgs = (9, )
+			self.compressLevel = self._checkCompressLevel(compressLevel, 9, 0, 9, name)
+			self.header = zlib.compress(b'', self.compressLevel)[:2]
+			self.headers = self._getHeaders(self.header, _ZLIB_HEADERS)
+			self.extraCompressArgs = (self.compressLevel, )
+			# NOTE: Do not try to pool or prebuild zlib compressobj/decompressobj here. A finished stream cannot be reset
+			#   from python, and compressobj.copy() duplicates the whole deflate state, which measures slower than
+			#   zlib.compress/zlib.decompress setting up a fresh one in C (and a different memLevel changes the output).
+			self._compress = zlib.compress
+			self._decompress = zlib.decompress
 		elif compressMode == COMPRESS_MODE_BZ2 or compressMode in _COMPRESS_MODE_ALIASES_BZ2:
 			self.compressMode = COMPRESS_MODE_BZ2
-			self.header = b'BZh9'
-			self.extraCompressArgs = (9, )
+			self.compressLevel = self._checkCompressLevel(compressLevel, 9, 1, 9, name)
+			self.header = bz2.compress(b'', self.compressLevel)[:4]
+			self.headers = self._getHeaders(self.header, _BZ2_HEADERS)
+			self.extraCompressArgs = (self.compressLevel, )
+			self._compress = bz2.compress
+			self._decompress = bz2.decompress
 		elif compressMode == COMPRESS_MODE_LZMA or compressMode in _COMPRESS_MODE_ALIASES_LZMA:
 			self.compressMode = COMPRESS_MODE_LZMA
+			self.compressLevel = self._checkCompressLevel(compressLevel, 6, 0, 9, name)
 			self.header = b'\xfd7zXZ'
-			self.extraCompressArgs = tuple()
-			self.getCompressMod() # Die early if LZMA compression is not available
+			self.headers = (self.header, )
+			lzmaMod = self.getCompressMod() # Die early if LZMA compression is not available
+			# format, check, preset
+			self.extraCompressArgs = (lzmaMod.FORMAT_XZ, -1, self.compressLevel)
+			self._compress = lzmaMod.compress
+			self._decompress = lzmaMod.decompress
+		elif compressMode == COMPRESS_MODE_ZSTD or compressMode in _COMPRESS_MODE_ALIASES_ZSTD:
+			self.compressMode = COMPRESS_MODE_ZSTD
+			self.compressLevel = self._checkCompressLevel(compressLevel, 9, 1, 22, name)
+			self.header = b'\x28\xb5\x2f\xfd'
+			self.headers = (self.header, )
+			self.extraCompressArgs = (self.compressLevel, )
+			self.getCompressMod() # Die early if zstandard is not available
+			self._compress = _zstdCompress
+			self._compressMany = partial(_zstdCompressMany, level=self.compressLevel)
+			self._decompress = _zstdDecompress
 		else:
 			raise ValueError('Invalid compressMode, "%s", for field "%s". Should be one of the IndexedRedis.fields.compressed.COMPRESS_MODE_* constants.' %(str(compressMode), name))
 
+	@staticmethod
+	def _getHeaders(header, allHeaders):
+		'''
+			_getHeaders - Get all the headers to recognize as compressed data, with this field's own header first
+			  (as that is what almost all stored values will have)
+
+			@return tuple<bytes>
+		'''
+		return (header, ) + tuple( [ otherHeader for otherHeader in allHeaders if otherHeader != header ] )
+
+	def _decompressOrRaw(self, value):
+		'''
+			_decompressOrRaw - Decompress a value which may be stored uncompressed, though it starts with a compressed header.
+
+			  This is used on values with the header of another compress level than this field's, and (with minCompressBytes)
+			    on values with this field's own header too. Uncompressed values can start with those bytes (like b'x^' for zlib),
+			    such as values stored before this field was compressed, or short values stored as-is under minCompressBytes.
+			    Those fail to decompress, and are returned as-is.
+
+			@param value <bytes> - Value from storage
+
+			@return <bytes>
+		'''
+		try:
+			return self._decompress(value)
+		except _DECOMPRESS_ERRORS:
+			return value
+
+	@staticmethod
+	def _checkCompressLevel(compressLevel, defaultLevel, minLevel, maxLevel, name):
+		'''
+			_checkCompressLevel - Get the compress level to use, checking that it is within range for the compress mode.
+
+			@return <int> - #compressLevel, or #defaultLevel if it is None
+
+			@raises ValueError - If out of range
+		'''
+		if compressLevel is None:
+			return defaultLevel
+		if compressLevel < minLevel or compressLevel > maxLevel:
+			raise ValueError('Invalid compressLevel, %d, for field "%s". Should be between %d and %d for this compressMode.' %(compressLevel, name, minLevel, maxLevel))
+		return compressLevel
+
 
 	def getCompressMod(self):
 		'''
 			getCompressMod - Return the module used for compression on this field
 
+			  NOTE: Compression on this field does not go through here, the functions are bound in __init__
+
 			@return <module> - The module for compression
 		'''
 		if self.compressMode == COMPRESS_MODE_ZLIB:
 			return zlib
 		if self.compressMode == COMPRESS_MODE_BZ2:
 			return bz2
+		if self.compressMode == COMPRESS_MODE_ZSTD:
+			return _getZstdMod()
 		if self.compressMode == COMPRESS_MODE_LZMA:
 			# Since lzma is not provided by python core in python2, search out some common alternatives.
 			#  Throw exception if we can find no lzma implementation.
@@ -137,31 +333,162 @@ class IRCompressedField(IRField):
 				raise ImportError("Requested compress mode is lzma and could not find a module providing lzma support. Tried: 'lzma', 'backports.lzma', 'lzmaffi' and none of these were available. Please install one of these, or to use an unlisted implementation, set IndexedRedis.fields.compressed._lzmaMod to the module (must implement standard python compression interface)")
 
 	def _toStorage(self, value):
-		if isEmptyString(value):
+		valueClass = value.__class__
+		if valueClass is str or valueClass is bytes:
+			if not value:
+				return ''
+		elif isEmptyString(value):
 			return ''
 
-
 		try:
 			valueBytes = tobytes(value)
 		except Exception as e:
 			raise ValueError('Failed to convert value to bytes. If this requires a different codec than the defaultIREncoding (currently %s), use an IRFieldChain with an IRBytesField or IRUnicodeField with the required encoding set (Depending on if you want the uncompressed value to be "bytes" or "unicode" type). Exception was: <%s> %s' %(getDefaultIREncoding(), e.__class__.__name__, str(e)) )
 
-		# TODO: I don't think this next block is needed anymore..
-		#   Check it out when IRCompressionTest is written
-		if tobytes(value[:len(self.header)]) == self.header:
-			return value
+		header = self.header
+
+		# Value is already compressed
+		if valueBytes[:len(header)] == header:
+			return valueBytes
+
+		valueLen = len(valueBytes)
+
+		# Too short to be worth compressing. Unless it looks like compressed data, so it can't be mistaken for it on fetch.
+		if valueLen < self.minCompressBytes and valueBytes[:len(header)] not in self.headers:
+			return valueBytes
+
+		if valueLen <= COMPRESS_CACHE_MAX_BYTES and _compressCached is not None:
+			return _compressCached(self._compress, self.extraCompressArgs, valueBytes)
+
+		return self._compress(valueBytes, *self.extraCompressArgs)
+
+	def _compressMany(self, valuesBytes):
+		'''
+			_compressMany - Compress a list of bytes. Modes which can compress many values in one call bind their own in __init__
+
+			@param valuesBytes list<bytes> - Uncompressed values
+
+			@return list<bytes> - Compressed values, same order as #valuesBytes
+		'''
+		extraCompressArgs = self.extraCompressArgs
+		if not extraCompressArgs:
+			return list(map(self._compress, valuesBytes))
+
+		compress = self._compress
+		return [ compress(valueBytes, *extraCompressArgs) for valueBytes in valuesBytes ]
 
+	def toStorageBatch(self, values):
+		'''
+			toStorageBatch - Convert a list of values for storage, compressing all that need it together.
+
+			@see IRField.toStorageBatch
+		'''
+		ret = []
+		toCompressIdxs = []
+		toCompress = []
+
+		toStorage = self.toStorage
+		header = self.header
+		headers = self.headers
+		headerLen = len(header)
+		minCompressBytes = self.minCompressBytes
+
+		compress = self._compress
+		extraCompressArgs = self.extraCompressArgs
+		if _compressCached is not None:
+			cacheMaxBytes = COMPRESS_CACHE_MAX_BYTES
+		else:
+			cacheMaxBytes = -1
+
+		for value in values:
+			# Nulls, empty strings, and anything not stringy get the regular treatment
+			if isIrNull(value) or not isStringy(value) or isEmptyString(value):
+				ret.append(toStorage(value))
+				continue
+
+			valueBytes = tobytes(value)
+			if valueBytes[:headerLen] == header:
+				# Already compressed
+				ret.append(valueBytes)
+				continue
+
+			valueLen = len(valueBytes)
+			if valueLen < minCompressBytes and valueBytes[:headerLen] not in headers:
+				# Too short to be worth compressing
+				ret.append(valueBytes)
+				continue
+
+			if valueLen <= cacheMaxBytes:
+				# Small values are compressed through the cache (which also handles repeats within this batch)
+				ret.append(_compressCached(compress, extraCompressArgs, valueBytes))
+				continue
+
+			toCompressIdxs.append(len(ret))
+			toCompress.append(valueBytes)
+			ret.append(None)
 
-		return self.getCompressMod().compress(tobytes(value), *self.extraCompressArgs)
+		if toCompress:
+			for idx, compressedValue in zip(toCompressIdxs, self._compressMany(toCompress)):
+				ret[idx] = compressedValue
+
+		return ret
+
+	def fromStorageBatch(self, values):
+		'''
+			fromStorageBatch - Convert a list of values from storage, decompressing directly those which are compressed bytes
+
+			@see IRField.fromStorageBatch
+		'''
+		decompressOrRaw = self._decompressOrRaw
+		if self.minCompressBytes:
+			# Short values which start with our own header may be stored as-is
+			decompress = decompressOrRaw
+		else:
+			decompress = self._decompress
+		fromStorage = self.fromStorage
+		header = self.header
+		headers = self.headers
+		headerLen = len(header)
+		nullBytes = IR_NULL_BYTES
+
+		# Values from Redis are bytes, so go straight to decompress on those which have a header,
+		#   and return as-is those which do not (stored uncompressed, like under minCompressBytes).
+		#   Anything else (nulls, empty) goes the regular way
+		#  NOTE: Comparing a slice measures faster than bytes.startswith for these short headers.
+		#    This is one comprehension rather than a loop with append, which measures ~15% slower on compressed values.
+		return [ decompress(value) if value.__class__ is bytes and value[:headerLen] == header else \
+				decompressOrRaw(value) if value.__class__ is bytes and value[:headerLen] in headers else \
+				value if value.__class__ is bytes and value and value != nullBytes else \
+				fromStorage(value) \
+			for value in values ]
 
 	def _fromStorage(self, value):
 
+		# Values from Redis are bytes, so handle those with a quick type compare before the general checks
+		if value.__class__ is bytes:
+			header = self.header
+			valueHeader = value[:len(header)]
+			if valueHeader == header and not self.minCompressBytes:
+				return self._decompress(value)
+			if valueHeader in self.headers:
+				return self._decompressOrRaw(value)
+			if not value:
+				return ''
+			return value
+
 		if isEmptyString(value):
 			return ''
 
+		headers = self.headers
+
 		# TODO: Check this out too, this enxt conditional probably shouldn't be here, maybe it should be an error when false..
-		if isStringy(value) and tobytes(value[:len(self.header)]) == self.header:
-			return self.getCompressMod().decompress(value)
+		#  Accept the header of any compress level, the level may have been changed since the value was stored.
+		if isStringy(value):
+			valueHeader = tobytes(value[:len(self.header)])
+			if valueHeader == self.header and not self.minCompressBytes:
+				return self._decompress(value)
+			if valueHeader in headers:
+				return self._decompressOrRaw(value)
 
 		return value
 	
@@ -169,12 +496,15 @@ class IRCompressedField(IRField):
 		return value
 
 	def _getReprProperties(self):
-		return [ 'compressMode="%s"' %(self.compressMode, ) ]
+		ret = [ 'compressMode="%s"' %(self.compressMode, ), 'compressLevel=%d' %(self.compressLevel, ) ]
+		if self.minCompressBytes:
+			ret.append('minCompressBytes=%d' %(self.minCompressBytes, ))
+		return ret
 
 	def copy(self):
-		return self.__class__(name=self.name, compressMode=self.compressMode, defaultValue=self.defaultValue)
+		return self.__class__(name=self.name, compressMode=self.compressMode, defaultValue=self.defaultValue, compressLevel=self.compressLevel, minCompressBytes=self.minCompressBytes)
 
-	def __new__(self, name='', compressMode=COMPRESS_MODE_ZLIB, defaultValue=irNull):
+	def __new__(self, name='', compressMode=COMPRESS_MODE_ZLIB, defaultValue=irNull, compressLevel=None, minCompressBytes=0):
 		return IRField.__new__(self, name)
 
 
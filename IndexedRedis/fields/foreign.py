@@ -6,6 +6,7 @@
 
 # vim: set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
 
+import copy
 import sys
 import weakref
 
@@ -18,14 +19,18 @@ from ..compat_str import isStringy, to_unicode, isBaseStringy
 
 __all__ = ( 
 	'ForeignLinkDataBase', 'ForeignLinkData', 'ForeignLinkMultiData',
-	'IRForeignLinkFieldBase', 'IRForeignLinkField', 'IRForeignMultiLinkField'
+	'IRForeignLinkFieldBase', 'IRForeignLinkField', 'IRForeignMultiLinkField',
+	'isSameForeignLink', 'linkSiblings',
 )
 
 class ForeignLinkDataBase(object):
 	'''
 		ForeignLinkDataBase - Base class for data relating to foreign links
 	'''
-	pass
+
+	# One of these is created per foreign field on every object, so don't give them a __dict__.
+	#   Subclasses must define __slots__ as well (even if empty)
+	__slots__ = ()
 
 class ForeignLinkData(ForeignLinkDataBase):
 	'''
@@ -34,7 +39,7 @@ class ForeignLinkData(ForeignLinkDataBase):
 		Can fetch object if not already fetched
 	'''
 
-	__slots__ = ('pk', 'obj', '_foreignModel')
+	__slots__ = ('pk', 'obj', '_foreignModel', '_siblings')
 
 	def __init__(self, pk=None, foreignModel=None, obj=None):
 		'''
@@ -46,6 +51,9 @@ class ForeignLinkData(ForeignLinkDataBase):
 		self.pk = pk
 		self.obj = obj
 
+		# The links (including this one) of the same field on objects fetched together, or None. @see linkSiblings
+		self._siblings = None
+
 		if foreignModel is not None:
 			# Shouldn't share a weakref...
 			if issubclass(foreignModel.__class__, weakref.ReferenceType):
@@ -83,9 +91,28 @@ class ForeignLinkData(ForeignLinkDataBase):
 		if self.obj is None:
 			if not self.pk:
 				return None
-			self.obj = self.foreignModel.objects.get(self.pk)
+			if self._siblings is not None:
+				self._fetchSiblings()
+			else:
+				self.obj = self.foreignModel.objects.get(self.pk)
 
 		return self.obj
+
+	def _fetchSiblings(self):
+		'''
+			_fetchSiblings - Fetch the objects of this link and all its still-unfetched siblings together, in one round trip.
+
+			  @see linkSiblings
+		'''
+		siblings = self._siblings
+		for sibling in siblings:
+			sibling._siblings = None
+
+		needLinks = [ sibling for sibling in siblings if sibling.obj is None and sibling.pk ]
+
+		fetched = self.foreignModel.objects.getMultiple( [ needLink.pk for needLink in needLinks ] )
+		for needLink, obj in zip(needLinks, fetched):
+			needLink.obj = obj
 	
 	def getObjs(self):
 		'''
@@ -115,6 +142,18 @@ class ForeignLinkData(ForeignLinkDataBase):
 		return not bool(self.obj is None)
 
 
+	def __deepcopy__(self, memo):
+		# Same as the default deepcopy, except the copy is not a sibling of anything
+		ret = self.__class__.__new__(self.__class__)
+		memo[id(self)] = ret
+
+		ret.pk = copy.deepcopy(self.pk, memo)
+		ret.obj = copy.deepcopy(self.obj, memo)
+		ret._foreignModel = self._foreignModel
+		ret._siblings = None
+
+		return ret
+
 	def __repr__(self):
 		foreignModelName = self._foreignModel and self._foreignModel().__name__ or 'None'
 
@@ -143,6 +182,57 @@ class ForeignLinkData(ForeignLinkDataBase):
 			
 
 
+def linkSiblings(links, maxSiblings=None):
+	'''
+		linkSiblings - Make the unfetched single links in #links siblings of each other,
+		  so that accessing the object of any one of them fetches the objects of all of them, in one round trip.
+
+		  This is used on the values of a foreign link field across objects fetched together (like by .all()),
+		   as code accessing that field on one of them usually goes on to access it on the rest.
+
+		@param links list - The values of one foreign link field, across several objects
+
+		@param maxSiblings <int/None> Default None - If set, the links are split (in order) into groups of up to this many,
+		   and only the links within each group are siblings.
+	'''
+	unfetched = [ link for link in links if link.__class__ is ForeignLinkData and link.obj is None and link.pk ]
+	if len(unfetched) < 2:
+		return
+
+	if not maxSiblings:
+		maxSiblings = len(unfetched)
+
+	for i in range(0, len(unfetched), maxSiblings):
+		siblings = unfetched[i : i + maxSiblings]
+		if len(siblings) < 2:
+			continue
+
+		for link in siblings:
+			link._siblings = siblings
+
+
+def isSameForeignLink(value1, value2):
+	'''
+		isSameForeignLink - Check if two values of a foreign link field link to the same pk(s).
+
+		  Only the pks are compared, so this never fetches the foreign objects.
+		  A value which is not link data (None or irNull) is unlinked, and is only the same as another unlinked value.
+
+		@param value1 <ForeignLinkData/None/irNull> - A foreign link field value
+
+		@param value2 <ForeignLinkData/None/irNull> - Another foreign link field value
+
+		@return <bool> - True if both values link to the same pk(s), or are both unlinked
+	'''
+	isLinked1 = isinstance(value1, ForeignLinkDataBase)
+	isLinked2 = isinstance(value2, ForeignLinkDataBase)
+
+	if not isLinked1 or not isLinked2:
+		return isLinked1 == isLinked2
+
+	return value1.getPk() == value2.getPk()
+
+
 # TODO: Maybe create a base which both of these extend,
 #   As having multiple in a singular field name can get confusing
 class ForeignLinkMultiData(ForeignLinkData):
@@ -152,6 +242,8 @@ class ForeignLinkMultiData(ForeignLinkData):
 		@see ForeignLinkData
 	'''
 
+	__slots__ = ()
+
 	def __init__(self, pk=None, foreignModel=None, obj=None):
 		'''
 			__init__ - Create a ForeignLinkMultiData
@@ -329,6 +421,30 @@ class IRForeignLinkField(IRForeignLinkFieldBase):
 
 		raise ValueError('Unknown input (expected either irNull, int (pk), or %s. Got: <%s>   %s' %(self.foreignModel.__name__, value.__class__.__name__, repr(value)) )
 	
+	def fromInputKeepLink(self, value, currentValue):
+		'''
+			fromInputKeepLink - Like fromInput, but if #value links to the same thing as #currentValue (the same
+			  object instance, or the same pk), return #currentValue itself rather than a new ForeignLinkData.
+			  This keeps an already-fetched object on reassignment, and does not create a new link object.
+
+			@param value - Value being assigned (like to fromInput)
+			@param currentValue - The current value of this field on the object
+
+			@return - The converted value, which may be #currentValue
+		'''
+		# Only single links. Multi links are rebuilt from the list.
+		if currentValue.__class__ is ForeignLinkData:
+			if hasattr(value, '_is_ir_model'):
+				if value is currentValue.obj:
+					return currentValue
+			elif value is currentValue:
+				return currentValue
+			elif isinstance(value, int) or (isBaseStringy(value) and value.isdigit()):
+				if int(value) == currentValue.getPk():
+					return currentValue
+
+		return self.fromInput(value)
+
 	def _toStorage(self, value):
 
 		if isinstance(value, int):
@@ -353,9 +469,12 @@ class IRForeignLinkField(IRForeignLinkFieldBase):
 
 
 	def _toIndex(self, value):
-		# Support passing either an integer or the model itself
-		if issubclass(value.__class__, IRForeignLinkField):
-			return value.getPk()
+		# Support passing the pk as a string (like the stored value, which reindex passes) as well as
+		#   an integer, the ForeignLinkData, or the model itself (which _toStorage handles)
+		if isStringy(value):
+			value = to_unicode(value)
+			if value.isdigit() or value == IR_NULL_STR:
+				return value
 
 		return super(IRForeignLinkField, self)._toIndex(value)
 
@@ -469,12 +588,5 @@ class IRForeignMultiLinkField(IRForeignLinkField):
 		'''
 		return True
 
-	def _toIndex(self, value):
-		# Support passing either an integer or the model itself
-		if issubclass(value.__class__, IRForeignMultiLinkField):
-			return ','.join(value.getPk())
-
-		return super(IRForeignLinkField, self)._toIndex(value)
-
 
 # vim: set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
@@ -0,0 +1,107 @@
+# Copyright (c) 2014, 2015, 2016, 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# fields.msgpack_field - A field which stores its value packed with msgpack. Use this in place of IRField ( in FIELDS array ) to activate
+
+
+# vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
+
+from . import IRField, irNull
+
+from IndexedRedis.compat_str import isStringy, isEncodedString, isEmptyString
+
+__all__ = ('IRMsgPackField', )
+
+# _msgpackMod - The "msgpack" module, imported on first use. @see _getMsgPackMod
+_msgpackMod = None
+
+# _unpackKwargs - Keyword arguments for msgpack.unpackb, set along with _msgpackMod
+_unpackKwargs = None
+
+def _getMsgPackMod():
+	'''
+		_getMsgPackMod - Import and return the "msgpack" module.
+
+		@raises ImportError if "msgpack" is not installed
+	'''
+	global _msgpackMod, _unpackKwargs
+	if _msgpackMod is not None:
+		return _msgpackMod
+	try:
+		import msgpack
+	except ImportError:
+		raise ImportError('IRMsgPackField requires the "msgpack" module. Please install it (pip install msgpack).')
+
+	# Allow non-string keys (like ints) in maps, which msgpack 1.0+ refuses by default. Older versions do not take this argument.
+	unpackKwargs = { 'raw' : False, 'strict_map_key' : False }
+	try:
+		msgpack.unpackb(msgpack.packb({1 : 1}), **unpackKwargs)
+	except TypeError:
+		del unpackKwargs['strict_map_key']
+
+	_unpackKwargs = unpackKwargs
+	_msgpackMod = msgpack
+	return _msgpackMod
+
+
+class IRMsgPackField(IRField):
+	'''
+		IRMsgPackField - A field which packs its data with msgpack before storage and unpacks after retrieval.
+
+		This requires the external "msgpack" module.
+
+		Supports None, bool, int, float, str, bytes, and lists and dicts of those. Tuples come back as lists.
+		  For any other type, use IRPickleField.
+
+		The stored data is compact, and can be read by msgpack in any other language.
+
+		Because dicts with the same items can pack differently (by insertion order), this field type is not indexable.
+	'''
+
+	CAN_INDEX = False
+
+	def __init__(self, name='', defaultValue=irNull):
+		'''
+			__init__ - Create an IRMsgPackField
+
+			@param name <str> - Field name
+
+			@param defaultValue - The default value of this field
+
+			@raises ImportError - If the "msgpack" module is not installed
+		'''
+		self.valueType = None
+		self.defaultValue = defaultValue
+
+		_getMsgPackMod() # Die early if msgpack is not available
+
+	def _toStorage(self, value):
+		if isEmptyString(value):
+			return ''
+
+		return _msgpackMod.packb(value, use_bin_type=True)
+
+	def _fromStorage(self, value):
+		# Values from Redis are bytes, so handle those with a quick type compare before the general checks
+		if value.__class__ is bytes:
+			if not value:
+				return ''
+			return _msgpackMod.unpackb(value, **_unpackKwargs)
+
+		if isEmptyString(value):
+			return ''
+
+		if not isEncodedString(value) and isStringy(value):
+			return _msgpackMod.unpackb(value, **_unpackKwargs)
+
+		return value
+
+	def _fromInput(self, value):
+		return value
+
+	def copy(self):
+		return self.__class__(name=self.name, defaultValue=self.defaultValue)
+
+	def __new__(self, name='', defaultValue=irNull):
+		return IRField.__new__(self, name)
+
+# vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
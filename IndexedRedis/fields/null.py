@@ -7,7 +7,7 @@
 
 import sys
 
-__all__ = ('IR_NULL_STR', 'IR_NULL_BYTES', 'IR_NULL_UNICODE', 'IR_NULL_STRINGS', 'IRNullType', 'irNull')
+__all__ = ('IR_NULL_STR', 'IR_NULL_BYTES', 'IR_NULL_UNICODE', 'IR_NULL_STRINGS', 'IRNullType', 'irNull', 'isIrNull')
 
 
 try:
@@ -51,6 +51,8 @@ class IRNullType(IrNullBaseType):
 		You probably shouldn't ever need to use this directly, instead use the static instance, "irNull", defined in this module.
 	'''
 
+	__slots__ = ()
+
 	def __new__(self, val=''):
 		'''
 			Don't let this be assigned a value.
@@ -58,10 +60,19 @@ class IRNullType(IrNullBaseType):
 		return IrNullBaseType.__new__(self, '')
 
 	def __eq__(self, otherVal):
-		return bool(issubclass(otherVal.__class__, IRNullType))
+		# Almost every comparison is against irNull itself, so check identity before the type
+		return otherVal is self or isinstance(otherVal, IRNullType)
 	
 	def __ne__(self, otherVal):
-		return not bool(issubclass(otherVal.__class__, IRNullType))
+		return not (otherVal is self or isinstance(otherVal, IRNullType))
+
+	# Null is immutable, so copies (like the deepcopy into a model's _origData) can be the same object,
+	#   which keeps identity checks against irNull working.
+	def __copy__(self):
+		return self
+
+	def __deepcopy__(self, memo):
+		return self
 
 	def __str__(self):
 		return ''
@@ -83,4 +94,16 @@ class IRNullType(IrNullBaseType):
 global irNull
 irNull = IRNullType()
 
+def isIrNull(value):
+	'''
+		isIrNull - Test if a value is irNull (or another IRNullType).
+
+		  This is the same as value == irNull , but faster.
+
+		@param value - Value to test
+
+		@return <bool> - True if value is null
+	'''
+	return value is irNull or isinstance(value, IRNullType)
+
 # vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
@@ -0,0 +1,92 @@
+# Copyright (c) 2014, 2015, 2016, 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# fields.packed_int - Integer stored as a fixed 8-byte (little-endian, signed) binary value, rather than as a decimal string.
+#
+
+
+# vim: set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
+
+import struct
+
+from . import IRField, irNull, IR_NULL_STRINGS
+
+__all__ = ('IRPackedIntField',)
+
+# _PACKED_INT - Signed 64-bit little-endian
+_PACKED_INT = struct.Struct('<q')
+
+# _iterUnpack - Unpacks many packed values in one call, or None on python2 (which has no Struct.iter_unpack)
+_iterUnpack = getattr(_PACKED_INT, 'iter_unpack', None)
+
+class IRPackedIntField(IRField):
+	'''
+		IRPackedIntField - An integer, stored as 8 bytes (signed 64-bit, little-endian) instead of as a decimal string like IRField(...valueType=int).
+
+		  Packing and unpacking is cheaper than converting to and from a string, and every value takes the same 8 bytes.
+		  Values must fit in a signed 64-bit integer.
+
+		  NOTE: The stored form is not compatible with IRField(...valueType=int). To switch an existing field, load the objects with
+		    the old model and save them with the new one (@see IndexedRedisModel.copyModel)
+
+		An IRPackedIntField is indexable, and the index uses the decimal string (the same as IRField(...valueType=int)). There is no option to hash the index.
+	'''
+
+	CAN_INDEX = True
+
+	def __init__(self, name='', defaultValue=irNull):
+		'''
+			__init__ - Create an IRPackedIntField
+
+			@param name <str> - Field name
+
+			@param defaultValue <any> default irNull - Default value for this field
+
+			An IRPackedIntField is indexable, and has no option to hash the index.
+		'''
+		self.valueType = int
+		self.defaultValue = defaultValue
+
+	_fromInput = int
+
+	def _fromStorage(self, value):
+		return _PACKED_INT.unpack(value)[0]
+
+	def fromStorageBatch(self, values):
+		'''
+			fromStorageBatch - Convert a list of values from storage. @see IRField.fromStorageBatch
+
+			  If none are null (and all are packed), all the values are unpacked in one call.
+		'''
+		packedSize = _PACKED_INT.size
+		for value in values:
+			if value in IR_NULL_STRINGS or len(value) != packedSize:
+				return IRField.fromStorageBatch(self, values)
+
+		if _iterUnpack is None:
+			unpack = _PACKED_INT.unpack
+			return [ unpack(value)[0] for value in values ]
+
+		return [ unpacked[0] for unpacked in _iterUnpack(b''.join(values)) ]
+
+	def _toStorage(self, value):
+		try:
+			return _PACKED_INT.pack(value)
+		except struct.error:
+			raise ValueError('Value %s does not fit in an IRPackedIntField (signed 64-bit).' %(repr(value), ))
+
+	def _toIndex(self, value):
+		# Indexing (save, reindex, and filters) passes converted or input values, never the packed form.
+		#   So a filter on a str of 8 digits (which is bytes in python2) is parsed as a decimal.
+		return str(int(value))
+
+	def _getReprProperties(self):
+		return []
+
+	def copy(self):
+		return self.__class__(name=self.name, defaultValue=self.defaultValue)
+
+	def __new__(self, name='', defaultValue=irNull):
+		return IRField.__new__(self, name)
+
+
+# vim: set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
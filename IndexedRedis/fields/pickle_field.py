@@ -5,6 +5,8 @@
 
 # vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
 
+import sys
+
 from . import IRField, irNull
 try:
 	import cPickle as pickle
@@ -13,6 +15,16 @@ except ImportError:
 
 from IndexedRedis.compat_str import isStringy, isEncodedString, isEmptyString
 
+__all__ = ('IRPickleField', 'DEFAULT_PICKLE_PROTOCOL')
+
+# DEFAULT_PICKLE_PROTOCOL - The pickle protocol used by IRPickleField when one is not given.
+#   Protocol 5 (python 3.8+) is much faster than 2 for bytes and large objects, but python2 cannot read it.
+#   If python2 needs to read the same data, use IRPickleField(..., pickleProtocol=2)
+if sys.version_info >= (3, 8):
+	DEFAULT_PICKLE_PROTOCOL = 5
+else:
+	DEFAULT_PICKLE_PROTOCOL = 2
+
 # NOTE: This pickle class originally had implcit base64 encoding and decoding so it could be used for indexes,
 #  but even with same protocol python2 and python3, and possibly even different platforms and same version
 #  create different pickles for the same objects. Can be as simple as the system supports microseconds,
@@ -22,7 +34,8 @@ class IRPickleField(IRField):
 	'''
 		IRPickleField - A field which pickles its data before storage and loads after retrieval.
 
-		This uses the python2 format, so is safe to use between python2 and python3.
+		By default this uses pickle protocol 5 on python 3.8+, and 2 otherwise. Pass pickleProtocol=2
+		  to be able to read the data from both python2 and python3. Data pickled with any protocol can be read.
 
 		Because even with the same format, python2 and python3 can output different pickle strings for the same object,
 		  as well as different host configurations may lead to different output, this field type is not indexable.
@@ -31,7 +44,7 @@ class IRPickleField(IRField):
 	# Sigh.... so we _can_ index on a pickle'd field, except even with the same protocol the pickling is different between python2 and python3
 	CAN_INDEX = False
 
-	def __init__(self, name='', defaultValue=irNull):
+	def __init__(self, name='', defaultValue=irNull, pickleProtocol=None):
 		'''
 			__init__ - Create an IRPickleField
 
@@ -39,19 +52,38 @@ class IRPickleField(IRField):
 
 			@param defaultValue - The default value of this field
 
+			@param pickleProtocol <None/int> default None - The pickle protocol to use when storing.
+			  None uses DEFAULT_PICKLE_PROTOCOL (5 on python 3.8+, otherwise 2). Use 2 if python2 must also read this data.
+
 			Because even with the same format, python2 and python3 can output different pickle strings for the same object,
 			  as well as different host configurations may lead to different output, this field type is not indexable.
 		'''
 		self.valueType = None
 		self.defaultValue = defaultValue
 
+		if pickleProtocol is None:
+			pickleProtocol = DEFAULT_PICKLE_PROTOCOL
+		elif pickleProtocol > pickle.HIGHEST_PROTOCOL:
+			raise ValueError('Invalid pickleProtocol, %d, for field "%s". The highest supported by this python is %d.' %(pickleProtocol, name, pickle.HIGHEST_PROTOCOL))
+		self.pickleProtocol = pickleProtocol
+
 	def _toStorage(self, value):
 		if isEmptyString(value):
 			return ''
 
-		return pickle.dumps(value, protocol=2)
+		# NOTE: A Pickler kept per thread and reused (clear_memo, truncated BytesIO) was tried here, and is slower for
+		#   common values (about 50% slower on small dicts and strings, where the python-level reset costs more than
+		#   pickle.dumps setting up in C). It only won on many small objects (~15%) and on huge top-level bytes,
+		#   which are better stored with IRBytesField anyway. So, keep dumps.
+		return pickle.dumps(value, protocol=self.pickleProtocol)
 
 	def _fromStorage(self, value):
+		# Values from Redis are bytes, so handle those with a quick type compare before the general checks
+		if value.__class__ is bytes:
+			if not value:
+				return ''
+			return pickle.loads(value)
+
 		if isEmptyString(value):
 			return ''
 
@@ -72,12 +104,12 @@ class IRPickleField(IRField):
 		return None
 
 	def _getReprProperties(self):
-		return []
+		return [ 'pickleProtocol=%d' %(self.pickleProtocol, ) ]
 
 	def copy(self):
-		return self.__class__(name=self.name, defaultValue=self.defaultValue)
+		return self.__class__(name=self.name, defaultValue=self.defaultValue, pickleProtocol=self.pickleProtocol)
 
-	def __new__(self, name='', defaultValue=irNull):
+	def __new__(self, name='', defaultValue=irNull, pickleProtocol=None):
 		return IRField.__new__(self, name)
 
 # vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
@@ -12,7 +12,7 @@ import TestProperties
 
 import copy
 import sys
-import subprocess
+import os
 from IndexedRedis import IndexedRedisModel, IRField, InvalidModelException, validatedModels
 from IndexedRedis.fields import IRPickleField
 
@@ -189,6 +189,6 @@ class TestCopyModel(object):
 
             
 if __name__ == '__main__':
-    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+    os.execvp('GoodTests.py', ['GoodTests.py', '-n1', sys.argv[0]] + sys.argv[1:])
 
 # vim: set ts=4 sw=4 expandtab
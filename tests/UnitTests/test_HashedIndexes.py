@@ -12,9 +12,14 @@ import TestProperties
 
 import re
 import sys
-import subprocess
+import os
 
-from IndexedRedis import IndexedRedisModel, IRField
+import binascii
+import hashlib
+
+from IndexedRedis import IndexedRedisModel, IRField, irNull, INDEXED_REDIS_PREFIX
+from IndexedRedis.compat_str import tobytes
+from IndexedRedis.fields import setIndexHashAlgorithm, getIndexHashAlgorithm, INDEX_HASH_MD5, INDEX_HASH_BLAKE2B, setIndexHashRaw, getIndexHashRaw
 
 
 # TODO: Add test for nulls and hashed indexes, and various other object types.
@@ -220,8 +225,181 @@ class TestHashedIndexes(object):
             numNurpleUnhashed = UnHashedIdxMdlForReindex.objects.filter(value='nurple').count()
             assert numNurpleUnhashed == 0 , prefixStr + 'Expected to not be able to fetch originally unhashed value after conversion to hashed using unhashed model'
 
+    def test_toIndexRaw(self):
+        '''
+            Test that toIndexRaw gives the raw digest of a hashed index
+        '''
+        hashedField = IRField('value', hashIndex=True)
+        unhashedField = IRField('value')
+
+        rawValue = hashedField.toIndexRaw('purple')
+
+        assert rawValue == hashlib.md5(tobytes('purple')).digest() , 'Expected toIndexRaw to return the raw md5 digest. Got: %s' %(repr(rawValue), )
+        assert binascii.hexlify(rawValue).decode('ascii') == hashedField.toIndex('purple') , 'Expected hex of toIndexRaw to equal toIndex'
+
+        assert unhashedField.toIndexRaw('purple') == tobytes(unhashedField.toIndex('purple')) , 'Expected toIndexRaw to be the bytes of toIndex on unhashed field'
+
+    def test_toIndexMany(self):
+        '''
+            Test that toIndexMany matches toIndex, and that saving and reindexing many objects indexes them all
+        '''
+        values = ['purple', 'blue', irNull, '', 'purple', 5]
+
+        for field in (IRField('value', hashIndex=True), IRField('value')):
+            assert field.toIndexMany(values) == [ field.toIndex(value) for value in values ] , 'Expected toIndexMany to match toIndex on each value (hashed=%s)' %(repr(field.hashIndex), )
+
+        assert IRField('value', hashIndex=True).toIndexMany([]) == [] , 'Expected empty list from toIndexMany on empty list'
+
+        class HashedIndexMdlMany(IndexedRedisModel):
+            FIELDS = [ IRField('name'), IRField('value', hashIndex=True) ]
+
+            INDEXED_FIELDS = ['name', 'value']
+
+            KEY_NAME = 'Test_HashedIndexMdlMany'
+
+        self.models.append(HashedIndexMdlMany)
+
+        objs = [ HashedIndexMdlMany(name='obj%d' %(i,), value=('purple' if i % 2 == 0 else 'blue')) for i in range(6) ]
+
+        assert HashedIndexMdlMany.saver.save(objs) , 'Failed to save objects'
+
+        for value, expectedNames in ( ('purple', ['obj0', 'obj2', 'obj4']), ('blue', ['obj1', 'obj3', 'obj5']) ):
+            fetchedNames = sorted( [ obj.name for obj in HashedIndexMdlMany.objects.filter(value=value).all() ] )
+            assert fetchedNames == expectedNames , 'Expected to filter on value=%s after saving many. Got: %s' %(value, repr(fetchedNames))
+
+        assert HashedIndexMdlMany.objects.filter(name='obj3').first().value == 'blue' , 'Expected to filter on unhashed index after saving many'
+
+        HashedIndexMdlMany.objects.reindex()
+
+        fetchedNames = sorted( [ obj.name for obj in HashedIndexMdlMany.objects.filter(value='purple').all() ] )
+        assert fetchedNames == ['obj0', 'obj2', 'obj4'] , 'Expected to filter on value after reindex. Got: %s' %(repr(fetchedNames), )
+
+    def test_indexHashRaw(self):
+        '''
+            Test that hashed index keys can use the raw digest, and that convertHashedIndexesRaw converts existing keys
+        '''
+        class HashedIndexMdlRaw(IndexedRedisModel):
+            FIELDS = [ IRField('name'), IRField('value', hashIndex=True) ]
+
+            INDEXED_FIELDS = ['name', 'value']
+
+            KEY_NAME = 'Test_HashedIndexMdlRaw'
+
+        self.models.append(HashedIndexMdlRaw)
+
+        conn = HashedIndexMdlRaw.objects._get_connection()
+
+        def getIndexKeys():
+            keyPrefix = tobytes(INDEXED_REDIS_PREFIX + 'Test_HashedIndexMdlRaw:idx:value:')
+            return [ tobytes(key)[len(keyPrefix):] for key in conn.keys(keyPrefix + b'*') ]
+
+        def getNames(value):
+            return sorted( [ obj.name for obj in HashedIndexMdlRaw.objects.filter(value=value).all() ] )
+
+        assert getIndexHashRaw() is False , 'Expected hex index keys by default'
+
+        assert HashedIndexMdlRaw.saver.save( [ HashedIndexMdlRaw(name='Tim', value='purple'), HashedIndexMdlRaw(name='Joe', value='blue') ] ) , 'Failed to save objects'
+
+        indexVals = getIndexKeys()
+        assert len(indexVals) == 2 and all( [ len(indexVal) == 32 for indexVal in indexVals ] ) , 'Expected 2 hex index keys. Got: %s' %(repr(indexVals), )
+
+        try:
+            setIndexHashRaw(True)
+
+            assert getNames('purple') == [] , 'Expected hex index keys to not match with setIndexHashRaw(True)'
+
+            numConverted = HashedIndexMdlRaw.objects.convertHashedIndexesRaw()
+            assert numConverted == 2 , 'Expected to convert 2 index keys. Got: %s' %(repr(numConverted), )
+
+            indexVals = getIndexKeys()
+            assert sorted(indexVals) == sorted( [ hashlib.md5(b'purple').digest(), hashlib.md5(b'blue').digest() ] ) , 'Expected index keys to end in the raw digest. Got: %s' %(repr(indexVals), )
+
+            assert HashedIndexMdlRaw.objects.convertHashedIndexesRaw() == 0 , 'Expected converting again to convert nothing'
+
+            assert getNames('purple') == ['Tim'] , 'Expected to filter on raw index keys after converting'
+
+            myObj = HashedIndexMdlRaw(name='Sam', value='purple')
+            assert myObj.save() , 'Failed to save object'
+
+            assert getNames('purple') == ['Sam', 'Tim'] , 'Expected to filter on object saved with raw index keys'
+
+            myObj.value = 'blue'
+            myObj.save()
+
+            assert getNames('blue') == ['Joe', 'Sam'] , 'Expected to filter on updated object with raw index keys'
+            assert getNames('purple') == ['Tim'] , 'Expected updated object to be removed from old raw index key'
+
+            HashedIndexMdlRaw.objects.reindex()
+            assert getNames('blue') == ['Joe', 'Sam'] , 'Expected to filter on raw index keys after reindex'
+        finally:
+            setIndexHashRaw(False)
+
+        assert getNames('blue') == [] , 'Expected raw index keys to not match with setIndexHashRaw(False)'
+
+        assert HashedIndexMdlRaw.objects.convertHashedIndexesRaw() == 2 , 'Expected to convert 2 index keys back to hex'
+
+        assert getNames('blue') == ['Joe', 'Sam'] , 'Expected to filter on hex index keys after converting back'
+        assert getNames('purple') == ['Tim'] , 'Expected to filter on hex index keys after converting back'
+
+    def test_indexHashAlgorithm(self):
+        '''
+            Test that the algorithm used for hashed indexes can be changed
+        '''
+        if not hasattr(hashlib, 'blake2b'):
+            sys.stderr.write('NOTE: blake2b is not available in this python. Cannot run test_indexHashAlgorithm.\n')
+            return
+
+        class HashedIndexMdlAlgorithm(IndexedRedisModel):
+            FIELDS = [ IRField('name'), IRField('value', hashIndex=True) ]
+
+            INDEXED_FIELDS = ['name', 'value']
+
+            KEY_NAME = 'Test_HashedIndexMdlAlgorithm'
+
+        self.models.append(HashedIndexMdlAlgorithm)
+
+        valueField = HashedIndexMdlAlgorithm.FIELDS[1]
+
+        assert getIndexHashAlgorithm() == INDEX_HASH_MD5 , 'Expected md5 to be the default index hash algorithm. Got: %s' %(repr(getIndexHashAlgorithm()), )
+
+        assert valueField.toIndex('purple') == hashlib.md5(tobytes('purple')).hexdigest() , 'Expected md5 hash by default'
+
+        try:
+            setIndexHashAlgorithm(INDEX_HASH_BLAKE2B)
+
+            assert getIndexHashAlgorithm() == INDEX_HASH_BLAKE2B , 'Expected algorithm to be blake2b after setting it'
+
+            hashValue = valueField.toIndex('purple')
+            assert hashValue == hashlib.blake2b(tobytes('purple'), digest_size=16).hexdigest() , 'Expected blake2b hash after setting algorithm. Got: %s' %(repr(hashValue), )
+            assert self._isHashed(hashValue) , 'Expected blake2b hash to be the same length as md5'
+
+            myObj = HashedIndexMdlAlgorithm(name='Tim', value='purple')
+            assert myObj.save() , 'Failed to save object'
+
+            fetchObjs = HashedIndexMdlAlgorithm.objects.filter(value='purple').all()
+            assert len(fetchObjs) == 1 and fetchObjs[0].name == 'Tim' , 'Expected to filter on blake2b-hashed index'
+
+            gotException = False
+            try:
+                setIndexHashAlgorithm('blah')
+            except ValueError:
+                gotException = True
+
+            assert gotException , 'Expected ValueError on unknown algorithm'
+            assert getIndexHashAlgorithm() == INDEX_HASH_BLAKE2B , 'Expected algorithm to be unchanged after invalid algorithm'
+        finally:
+            setIndexHashAlgorithm(INDEX_HASH_MD5)
+
+        fetchObjs = HashedIndexMdlAlgorithm.objects.filter(value='purple').all()
+        assert len(fetchObjs) == 0 , 'Expected md5 filter to not match the blake2b-hashed index'
+
+        HashedIndexMdlAlgorithm.reset(HashedIndexMdlAlgorithm.objects.all())
+
+        fetchObjs = HashedIndexMdlAlgorithm.objects.filter(value='purple').all()
+        assert len(fetchObjs) == 1 , 'Expected to filter on md5-hashed index after reset'
+
 
 if __name__ == '__main__':
-    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+    os.execvp('GoodTests.py', ['GoodTests.py', '-n1', sys.argv[0]] + sys.argv[1:])
 
 # vim: set ts=4 sw=4 expandtab
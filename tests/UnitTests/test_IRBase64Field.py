@@ -12,7 +12,7 @@ import TestProperties
 
 import base64
 import sys
-import subprocess
+import os
 
 from IndexedRedis import IndexedRedisModel, irNull
 from IndexedRedis.compat_str import tobytes
@@ -274,8 +274,27 @@ class TestIRBase64Field(object):
         assert len(fetchedObjs) == 1 , 'Expected to be able to fetch object using IRBase64Field with a value'
         assert fetchedObjs[0].name == 'two' , 'Fetched wrong object'
 
+        # Updated values are indexed the same as inserted ones
+        fetchedObjs = Model.objects.filter(value='val1').all()
+
+        assert len(fetchedObjs) == 1 , 'Expected to be able to fetch object using IRBase64Field on a value after update'
+        assert fetchedObjs[0].name == 'one' , 'Fetched wrong object'
+
+        assert 'one' not in [ fetchedObj.name for fetchedObj in Model.objects.filter(value=irNull).all() ] , 'Expected update to remove the old index value'
+
+        otherObj.value = 'val2plus'
+        otherObj.save()
+
+        assert [ fetchedObj.name for fetchedObj in Model.objects.filter(value='val2plus').all() ] == ['two'] , 'Expected to fetch object on a value after second update'
+        assert Model.objects.filter(value='val2').count() == 0 , 'Expected update to remove the old index value'
+
+        Model.objects.reindex()
+
+        assert [ fetchedObj.name for fetchedObj in Model.objects.filter(value='val1').all() ] == ['one'] , 'Expected to fetch object on a value after reindex'
+        assert [ fetchedObj.name for fetchedObj in Model.objects.filter(value='val2plus').all() ] == ['two'] , 'Expected to fetch object on a value after reindex'
+
 
 if __name__ == '__main__':
-    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+    os.execvp('GoodTests.py', ['GoodTests.py', '-n1', sys.argv[0]] + sys.argv[1:])
 
 # vim: set ts=4 sw=4 expandtab
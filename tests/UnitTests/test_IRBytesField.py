@@ -11,7 +11,7 @@
 import TestProperties
 
 import sys
-import subprocess
+import os
 
 from IndexedRedis import IndexedRedisModel, irNull, getDefaultIREncoding, setDefaultIREncoding
 from IndexedRedis.compat_str import tobytes
@@ -326,6 +326,6 @@ class TestIRBytesField(object):
 
 
 if __name__ == '__main__':
-    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+    os.execvp('GoodTests.py', ['GoodTests.py', '-n1', sys.argv[0]] + sys.argv[1:])
 
 # vim: set ts=4 sw=4 expandtab
@@ -11,14 +11,16 @@
 import TestProperties
 
 import sys
-import subprocess
+import os
 
 import zlib
 import bz2
 
 from IndexedRedis import IndexedRedisModel, irNull
 from IndexedRedis.compat_str import tobytes
-from IndexedRedis.fields import IRCompressedField, IRField
+from IndexedRedis.fields import IRCompressedField, IRField, IR_NULL_STR
+from IndexedRedis.fields import compressed as compressedMod
+from IndexedRedis.fields.compressed import MIN_COMPRESS_BYTES
 
 # vim: ts=4 sw=4 expandtab
 
@@ -79,6 +81,21 @@ class TestIRCompressedField(object):
             except ImportError:
                 pass
 
+        elif testMethod == self.test_compressZstd:
+            try:
+                class Model_CompressZstd(IndexedRedisModel):
+                    FIELDS = [
+                        IRField('name'),
+                        IRCompressedField('value', compressMode='zstd', defaultValue=irNull),
+                    ]
+
+                    INDEXED_FIELDS = ['name', 'value']
+
+                    KEY_NAME = 'TestIRCompressedField__CompressZstd'
+                self.model = Model_CompressZstd
+            except ImportError:
+                pass
+
         elif testMethod == self.test_defaultValue:
             class Model_CompressedDefaultValue(IndexedRedisModel):
                 FIELDS = [
@@ -105,6 +122,47 @@ class TestIRCompressedField(object):
 
             self.model = Model_CompressedIndex
 
+        elif testMethod == self.test_compressLevel:
+            class Model_CompressLevel(IndexedRedisModel):
+                FIELDS = [
+                    IRField('name'),
+                    IRCompressedField('value', compressLevel=6),
+                    IRCompressedField('value2', compressMode='bz2', compressLevel=1),
+                ]
+
+                INDEXED_FIELDS = ['name', 'value']
+
+                KEY_NAME = 'TestIRCompressedField__CompressLevel'
+
+            self.model = Model_CompressLevel
+
+        elif testMethod == self.test_minCompressBytes:
+            class Model_MinCompressBytes(IndexedRedisModel):
+                FIELDS = [
+                    IRField('name'),
+                    IRCompressedField('value', minCompressBytes=MIN_COMPRESS_BYTES),
+                ]
+
+                INDEXED_FIELDS = ['name', 'value']
+
+                KEY_NAME = 'TestIRCompressedField__MinCompressBytes'
+
+            self.model = Model_MinCompressBytes
+
+        elif testMethod == self.test_saveMultiple:
+            class Model_CompressedSaveMultiple(IndexedRedisModel):
+                FIELDS = [
+                    IRField('name'),
+                    IRCompressedField('value'),
+                    IRCompressedField('value2', compressMode='bz2'),
+                ]
+
+                INDEXED_FIELDS = ['name', 'value']
+
+                KEY_NAME = 'TestIRCompressedField__CompressedSaveMultiple'
+
+            self.model = Model_CompressedSaveMultiple
+
         # If KEEP_DATA is False (debug flag), then delete all objects before so prior test doesn't interfere
         if self.KEEP_DATA is False and self.model:
             self.model.deleter.destroyModel()
@@ -380,9 +438,292 @@ class TestIRCompressedField(object):
 
         assert obj.value == someStrBytes , 'Expected fetched object to contain the uncompressed value. Got: %s' %(repr(obj.value), )
 
+    def test_compressZstd(self):
+        if not self.model:
+            sys.stderr.write('NOTE: zstd compression is not available in this installation (missing the "zstandard" module). Cannot run test_compressZstd.\n')
+            return
+
+        Model = self.model
+
+        Model.validateModel()
+
+        zstandard = Model.FIELDS['value'].getCompressMod()
+
+        someStr = "The quick brown fox jumped over the lazy dog.\n" * 5
+        someStrBytes = tobytes(someStr)
+
+        someStrZstd = zstandard.ZstdCompressor(level=9).compress(someStrBytes)
+
+        obj = Model()
+
+        obj.name = 'one'
+
+        assert obj.value == irNull , 'Expected default value (irNull) to be taken seriously.'
+
+        obj.value = someStr
+
+        assert obj.value == someStr
+
+        try:
+            dictConverted = obj.asDict(forStorage=False, strKeys=True)
+            dictForStorage = obj.asDict(forStorage=True, strKeys=True)
+        except Exception as e:
+            raise AssertionError('Expected to be able to convert to dict for both storage and non-storage. Got exception: %s %s' %(e.__class__.__name__, str(e)))
+
+        assert dictConverted['value'] == someStr , 'Expected original string to be retained on forStorage=False dict. Got: %s' %(repr(dictConverted['value']), )
+
+        assert dictForStorage['value'] == someStrZstd , 'Expected zstd compressed value to be set on forStorage=True dict.\nExpected: %s\nGot:     %s' %(repr(someStrZstd), repr(dictForStorage['value']) )
+
+        ids = obj.save()
+
+        assert ids and ids[0] , 'Failed to save object with zstd compression'
+
+        objFetched = Model.objects.filter(name='one').first()
+
+        assert objFetched , 'Failed to fetch object'
+
+        obj = objFetched
+
+        assert obj.value == someStrBytes , 'Expected fetched object to contain the uncompressed value. Got: %s' %(repr(obj.value), )
+
+        objFetched = Model.objects.filter(value=someStr).first()
+
+        assert objFetched , 'Failed to fetch object on zstd-compressed index'
+
+        assert objFetched.name == 'one' , 'Fetched wrong object on zstd-compressed index'
+
+
+    def test_compressLevel(self):
+
+        Model = self.model
+
+        someStr = "The quick brown fox jumped over the lazy dog.\n" * 5
+        someStrBytes = tobytes(someStr)
+
+        obj = Model(name='one', value=someStr, value2=someStr)
+
+        dictForStorage = obj.asDict(forStorage=True, strKeys=True)
+
+        assert dictForStorage['value'] == zlib.compress(someStrBytes, 6) , 'Expected value to be compressed with zlib level 6. Got: %s' %(repr(dictForStorage['value']), )
+        assert dictForStorage['value2'] == bz2.compress(someStrBytes, 1) , 'Expected value2 to be compressed with bz2 level 1. Got: %s' %(repr(dictForStorage['value2']), )
+
+        assert obj.save() , 'Failed to save object with compressLevel set'
+
+        objFetched = Model.objects.filter(value=someStr).first()
+
+        assert objFetched , 'Failed to fetch object on index of field with compressLevel set'
+
+        assert objFetched.value == someStrBytes , 'Expected value to be uncompressed after fetch. Got: %s' %(repr(objFetched.value), )
+        assert objFetched.value2 == someStrBytes , 'Expected value2 to be uncompressed after fetch. Got: %s' %(repr(objFetched.value2), )
+
+        # Data compressed at any level should still be readable after the level is changed
+        for compressMode, compressFunc in ( ('zlib', zlib.compress), ('bz2', bz2.compress) ):
+            field = IRCompressedField('value', compressMode=compressMode)
+            for level in range(1, 10):
+                compressed = compressFunc(someStrBytes, level)
+                assert field.fromStorage(compressed) == someStrBytes , 'Expected %s data compressed at level %d to be readable by default field' %(compressMode, level)
+                assert field.fromStorageBatch([compressed]) == [someStrBytes] , 'Expected %s data compressed at level %d to be readable by default field in batch' %(compressMode, level)
+
+        # Uncompressed values (like stored before the field was compressed) which only start like data of another level are returned as-is
+        for compressMode, rawValue in ( ('zlib', b'x^2 + y^2 = z^2'), ('zlib', b'x\x01yz'), ('zlib', b'x\x9c'), ('bz2', b'BZh1 is not bz2') ):
+            field = IRCompressedField('value', compressMode=compressMode)
+            assert field.fromStorage(rawValue) == rawValue , 'Expected uncompressed %s value %s to be returned as-is. Got: %s' %(compressMode, repr(rawValue), repr(field.fromStorage(rawValue)))
+            assert field.fromStorageBatch([rawValue]) == [rawValue] , 'Expected uncompressed %s value %s to be returned as-is in batch' %(compressMode, repr(rawValue))
+
+        for compressMode, badLevel in ( ('zlib', 10), ('bz2', 0), ('zlib', 'blah') ):
+            gotException = False
+            try:
+                IRCompressedField('value', compressMode=compressMode, compressLevel=badLevel)
+            except ValueError:
+                gotException = True
+
+            assert gotException , 'Expected ValueError for compressLevel=%s on compressMode=%s' %(repr(badLevel), compressMode)
+
+        assert Model.FIELDS[1].copy().compressLevel == 6 , 'Expected compressLevel to be retained on copy'
+
+    def test_minCompressBytes(self):
+
+        Model = self.model
+
+        valueField = Model.FIELDS[1]
+
+        shortStr = 'short'
+        longStr = "The quick brown fox jumped over the lazy dog.\n" * 5
+        # Short, but starts like zlib data (level 1), so must be compressed so it is not mistaken for compressed data on fetch
+        trickyStr = 'x\x01 is short'
+
+        assert valueField.toStorage(shortStr) == tobytes(shortStr) , 'Expected short value to be stored uncompressed'
+        assert valueField.toStorage(longStr) == zlib.compress(tobytes(longStr), 9) , 'Expected long value to be compressed'
+        assert valueField.toStorage(trickyStr) == zlib.compress(tobytes(trickyStr), 9) , 'Expected short value starting with a zlib header to be compressed'
+
+        values = [shortStr, longStr, trickyStr, '']
+        assert valueField.toStorageBatch(values) == [ valueField.toStorage(value) for value in values ] , 'Expected toStorageBatch to match toStorage with minCompressBytes'
+
+        objs = [ Model(name='obj%d' %(i,), value=value) for i, value in enumerate(values[:3]) ]
+
+        assert Model.saver.save(objs) , 'Failed to save objects'
+
+        for i, value in enumerate(values[:3]):
+            obj = Model.objects.filter(value=value).first()
+
+            assert obj , 'Failed to fetch object on index with value %s' %(repr(value), )
+            assert obj.name == 'obj%d' %(i,) , 'Fetched wrong object for value %s' %(repr(value), )
+            assert obj.value == tobytes(value) , 'Expected fetched value to be %s, got %s' %(repr(tobytes(value)), repr(obj.value))
+
+        allValues = sorted( [ obj.value for obj in Model.objects.all() ] )
+        assert allValues == sorted( [ tobytes(value) for value in values[:3] ] ) , 'Expected to fetch all values with all(). Got: %s' %(repr(allValues), )
+
+        # Short, and starts with this field's own header, so is stored as-is (as if already compressed). It must still fetch.
+        ownHeaderValue = valueField.header + b' is short'
+        ownHeaderObj = Model(name='ownHeader', value=ownHeaderValue)
+        assert ownHeaderObj.save() , 'Failed to save object'
+
+        fetchedObj = Model.objects.filter(name='ownHeader').first()
+        assert fetchedObj.value == ownHeaderValue , 'Expected short value starting with own header to be fetched as-is. Got: %s' %(repr(fetchedObj.value), )
+        assert ownHeaderValue in [ obj.value for obj in Model.objects.all() ] , 'Expected short value starting with own header to be fetched as-is with all()'
+
+        for compressMode in ('zlib', 'bz2'):
+            field = IRCompressedField('value', compressMode=compressMode, minCompressBytes=MIN_COMPRESS_BYTES)
+            rawValue = field.header + b' is a header'
+            assert field.fromStorage(field.toStorage(rawValue)) == rawValue , 'Expected short %s value starting with own header to be fetched as-is' %(compressMode, )
+            assert field.fromStorageBatch( [ field.toStorage(rawValue) ] ) == [ rawValue ] , 'Expected short %s value starting with own header to be fetched as-is in batch' %(compressMode, )
+
+            longValue = b'The quick brown fox jumped over the lazy dog.\n' * 5
+            assert field.fromStorage(field.toStorage(longValue)) == longValue , 'Expected compressed %s value to still be decompressed' %(compressMode, )
+
+    def test_toStorageBatch(self):
+
+        someStr = "The quick brown fox jumped over the lazy dog.\n" * 5
+
+        values = [ someStr, irNull, '', tobytes(someStr + 'x'), zlib.compress(tobytes(someStr), 9), someStr ]
+
+        modes = ['zlib', 'bz2']
+        try:
+            import zstandard
+            modes.append('zstd')
+        except ImportError:
+            pass
+
+        for compressMode in modes:
+            field = IRCompressedField('value', compressMode=compressMode)
+
+            expected = [ field.toStorage(value) for value in values ]
+            got = field.toStorageBatch(values)
+
+            assert got == expected , 'Expected toStorageBatch to match toStorage on each value for compressMode=%s.\nExpected: %s\nGot:     %s' %(compressMode, repr(expected), repr(got))
+
+            assert field.fromStorageBatch(got) == [ field.fromStorage(value) for value in got ] , 'Expected fromStorageBatch to match fromStorage on each value for compressMode=%s' %(compressMode, )
+
+            # Values stored uncompressed (like under minCompressBytes), empty, and null
+            storedValues = got + [ b'stored raw', b'', tobytes(IR_NULL_STR), IR_NULL_STR ]
+            fetched = field.fromStorageBatch(storedValues)
+            assert fetched == [ field.fromStorage(value) for value in storedValues ] , 'Expected fromStorageBatch to match fromStorage on raw, empty, and null values for compressMode=%s. Got: %s' %(compressMode, repr(fetched[-4:]))
+            assert fetched[-4:] == [ b'stored raw', '', irNull, irNull ] , 'Expected raw value as-is, empty as empty string, and nulls as irNull. Got: %s' %(repr(fetched[-4:]), )
+
+        assert IRCompressedField('value').toStorageBatch([]) == [] , 'Expected empty list from toStorageBatch on empty list'
+
+    def test_compressCache(self):
+
+        someStr = "The quick brown fox jumped over the lazy dog.\n" * 5
+        bigStr = someStr * 200
+
+        assert len(tobytes(bigStr)) > compressedMod.COMPRESS_CACHE_MAX_BYTES , 'Expected bigStr to be larger than COMPRESS_CACHE_MAX_BYTES'
+
+        zlibField = IRCompressedField('value')
+        zlibField1 = IRCompressedField('value', compressLevel=1)
+        bz2Field = IRCompressedField('value', compressMode='bz2')
+
+        for i in range(2):
+            # Second time around comes from the cache, and must not get mixed up between fields
+            assert zlibField.toStorage(someStr) == zlib.compress(tobytes(someStr), 9) , 'Expected zlib level 9 compressed value'
+            assert zlibField1.toStorage(someStr) == zlib.compress(tobytes(someStr), 1) , 'Expected zlib level 1 compressed value'
+            assert bz2Field.toStorage(someStr) == bz2.compress(tobytes(someStr), 9) , 'Expected bz2 compressed value'
+            assert zlibField.toStorage(bigStr) == zlib.compress(tobytes(bigStr), 9) , 'Expected large value to be compressed'
+
+            assert zlibField.toStorageBatch([someStr, bigStr, someStr]) == [zlibField.toStorage(someStr), zlibField.toStorage(bigStr), zlibField.toStorage(someStr)] , 'Expected toStorageBatch to match toStorage with cache'
+
+        if compressedMod._compressCached is not None:
+            # An lru_cache wrapper hands back the very same object on a hit
+            assert zlibField.toStorage(someStr) is zlibField.toStorage(someStr) , 'Expected repeated small value to come from the cache'
+
+        oldMaxBytes = compressedMod.COMPRESS_CACHE_MAX_BYTES
+        compressedMod.COMPRESS_CACHE_MAX_BYTES = 0
+        try:
+            assert zlibField.toStorage(someStr) == zlib.compress(tobytes(someStr), 9) , 'Expected compressed value with cache disabled'
+        finally:
+            compressedMod.COMPRESS_CACHE_MAX_BYTES = oldMaxBytes
+
+    def test_boundCompressFunctions(self):
+
+        someStr = "The quick brown fox jumped over the lazy dog.\n" * 5
+
+        modes = ['zlib', 'bz2', 'lzma']
+        try:
+            import zstandard
+            modes.append('zstd')
+        except ImportError:
+            pass
+
+        for compressMode in modes:
+            field = IRCompressedField('value', compressMode=compressMode)
+            compressed = field.toStorage(someStr + compressMode)
+
+            def _noCompressMod():
+                raise AssertionError('getCompressMod should not be called when converting values')
+
+            # Compress and decompress are bound at construction, so converting values must not look up the module
+            field.getCompressMod = _noCompressMod
+            try:
+                assert field.toStorage(someStr + compressMode + 'x') , 'Expected to compress with compressMode=%s' %(compressMode, )
+                assert field.fromStorage(compressed) == tobytes(someStr + compressMode) , 'Expected to decompress with compressMode=%s' %(compressMode, )
+                assert field.fromStorageBatch([compressed]) == [tobytes(someStr + compressMode)] , 'Expected to decompress batch with compressMode=%s' %(compressMode, )
+            finally:
+                del field.getCompressMod
+
+    def test_saveMultiple(self):
+
+        Model = self.model
+
+        objs = []
+        for i in range(5):
+            objs.append( Model(name='obj%d' %(i,), value='Value number %d ' %(i,) * 10, value2='Second value %d' %(i,)) )
+        objs.append( Model(name='blank', value='') )
+
+        ids = Model.saver.save(objs)
+
+        assert len(ids) == 6 and all(ids) , 'Expected to save all objects. Got ids: %s' %(repr(ids), )
+
+        for i in range(5):
+            obj = Model.objects.filter(value='Value number %d ' %(i,) * 10).first()
+
+            assert obj , 'Failed to fetch object on compressed index after saving multiple'
+
+            assert obj.name == 'obj%d' %(i,) , 'Fetched wrong object. Expected name="obj%d", got %s' %(i, repr(obj.name))
+
+            assert obj.value2 == tobytes('Second value %d' %(i,)) , 'Expected second compressed field to be uncompressed after fetch. Got: %s' %(repr(obj.value2), )
+
+        allObjs = Model.objects.all()
+
+        assert len(allObjs) == 6 , 'Expected to fetch all 6 objects. Got %d' %(len(allObjs), )
+
+        allObjsByName = { obj.name : obj for obj in allObjs }
+        for i in range(5):
+            obj = allObjsByName['obj%d' %(i,)]
+
+            assert obj.value == tobytes('Value number %d ' %(i,) * 10) , 'Expected value to be uncompressed after fetching all. Got: %s' %(repr(obj.value), )
+
+            assert not obj.hasUnsavedChanges() , 'Expected no unsaved changes on object after fetching all'
+
+        obj = Model.objects.filter(name='blank').first()
+
+        assert obj , 'Failed to fetch object with blank value'
+
+        assert obj.value == '' , 'Expected blank value to remain blank. Got: %s' %(repr(obj.value), )
+
+        assert obj.value2 == irNull , 'Expected unset value to be irNull. Got: %s' %(repr(obj.value2), )
 
 
 if __name__ == '__main__':
-    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+    os.execvp('GoodTests.py', ['GoodTests.py', '-n1', sys.argv[0]] + sys.argv[1:])
 
 # vim: set ts=4 sw=4 expandtab
@@ -9,7 +9,7 @@
 import TestProperties
 
 import sys
-import subprocess
+import os
 
 from IndexedRedis import IndexedRedisModel, IRField, irNull
 from IndexedRedis.fields import IRClassicField
@@ -140,6 +140,6 @@ class TestIRDefaultValues(object):
 
 
 if __name__ == '__main__':
-    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+    os.execvp('GoodTests.py', ['GoodTests.py', '-n1', sys.argv[0]] + sys.argv[1:])
 
 # vim: set ts=4 sw=4 expandtab
@@ -10,12 +10,15 @@ import TestProperties
 
 # vim: set ts=4 sw=4 expandtab
 
+import copy
 import datetime
 
 import sys
-import subprocess
+import os
 
-from IndexedRedis import IndexedRedisModel, IRField, irNull, toggleDeprecatedMessages
+from IndexedRedis import IndexedRedisModel, IRField, irNull, isIrNull, toggleDeprecatedMessages
+from IndexedRedis.compat_str import to_unicode, tobytes
+from IndexedRedis.fields import IRNullType
 from IndexedRedis.fields.FieldValueTypes import IRDatetimeValue, IRJsonValue
 
 # vim: ts=4 sw=4 expandtab
@@ -524,9 +527,60 @@ class TestIRField(object):
         updatedFields = obj.getUpdatedFields()
         assert updatedFields == {}, 'Expected empty updatedFields after updating'
 
+    def test_boolFieldValue(self):
+
+        field = IRField('isOkay', valueType=bool)
+
+        for value, expected in ( ('true', True), ('True', True), ('1', True), ('false', False), ('FALSE', False), ('0', False) ):
+            assert field.fromStorage(value) is expected , 'Expected %s from storage to be %s' %(repr(value), repr(expected))
+            assert field.fromInput(value) is expected , 'Expected %s from input to be %s' %(repr(value), repr(expected))
+
+        for value in ('', b'', None, irNull, 'IRNullType()'):
+            assert field.fromStorage(value) == irNull , 'Expected %s from storage to be irNull' %(repr(value), )
+
+        gotException = False
+        try:
+            field.fromStorage('maybe')
+        except ValueError:
+            gotException = True
+
+        assert gotException , 'Expected ValueError for a value which is not a bool'
+
+    def test_strToStorage(self):
+        '''
+            test_strToStorage - Test that str values are stored as-is, and others are still converted to str
+        '''
+        strField = IRField('value')
+
+        someStr = 'hello world ' * 10
+
+        assert strField.toStorage(someStr) is someStr , 'Expected str value to be stored as-is'
+
+        storageValue = strField.toStorage(b'hello')
+        assert storageValue == 'hello' and isinstance(storageValue, str) , 'Expected bytes value to be stored as str. Got: %s' %(repr(storageValue), )
+
+        assert strField.toStorage(5) == '5' , 'Expected int value to be stored as str'
+        assert strField.toStorage(irNull) == 'IRNullType()' , 'Expected irNull to still be stored as the null string'
+
+        assert to_unicode(someStr) is someStr , 'Expected to_unicode to return str as-is'
+        assert tobytes(b'abc') == b'abc' and tobytes('abc') == b'abc' , 'Expected tobytes to get bytes'
+
+    def test_isIrNull(self):
+
+        assert isIrNull(irNull) , 'Expected irNull to be null'
+        assert isIrNull(IRNullType()) , 'Expected another IRNullType to be null'
+
+        for value in ('', b'', None, 0, False, 'IRNullType()'):
+            assert not isIrNull(value) , 'Expected %s to not be irNull' %(repr(value), )
+            assert irNull != value , 'Expected irNull != %s' %(repr(value), )
+            assert not (irNull == value) , 'Expected irNull to not equal %s' %(repr(value), )
+
+        assert copy.deepcopy(irNull) is irNull , 'Expected deepcopy of irNull to be irNull'
+        assert copy.copy(irNull) is irNull , 'Expected copy of irNull to be irNull'
+
 
 
 if __name__ == '__main__':
-    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+    os.execvp('GoodTests.py', ['GoodTests.py', '-n1', sys.argv[0]] + sys.argv[1:])
 
 # vim: set ts=4 sw=4 expandtab
@@ -12,90 +12,119 @@ import TestProperties
 
 import base64
 import sys
-import subprocess
+import os
 
-from IndexedRedis import IndexedRedisModel, irNull
+from IndexedRedis import IndexedRedisModel, IndexedRedisQuery, IndexedRedisSave, irNull
 from IndexedRedis.compat_str import tobytes
 from IndexedRedis.fields import IRForeignLinkField, IRField, IRForeignLinkField
+from IndexedRedis.fields.foreign import linkSiblings
 
 # vim: ts=4 sw=4 expandtab
 
-class TestIRForeignLinkField(object):
-    '''
-        TestIRForeignLinkField - Test base64 field
-    '''
+# The models are defined once, here, and shared by all tests (each test's data is destroyed in setup/teardown)
 
-    KEEP_DATA = False
+class Model_RefedModel(IndexedRedisModel):
 
-    def setup_method(self, testMethod):
-        '''
-            setup_method - Called before every method. Should set "self.model" to the model needed for the test.
-  
-            @param testMethod - Instance method of test about to be called.
-        '''
-        self.models = {}
+    FIELDS = [
+        IRField('name'),
+        IRField('strVal'),
+        IRField('intVal', valueType=int)
+    ]
 
-        class Model_RefedModel(IndexedRedisModel):
+    INDEXED_FIELDS = ['name']
 
-            FIELDS = [
-                IRField('name'),
-                IRField('strVal'),
-                IRField('intVal', valueType=int)
-            ]
+    KEY_NAME = 'TestIRForeignLinkField__RefedModel1'
 
-            INDEXED_FIELDS = ['name']
 
-            KEY_NAME = 'TestIRForeignLinkField__RefedModel1'
+class Model_MainModel(IndexedRedisModel):
+    
+    FIELDS = [
+        IRField('name'),
+        IRField('value'),
+        IRForeignLinkField('other', Model_RefedModel),
+    ]
 
-        self.models['RefedModel'] = Model_RefedModel
+    INDEXED_FIELDS = ['name']
 
-        class Model_MainModel(IndexedRedisModel):
-            
-            FIELDS = [
-                IRField('name'),
-                IRField('value'),
-                IRForeignLinkField('other', Model_RefedModel),
-            ]
+    KEY_NAME='TestIRForeignLinkField__MainModel1'
 
-            INDEXED_FIELDS = ['name']
 
-            KEY_NAME='TestIRForeignLinkField__MainModel1'
+class Model_MainModelIndexed(IndexedRedisModel):
+    FIELDS = [
+        IRField('name'),
+        IRField('value'),
+        IRForeignLinkField('other', Model_RefedModel),
+    ]
 
-        self.models['MainModel'] = Model_MainModel
+    INDEXED_FIELDS = ['name', 'other']
 
-        if testMethod == self.test_filterOnModel:
-            class Model_MainModelIndexed(IndexedRedisModel):
-                FIELDS = [
-                    IRField('name'),
-                    IRField('value'),
-                    IRForeignLinkField('other', Model_RefedModel),
-                ]
+    KEY_NAME='TestIRForeignLinkField__MainModelIndexed1'
 
-                INDEXED_FIELDS = ['name', 'other']
 
-                KEY_NAME='TestIRForeignLinkField__MainModelIndexed1'
+class Model_PreMainModel(IndexedRedisModel):
+    FIELDS = [
+        IRField('name'),
+        IRField('value'),
+        IRForeignLinkField('main', Model_MainModel),
+    ]
 
-            self.models['MainModel'] = Model_MainModelIndexed
+    INDEXED_FIELDS = ['name']
 
-        if testMethod in (self.test_cascadeSave, self.test_cascadeFetch, self.test_reload):
-            class Model_PreMainModel(IndexedRedisModel):
-                FIELDS = [
-                    IRField('name'),
-                    IRField('value'),
-                    IRForeignLinkField('main', Model_MainModel),
-                ]
+    KEY_NAME = 'TestIRForeignLinkField__PreMainModel1'
 
-                INDEXED_FIELDS = ['name']
 
-                KEY_NAME = 'TestIRForeignLinkField__PreMainModel1'
+class Model_CycleModel(IndexedRedisModel):
+    FIELDS = [
+        IRField('name'),
+    ]
 
-            self.models['PreMainModel'] = Model_PreMainModel
+    INDEXED_FIELDS = ['name']
+
+    KEY_NAME = 'TestIRForeignLinkField__CycleModel1'
+
+# Links to its own model, so objects can link to each other in a cycle
+Model_CycleModel.FIELDS.append(IRForeignLinkField('other', Model_CycleModel))
 
 
+class TestIRForeignLinkField(object):
+    '''
+        TestIRForeignLinkField - Test base64 field
+    '''
+
+    KEEP_DATA = False
+
+    # MAIN_MODEL_OVERRIDES - Tests which use a different model as "MainModel", by test name
+    MAIN_MODEL_OVERRIDES = {
+        'test_filterOnModel' : Model_MainModelIndexed,
+    }
+
+    # PRE_MAIN_MODEL_TESTS - Names of tests which also use "PreMainModel"
+    PRE_MAIN_MODEL_TESTS = ('test_cascadeSave', 'test_cascadeSaveMany', 'test_cascadeFetch', 'test_cascadeFetchMany', 'test_siblingFetch', 'test_reload')
+
+    def setup_method(self, testMethod):
+        '''
+            setup_method - Called before every method. Should set "self.model" to the model needed for the test.
+  
+            @param testMethod - Instance method of test about to be called.
+        '''
+        testName = testMethod.__name__
+
+        self.models = {
+            'RefedModel' : Model_RefedModel,
+            'MainModel' : self.MAIN_MODEL_OVERRIDES.get(testName, Model_MainModel),
+        }
+
+        if testName in self.PRE_MAIN_MODEL_TESTS:
+            self.models['PreMainModel'] = Model_PreMainModel
+
         # If KEEP_DATA is False (debug flag), then delete all objects before so prior test doesn't interfere
         if self.KEEP_DATA is False and self.models:
-            for model in self.models.values():
-                model.deleter.destroyModel()
+            # Queue all onto one pipeline, so it is one round trip
+            models = list(self.models.values())
+            pipeline = models[0].deleter._get_connection().pipeline()
+            for model in models:
+                model.deleter.destroyModel(pipeline)
+            pipeline.execute()
 
     def teardown_method(self, testMethod):
         '''
@@ -105,8 +134,12 @@ class TestIRForeignLinkField(object):
         '''
 
         if self.KEEP_DATA is False and self.models:
-            for model in self.models.values():
-                model.deleter.destroyModel()
+            # Queue all onto one pipeline, so it is one round trip
+            models = list(self.models.values())
+            pipeline = models[0].deleter._get_connection().pipeline()
+            for model in models:
+                model.deleter.destroyModel(pipeline)
+            pipeline.execute()
 
 
     def test_general(self):
@@ -268,11 +301,12 @@ class TestIRForeignLinkField(object):
         refObj1 = RefedModel(name='rone', strVal='hello', intVal=1)
         refObj2 = RefedModel(name='rtwo', strVal='world', intVal=2)
 
-        ids1 = refObj1.save(cascadeSave=False)
-        assert ids1 and ids1[0] , 'Failed to save object'
+        # The two saves are independent, so save them together (one round trip)
+        ids = RefedModel.saver.save( [refObj1, refObj2], cascadeSave=False )
+        assert len(ids) == 2 and ids[0] and ids[1] , 'Failed to save objects'
 
-        ids2 = refObj2.save(cascadeSave=False)
-        assert ids2 and ids2[0] , 'Failed to save object'
+        ids1 = [ ids[0] ]
+        ids2 = [ ids[1] ]
 
         mainObj = MainModel(name='one', value='cheese', other=ids1[0])
 
@@ -308,7 +342,23 @@ class TestIRForeignLinkField(object):
         assert fetchedObj , 'Failed to fetch object'
 
         assert fetchedObj.other__id == ids1[0] , 'Expected save using Model object would work properly. Did not fetch correct id after save.'
-        
+
+        # Reassigning the same object, or its pk, should keep the current link and fetched object
+        otherLink = object.__getattribute__(mainObj, 'other')
+
+        mainObj.other = firstRefObj
+        assert object.__getattribute__(mainObj, 'other') is otherLink , 'Expected reassigning the same object to keep the current link'
+
+        mainObj.other = ids1[0]
+        assert object.__getattribute__(mainObj, 'other') is otherLink , 'Expected assigning the same pk to keep the current link'
+        assert mainObj.other is firstRefObj , 'Expected assigning the same pk to keep the fetched object'
+        assert not mainObj.hasUnsavedChanges() , 'Expected no unsaved changes after reassigning the same link'
+
+        mainObj.other = str(ids2[0])
+        assert object.__getattribute__(mainObj, 'other') is not otherLink , 'Expected assigning a different pk to create a new link'
+        assert mainObj.other__id == ids2[0] , 'Expected assigning a different pk to link to that pk'
+        assert mainObj.hasUnsavedChanges() , 'Expected unsaved changes after linking to a different object'
+
     def test_filterOnModel(self):
         MainModel = self.models['MainModel']
         RefedModel = self.models['RefedModel']
@@ -316,11 +366,12 @@ class TestIRForeignLinkField(object):
         refObj1 = RefedModel(name='rone', strVal='hello', intVal=1)
         refObj2 = RefedModel(name='rtwo', strVal='world', intVal=2)
 
-        ids1 = refObj1.save(cascadeSave=False)
-        assert ids1 and ids1[0] , 'Failed to save object'
+        # The two saves are independent, so save them together (one round trip)
+        ids = RefedModel.saver.save( [refObj1, refObj2], cascadeSave=False )
+        assert len(ids) == 2 and ids[0] and ids[1] , 'Failed to save objects'
 
-        ids2 = refObj2.save(cascadeSave=False)
-        assert ids2 and ids2[0] , 'Failed to save object'
+        ids1 = [ ids[0] ]
+        ids2 = [ ids[1] ]
 
         mainObj = MainModel(name='one', value='cheese', other=ids1[0])
 
@@ -343,6 +394,32 @@ class TestIRForeignLinkField(object):
 
         assert fetchedObjs and len(fetchedObjs) == 1 , 'Expected to be able to filter on object itself'
 
+        fetchedObjs = MainModel.objects.filter(other=str(ids2[0])).all()
+
+        assert fetchedObjs and len(fetchedObjs) == 1 , 'Expected to be able to filter on pk as a string'
+
+        fetchedObjs = MainModel.objects.filter(other=object.__getattribute__(fetchedObjs[0], 'other')).all()
+
+        assert fetchedObjs and len(fetchedObjs) == 1 , 'Expected to be able to filter on the link of a fetched object'
+
+        assert MainModel.objects.filter(other=ids1[0]).count() == 0 , 'Expected no match on the previously linked pk'
+
+        # reindex converts from the stored (string) value
+        MainModel.objects.reindex()
+
+        fetchedObjs = MainModel.objects.filter(other=refObj2).all()
+
+        assert fetchedObjs and len(fetchedObjs) == 1 , 'Expected to be able to filter on object after reindex'
+
+        mainObj2 = MainModel(name='two', value='crackers')
+        mainObj2.save(cascadeSave=False)
+
+        MainModel.objects.reindex()
+
+        fetchedObjs = MainModel.objects.filter(other=irNull).all()
+
+        assert fetchedObjs and len(fetchedObjs) == 1 and fetchedObjs[0].name == 'two' , 'Expected to be able to filter on unset link after reindex'
+
 
 
     def test_cascadeSave(self):
@@ -398,6 +475,289 @@ class TestIRForeignLinkField(object):
         assert obj.main.other.name == 'rone' , 'Failed to save values two levels down'
 
 
+    def test_cascadeSaveMany(self):
+        '''
+            test_cascadeSaveMany - Test that cascadeSave on many objects saves each foreign model together
+        '''
+        MainModel = self.models['MainModel']
+        RefedModel = self.models['RefedModel']
+        PreMainModel = self.models['PreMainModel']
+
+        sharedRefObj = RefedModel(name='rshared', strVal='hello', intVal=0)
+
+        preMainObjs = []
+        for i in range(4):
+            if i < 2:
+                refObj = sharedRefObj
+            else:
+                refObj = RefedModel(name='r%d' %(i,), strVal='hello', intVal=i)
+
+            mainObj = MainModel(name='m%d' %(i,), value='cheese', other=refObj)
+            preMainObjs.append( PreMainModel(name='p%d' %(i,), value='bologna', main=mainObj) )
+
+        allocatedModels = []
+        origGetNextIDs = IndexedRedisSave._getNextIDs
+
+        def _countingGetNextIDs(saver, count, conn=None):
+            allocatedModels.append(saver.mdl)
+            return origGetNextIDs(saver, count, conn)
+
+        IndexedRedisSave._getNextIDs = _countingGetNextIDs
+        try:
+            ids = PreMainModel.saver.save(preMainObjs, cascadeSave=True)
+        finally:
+            IndexedRedisSave._getNextIDs = origGetNextIDs
+
+        assert len(ids) == 4 and all(ids) , 'Failed to save objects. Got: %s' %(repr(ids), )
+
+        assert sorted([ mdl.__name__ for mdl in allocatedModels ]) == ['Model_MainModel', 'Model_PreMainModel', 'Model_RefedModel'] , 'Expected new pks to be allocated once per model. Got: %s' %(repr(allocatedModels), )
+
+        assert RefedModel.objects.count() == 3 , 'Expected an object linked twice to be saved once. Got %d RefedModel objects' %(RefedModel.objects.count(), )
+        assert MainModel.objects.count() == 4 , 'Expected all MainModel objects to be saved. Got: %d' %(MainModel.objects.count(), )
+
+        for i in range(4):
+            obj = PreMainModel.objects.filter(name='p%d' %(i,)).first()
+
+            assert obj , 'Failed to fetch object by name'
+            assert obj.main.name == 'm%d' %(i,) , 'Expected the right object linked one level down. Got: %s' %(repr(obj.main.name), )
+
+            if i < 2:
+                assert obj.main.other._id == sharedRefObj._id , 'Expected the shared object linked two levels down'
+            else:
+                assert obj.main.other.intVal == i , 'Expected the right object linked two levels down. Got: %s' %(repr(obj.main.other.intVal), )
+
+    def test_cascadeFetchMany(self):
+        '''
+            test_cascadeFetchMany - Test that cascadeFetch on many objects fetches each level of links together
+        '''
+        MainModel = self.models['MainModel']
+        RefedModel = self.models['RefedModel']
+        PreMainModel = self.models['PreMainModel']
+
+        numObjs = 5
+        for i in range(numObjs):
+            refObj = RefedModel(name='r%d' %(i,), strVal='hello%d' %(i,), intVal=i)
+            mainObj = MainModel(name='m%d' %(i,), value='cheese', other=refObj)
+            preMainObj = PreMainModel(name='p%d' %(i,), value='bologna', main=mainObj)
+            assert preMainObj.save(cascadeSave=True) , 'Failed to save objects'
+
+        # A PreMainModel with no link, and one linking to a MainModel which was deleted
+        assert PreMainModel(name='pNone', value='x').save() , 'Failed to save object without link'
+        missingMainObj = MainModel(name='mMissing', value='gone')
+        missingMainObj.save()
+        assert PreMainModel(name='pMissing', value='x', main=missingMainObj._id).save() , 'Failed to save object linking a missing object'
+        missingMainObj.delete()
+
+        objs = PreMainModel.objects.all(cascadeFetch=False)
+        assert len(objs) == numObjs + 2 , 'Expected to fetch %d objects, got %d' %(numObjs + 2, len(objs))
+
+        fetchCounts = {}
+        origGetMultiple = IndexedRedisQuery.getMultiple
+        def _countingGetMultiple(query, pks, cascadeFetch=False):
+            fetchCounts[query.mdl] = fetchCounts.get(query.mdl, 0) + 1
+            return origGetMultiple(query, pks, cascadeFetch=cascadeFetch)
+
+        IndexedRedisQuery.getMultiple = _countingGetMultiple
+        try:
+            IndexedRedisQuery._doCascadeFetchMany(objs)
+        finally:
+            IndexedRedisQuery.getMultiple = origGetMultiple
+
+        assert fetchCounts == { MainModel : 1, RefedModel : 1 } , 'Expected one fetch per level of links. Got: %s' %(repr(fetchCounts), )
+
+        oga = object.__getattribute__
+        for obj in objs:
+            if obj.name == 'pNone':
+                assert obj.main == irNull , 'Expected object without link to have irNull link'
+                continue
+            if obj.name == 'pMissing':
+                assert not oga(obj, 'main').obj , 'Expected link to missing object to not be fetched'
+                continue
+
+            i = int(obj.name[1:])
+            mainLink = oga(obj, 'main')
+            assert mainLink.isFetched() is True and mainLink.obj.name == 'm%d' %(i,) , 'Expected cascadeFetch to fetch the right sub object one level down'
+
+            otherLink = oga(mainLink.obj, 'other')
+            assert otherLink.isFetched() is True and otherLink.obj.name == 'r%d' %(i,) and otherLink.obj.intVal == i , 'Expected cascadeFetch to fetch the right sub object two levels down'
+
+        # all(cascadeFetch=True) should cascade over the whole result set at once too
+        fetchCounts.clear()
+        IndexedRedisQuery.getMultiple = _countingGetMultiple
+        try:
+            objs = PreMainModel.objects.all(cascadeFetch=True)
+        finally:
+            IndexedRedisQuery.getMultiple = origGetMultiple
+
+        assert fetchCounts == { PreMainModel : 1, MainModel : 1, RefedModel : 1 } , 'Expected all(cascadeFetch=True) to do one fetch per level. Got: %s' %(repr(fetchCounts), )
+
+        fetchedNames = sorted( [ oga(oga(obj, 'main').obj, 'other').obj.name for obj in objs if obj.name not in ('pNone', 'pMissing') ] )
+        assert fetchedNames == [ 'r%d' %(i,) for i in range(numObjs) ] , 'Expected all(cascadeFetch=True) to fetch two levels down. Got: %s' %(repr(fetchedNames), )
+
+    def test_siblingFetch(self):
+        '''
+            test_siblingFetch - Test that accessing a link on one of several objects fetched together fetches that link on all of them at once
+        '''
+        MainModel = self.models['MainModel']
+        RefedModel = self.models['RefedModel']
+        PreMainModel = self.models['PreMainModel']
+
+        numObjs = 5
+        for i in range(numObjs):
+            refObj = RefedModel(name='r%d' %(i,), strVal='hello%d' %(i,), intVal=i)
+            mainObj = MainModel(name='m%d' %(i,), value='cheese', other=refObj)
+            preMainObj = PreMainModel(name='p%d' %(i,), value='bologna', main=mainObj)
+            assert preMainObj.save(cascadeSave=True) , 'Failed to save objects'
+
+        assert PreMainModel(name='pNone', value='x').save() , 'Failed to save object without link'
+
+        # Two objects linking the same object should each get their own copy
+        assert PreMainModel(name='pDup', value='x', main=MainModel.objects.filter(name='m0').first()).save() , 'Failed to save object with duplicate link'
+
+        objs = PreMainModel.objects.all()
+
+        fetchCounts = {}
+        origGet = IndexedRedisQuery.get
+        origGetMultiple = IndexedRedisQuery.getMultiple
+        def _countingGet(query, pk, cascadeFetch=False):
+            fetchCounts[(query.mdl, 'get')] = fetchCounts.get((query.mdl, 'get'), 0) + 1
+            return origGet(query, pk, cascadeFetch=cascadeFetch)
+        def _countingGetMultiple(query, pks, cascadeFetch=False):
+            fetchCounts[query.mdl] = fetchCounts.get(query.mdl, 0) + 1
+            return origGetMultiple(query, pks, cascadeFetch=cascadeFetch)
+
+        IndexedRedisQuery.get = _countingGet
+        IndexedRedisQuery.getMultiple = _countingGetMultiple
+        try:
+            intVals = {}
+            for obj in objs:
+                if obj.name == 'pNone':
+                    assert obj.main == irNull , 'Expected object without link to have irNull link'
+                    continue
+                intVals[obj.name] = obj.main.other.intVal
+        finally:
+            IndexedRedisQuery.get = origGet
+            IndexedRedisQuery.getMultiple = origGetMultiple
+
+        assert fetchCounts == { MainModel : 1, RefedModel : 1 } , 'Expected one fetch per level of links. Got: %s' %(repr(fetchCounts), )
+
+        expectedIntVals = dict( [ ('p%d' %(i,), i) for i in range(numObjs) ] )
+        expectedIntVals['pDup'] = 0
+        assert intVals == expectedIntVals , 'Expected each object to get its own linked objects. Got: %s' %(repr(intVals), )
+
+        dupObj = [ obj for obj in objs if obj.name == 'pDup' ][0]
+        p0Obj = [ obj for obj in objs if obj.name == 'p0' ][0]
+        assert dupObj.main is not p0Obj.main , 'Expected objects linking the same pk to each get their own instance'
+
+        objs = PreMainModel.objects.filter(name__ne='pNone').all()
+        objs[0].main = objs[1].main
+        assert objs[0].main.name == objs[1].main.name , 'Expected reassigned link to fetch'
+
+        # SIBLING_FETCH_SIZE limits how many are fetched together, and 0 fetches each on its own
+        for siblingFetchSize, expectedCounts in ( (2, { MainModel : 3 }), (0, { (MainModel, 'get') : 6 }) ):
+            PreMainModel.SIBLING_FETCH_SIZE = siblingFetchSize
+            try:
+                objs = PreMainModel.objects.filter(name__ne='pNone').all()
+            finally:
+                del PreMainModel.SIBLING_FETCH_SIZE
+
+            fetchCounts = {}
+            IndexedRedisQuery.get = _countingGet
+            IndexedRedisQuery.getMultiple = _countingGetMultiple
+            try:
+                names = sorted( [ obj.main.name for obj in objs ] )
+            finally:
+                IndexedRedisQuery.get = origGet
+                IndexedRedisQuery.getMultiple = origGetMultiple
+
+            assert names == sorted( [ 'm%d' %(i,) for i in range(numObjs) ] + ['m0'] ) , 'Expected links to be fetched with SIBLING_FETCH_SIZE=%d. Got: %s' %(siblingFetchSize, repr(names))
+            assert fetchCounts == expectedCounts , 'Expected fetches %s with SIBLING_FETCH_SIZE=%d. Got: %s' %(repr(expectedCounts), siblingFetchSize, repr(fetchCounts))
+
+        # Fewer than two unfetched links have no siblings, whatever the group size
+        objs = PreMainModel.objects.filter(name='p1').all()
+        for maxSiblings in (None, 0, 2):
+            linkSiblings( [], maxSiblings )
+            linkSiblings( [ object.__getattribute__(objs[0], 'main') ], maxSiblings )
+
+        PreMainModel.SIBLING_FETCH_SIZE = 0
+        try:
+            assert PreMainModel.objects.filter(name='p1').all()[0].main.name == 'm1' , 'Expected a single object to fetch its link with SIBLING_FETCH_SIZE=0'
+            assert not PreMainModel.objects.filter(name='noSuchName').all() , 'Expected no objects'
+        finally:
+            del PreMainModel.SIBLING_FETCH_SIZE
+
+    def test_cascadeFetchCycle(self):
+        '''
+            test_cascadeFetchCycle - Test that cascade fetching links which cycle back to an earlier object stops
+        '''
+        CycleModel = Model_CycleModel
+        CycleModel.deleter.destroyModel()
+
+        try:
+            objA = CycleModel(name='a')
+            objB = CycleModel(name='b')
+            CycleModel.saver.save( [ objA, objB ] )
+
+            objA.other = objB
+            objB.other = objA
+            CycleModel.saver.save( [ objA, objB ], cascadeSave=False)
+
+            fetchedA = CycleModel.objects.filter(name='a').first(cascadeFetch=True)
+            assert fetchedA.other.name == 'b' , 'Expected cascade fetch of a cycle to fetch the link'
+            assert fetchedA.other.other.name == 'a' , 'Expected cascade fetch of a cycle to link back'
+
+            objs = CycleModel.objects.all(cascadeFetch=True)
+            assert sorted( [ obj.other.name for obj in objs ] ) == ['a', 'b'] , 'Expected cascade fetch of all objects in a cycle to fetch their links'
+        finally:
+            CycleModel.deleter.destroyModel()
+
+    def test_destroyModelPipeline(self):
+        '''
+            test_destroyModelPipeline - Test destroying several models queued onto one pipeline
+        '''
+        MainModel = self.models['MainModel']
+        RefedModel = self.models['RefedModel']
+
+        refObj = RefedModel(name='rone', strVal='hello', intVal=1)
+        mainObj = MainModel(name='one', value='cheese', other=refObj)
+        assert mainObj.save(cascadeSave=True) , 'Failed to save objects'
+
+        assert MainModel.objects.count() == 1 and RefedModel.objects.count() == 1 , 'Expected objects to be saved'
+
+        pipeline = MainModel.deleter._get_connection().pipeline()
+        assert MainModel.deleter.destroyModel(pipeline) is None , 'Expected destroyModel with a pipeline to return None'
+        RefedModel.deleter.destroyModel(pipeline)
+
+        assert MainModel.objects.count() == 1 , 'Expected destroyModel with a pipeline to not run until executed'
+
+        numKeysDeleted = pipeline.execute()
+        assert len(numKeysDeleted) == 2 and all(numKeysDeleted) , 'Expected each destroy to delete some keys. Got: %s' %(repr(numKeysDeleted), )
+
+        assert MainModel.objects.count() == 0 and RefedModel.objects.count() == 0 , 'Expected both models destroyed after execute'
+
+    def test_destroyModelManyKeys(self):
+        '''
+            test_destroyModelManyKeys - Test destroying a model with more keys than are deleted in one batch
+        '''
+        MainModel = self.models['MainModel']
+        RefedModel = self.models['RefedModel']
+
+        refObjs = [ RefedModel(name='r%d' %(i, ), strVal='hello', intVal=i) for i in range(1200) ]
+        RefedModel.saver.save(refObjs)
+
+        mainObj = MainModel(name='one', value='cheese', other=refObjs[0])
+        assert mainObj.save() , 'Failed to save object'
+
+        assert RefedModel.objects.count() == 1200 , 'Expected objects to be saved'
+
+        numKeysDeleted = RefedModel.deleter.destroyModel()
+        assert numKeysDeleted > 1200 , 'Expected a hash key per object plus index keys to be deleted. Got: %s' %(repr(numKeysDeleted), )
+
+        assert RefedModel.objects.count() == 0 , 'Expected all objects destroyed'
+        assert MainModel.objects.count() == 1 , 'Expected other models to be left alone'
+
+        assert RefedModel.deleter.destroyModel() == 0 , 'Expected nothing left to delete'
+
     def test_reload(self):
         MainModel = self.models['MainModel']
         RefedModel = self.models['RefedModel']
@@ -553,6 +913,14 @@ class TestIRForeignLinkField(object):
 
         assert oga(mainObj, 'other').isFetched() is False , 'Expected other to not be fetched after calling getUpdatedFields'
 
+        assert mainObj.other__id == refObj1._id , 'Expected other__id to be the pk of the foreign object. Got: %s' %(repr(mainObj.other__id), )
+
+        assert oga(mainObj, 'other').isFetched() is False , 'Expected other to not be fetched after accessing other__id'
+
+        assert mainObj.other.name == 'rone' , 'Expected accessing other to fetch the foreign object'
+
+        assert oga(mainObj, 'other').isFetched() is True , 'Expected other to be fetched after accessing it'
+
 
     def test_unsavedChanges(self):
         MainModel = self.models['MainModel']
@@ -592,8 +960,49 @@ class TestIRForeignLinkField(object):
 
         assert mainObj.hasSameValues(mainObj2, cascadeObject=False) , 'Expected changing a foreign link field\'s data on one object would leave hasSameValues(... , cascadeObject=False) to be True'
 
+        updatedFields = mainObj.getUpdatedFields()
+        assert not updatedFields , 'Expected changing a foreign object\'s data to not be an update of the link when not cascading. Got: %s' %(repr(updatedFields), )
+
+        updatedFields = mainObj.getUpdatedFields(cascadeObjects=True)
+        assert list(updatedFields.keys()) == ['other'] , 'Expected changing a foreign object\'s data to be an update of the link when cascading. Got: %s' %(repr(updatedFields), )
+
+    def test_updatedFieldsUnlinked(self):
+        MainModel = self.models['MainModel']
+        RefedModel = self.models['RefedModel']
+
+        oga = object.__getattribute__
+
+        mainObj = MainModel(name='one', value='cheese')
+
+        updatedFields = mainObj.getUpdatedFields(cascadeObjects=True)
+        assert not updatedFields , 'Expected no updated fields with foreign link unset. Got: %s' %(repr(updatedFields), )
+
+        refObj1 = RefedModel(name='rone', strVal='hello', intVal=1)
+        mainObj.other = refObj1
+
+        updatedFields = mainObj.getUpdatedFields()
+        assert list(updatedFields.keys()) == ['other'] , 'Expected linking an unsaved object to be an update. Got: %s' %(repr(updatedFields), )
+
+        ids = mainObj.save(cascadeSave=True)
+        assert ids and ids[0] , 'Failed to save object'
+
+        mainObj = MainModel.objects.first()
+
+        mainObj.other = refObj1._id
+
+        updatedFields = mainObj.getUpdatedFields(cascadeObjects=True)
+        assert not updatedFields , 'Expected setting the same pk to not be an update. Got: %s' %(repr(updatedFields), )
+
+        assert oga(mainObj, 'other').isFetched() is False , 'Expected getUpdatedFields to not fetch the foreign object'
+
+        mainObj.other = None
+
+        updatedFields = mainObj.getUpdatedFields(cascadeObjects=True)
+        assert list(updatedFields.keys()) == ['other'] , 'Expected unlinking to be an update. Got: %s' %(repr(updatedFields), )
+        assert updatedFields['other'][1] == irNull , 'Expected new value of unlinked field to be irNull. Got: %s' %(repr(updatedFields['other'][1]), )
+
 
 if __name__ == '__main__':
-    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+    os.execvp('GoodTests.py', ['GoodTests.py', '-n1', sys.argv[0]] + sys.argv[1:])
 
 # vim: set ts=4 sw=4 expandtab
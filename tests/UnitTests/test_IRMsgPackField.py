@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# TestIRMsgPackField - GoodTests unit tests validating IRMsgPackField
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+# vim: set ts=4 sw=4 expandtab
+
+
+import sys
+import os
+from IndexedRedis import IndexedRedisModel, InvalidModelException, irNull
+from IndexedRedis.fields import IRMsgPackField, IRField
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# vim: ts=4 sw=4 expandtab
+
+class TestIRMsgPackField(object):
+    '''
+        TestIRMsgPackField - Test IRMsgPackField
+    '''
+
+    KEEP_DATA = False
+
+    def setup_method(self, testMethod):
+        '''
+            setup_method - Called before every method. Should set "self.model" to the model needed for the test.
+
+            @param testMethod - Instance method of test about to be called.
+        '''
+        self.model = None
+
+        if msgpack is None:
+            return
+
+        class MsgPackFieldModel(IndexedRedisModel):
+
+            FIELDS = [ IRField('name'), IRMsgPackField('data'), IRMsgPackField('data2', defaultValue={'a' : 1}) ]
+            INDEXED_FIELDS = ['name']
+
+            KEY_NAME = 'Test_MsgPackFieldModel'
+
+        self.model = MsgPackFieldModel
+
+        # If KEEP_DATA is False (debug flag), then delete all objects before so prior test doesn't interfere
+        if self.KEEP_DATA is False and self.model:
+            self.model.deleter.destroyModel()
+
+    def teardown_method(self, testMethod):
+        '''
+            teardown_method - Called after every method.
+
+                If self.model is set, will delete all objects relating to that model. To retain objects for debugging, set TestIRMsgPackField.KEEP_DATA to True.
+        '''
+
+        if self.model and self.KEEP_DATA is False:
+            self.model.deleter.destroyModel()
+
+    def test_general(self):
+        if msgpack is None:
+            sys.stderr.write('NOTE: "msgpack" module is not installed. Cannot run test_general on IRMsgPackField.\n')
+            return
+
+        MsgPackFieldModel = self.model
+
+        someData = { 'strs' : ['one', 'two'], 'nums' : [1, 2.5, -3], 'bytes' : b'\x11\x22\xff', 'none' : None, 'bool' : True, 5 : 'intKey' }
+
+        myObj = MsgPackFieldModel(name='test1')
+
+        assert myObj.data == irNull , 'Expected default value of irNull'
+        assert myObj.data2 == {'a' : 1} , 'Expected defaultValue to be used'
+
+        myObj.data = someData
+
+        dictForStorage = myObj.asDict(forStorage=True, strKeys=True)
+        assert dictForStorage['data'] == msgpack.packb(someData, use_bin_type=True) , 'Expected value to be stored packed with msgpack'
+
+        assert myObj.save() , 'Failed to save object'
+
+        myObjRefetched = MsgPackFieldModel.objects.filter(name='test1').first()
+
+        assert myObjRefetched.data == someData , 'Expected fetched data to match what was saved. Got: %s' %(repr(myObjRefetched.data), )
+        assert myObjRefetched.data2 == {'a' : 1} , 'Expected fetched default value to match. Got: %s' %(repr(myObjRefetched.data2), )
+        assert not myObjRefetched.hasUnsavedChanges() , 'Expected no unsaved changes after fetch'
+
+        myObjRefetched.data['strs'].append('three')
+        myObjRefetched.data2 = (1, 2)
+
+        assert myObjRefetched.hasUnsavedChanges() , 'Expected unsaved changes after modifying data'
+
+        myObjRefetched.save()
+
+        myObjRefetched = MsgPackFieldModel.objects.filter(name='test1').first()
+
+        assert myObjRefetched.data['strs'] == ['one', 'two', 'three'] , 'Expected modified list to be saved. Got: %s' %(repr(myObjRefetched.data['strs']), )
+        assert myObjRefetched.data2 == [1, 2] , 'Expected tuple to come back as a list. Got: %s' %(repr(myObjRefetched.data2), )
+
+        myObjRefetched.data = ''
+        myObjRefetched.save()
+
+        myObjRefetched = MsgPackFieldModel.objects.filter(name='test1').first()
+
+        assert myObjRefetched.data == '' , 'Expected to be able to clear data. Got: %s' %(repr(myObjRefetched.data), )
+
+        copiedField = MsgPackFieldModel.FIELDS[2].copy()
+        assert copiedField.defaultValue == {'a' : 1} , 'Expected defaultValue to be retained on copy'
+
+    def test_notIndexable(self):
+        if msgpack is None:
+            sys.stderr.write('NOTE: "msgpack" module is not installed. Cannot run test_notIndexable on IRMsgPackField.\n')
+            return
+
+        gotException = False
+        try:
+            class MsgPackIndexedModel(IndexedRedisModel):
+
+                FIELDS = [ IRField('name'), IRMsgPackField('data') ]
+                INDEXED_FIELDS = ['name', 'data']
+
+                KEY_NAME = 'Test_MsgPackIndexedModel'
+
+            MsgPackIndexedModel.validateModel()
+        except InvalidModelException:
+            gotException = True
+
+        assert gotException , 'Expected IRMsgPackField to not be indexable'
+
+
+if __name__ == '__main__':
+    os.execvp('GoodTests.py', ['GoodTests.py', '-n1', sys.argv[0]] + sys.argv[1:])
+
+# vim: set ts=4 sw=4 expandtab
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# TestIRPackedIntField - GoodTests unit tests validating IRPackedIntField
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+# vim: set ts=4 sw=4 expandtab
+
+
+import sys
+import os
+import struct
+from IndexedRedis import IndexedRedisModel, irNull
+from IndexedRedis.fields import IRPackedIntField, IRField
+
+# vim: ts=4 sw=4 expandtab
+
+class TestIRPackedIntField(object):
+    '''
+        TestIRPackedIntField - Test IRPackedIntField
+    '''
+
+    KEEP_DATA = False
+
+    def setup_method(self, testMethod):
+        '''
+            setup_method - Called before every method. Should set "self.model" to the model needed for the test.
+
+            @param testMethod - Instance method of test about to be called.
+        '''
+
+        class PackedIntFieldModel(IndexedRedisModel):
+
+            FIELDS = [ IRField('name'), IRPackedIntField('num'), IRPackedIntField('other', defaultValue=7) ]
+            INDEXED_FIELDS = ['name', 'num']
+
+            KEY_NAME = 'Test_PackedIntFieldModel'
+
+        self.model = PackedIntFieldModel
+
+        # If KEEP_DATA is False (debug flag), then delete all objects before so prior test doesn't interfere
+        if self.KEEP_DATA is False and self.model:
+            self.model.deleter.destroyModel()
+
+    def teardown_method(self, testMethod):
+        '''
+            teardown_method - Called after every method.
+
+                If self.model is set, will delete all objects relating to that model. To retain objects for debugging, set TestIRPackedIntField.KEEP_DATA to True.
+        '''
+
+        if self.model and self.KEEP_DATA is False:
+            self.model.deleter.destroyModel()
+
+    def test_general(self):
+        PackedIntFieldModel = self.model
+
+        myObj = PackedIntFieldModel(name='one', num='42')
+
+        assert myObj.num == 42 , 'Expected input to be converted to int. Got: %s' %(repr(myObj.num), )
+        assert myObj.other == 7 , 'Expected defaultValue to be used'
+
+        dictForStorage = myObj.asDict(forStorage=True, strKeys=True)
+        assert dictForStorage['num'] == struct.pack('<q', 42) , 'Expected value to be stored packed. Got: %s' %(repr(dictForStorage['num']), )
+
+        assert myObj.save() , 'Failed to save object'
+
+        myObjRefetched = PackedIntFieldModel.objects.filter(name='one').first()
+
+        assert myObjRefetched.num == 42 , 'Expected fetched value to match what was saved. Got: %s' %(repr(myObjRefetched.num), )
+        assert myObjRefetched.other == 7 , 'Expected fetched default value to match. Got: %s' %(repr(myObjRefetched.other), )
+        assert not myObjRefetched.hasUnsavedChanges() , 'Expected no unsaved changes after fetch'
+
+        myObjRefetched.num = -(2 ** 63)
+        myObjRefetched.save()
+
+        myObjRefetched = PackedIntFieldModel.objects.filter(name='one').first()
+        assert myObjRefetched.num == -(2 ** 63) , 'Expected smallest 64-bit value to be saved. Got: %s' %(repr(myObjRefetched.num), )
+
+        gotException = False
+        try:
+            myObjRefetched.num = 2 ** 63
+            myObjRefetched.save()
+        except ValueError:
+            gotException = True
+
+        assert gotException , 'Expected ValueError saving a value which does not fit in 64 bits'
+
+        copiedField = PackedIntFieldModel.FIELDS[2].copy()
+        assert copiedField.defaultValue == 7 , 'Expected defaultValue to be retained on copy'
+
+    def test_fetchMany(self):
+        PackedIntFieldModel = self.model
+
+        PackedIntFieldModel.saver.save( [ PackedIntFieldModel(name=str(i), num=i * 1000) for i in range(5) ] + [ PackedIntFieldModel(name='null') ] )
+
+        objs = PackedIntFieldModel.objects.all()
+        nums = sorted( [ obj.num for obj in objs if obj.name != 'null' ] )
+        assert nums == [0, 1000, 2000, 3000, 4000] , 'Expected all values to be fetched. Got: %s' %(repr(nums), )
+
+        nullObj = [ obj for obj in objs if obj.name == 'null' ][0]
+        assert nullObj.num == irNull , 'Expected unset value to be irNull. Got: %s' %(repr(nullObj.num), )
+
+        objs = PackedIntFieldModel.objects.filter(name__ne='null').all()
+        nums = sorted( [ obj.num for obj in objs ] )
+        assert nums == [0, 1000, 2000, 3000, 4000] , 'Expected all values to be fetched when none are null. Got: %s' %(repr(nums), )
+
+        # Without Struct.iter_unpack (python2), each is unpacked on its own
+        from IndexedRedis.fields import packed_int as packedIntMod
+        origIterUnpack = packedIntMod._iterUnpack
+        packedIntMod._iterUnpack = None
+        try:
+            objs = PackedIntFieldModel.objects.filter(name__ne='null').all()
+        finally:
+            packedIntMod._iterUnpack = origIterUnpack
+
+        nums = sorted( [ obj.num for obj in objs ] )
+        assert nums == [0, 1000, 2000, 3000, 4000] , 'Expected all values to be fetched without iter_unpack. Got: %s' %(repr(nums), )
+
+    def test_filter(self):
+        PackedIntFieldModel = self.model
+
+        PackedIntFieldModel.saver.save( [ PackedIntFieldModel(name='a', num=5), PackedIntFieldModel(name='b', num=-5), PackedIntFieldModel(name='c') ] )
+
+        objs = PackedIntFieldModel.objects.filter(num=5).all()
+        assert [ obj.name for obj in objs ] == ['a'] , 'Expected to filter on an int value'
+
+        objs = PackedIntFieldModel.objects.filter(num='-5').all()
+        assert [ obj.name for obj in objs ] == ['b'] , 'Expected to filter on a string value'
+
+        objs = PackedIntFieldModel.objects.filter(num=irNull).all()
+        assert [ obj.name for obj in objs ] == ['c'] , 'Expected to filter on irNull'
+
+        # 8 characters, the same length as the packed form
+        PackedIntFieldModel(name='d', num=12345678).save()
+        PackedIntFieldModel(name='e', num=-1234567).save()
+
+        objs = PackedIntFieldModel.objects.filter(num='12345678').all()
+        assert [ obj.name for obj in objs ] == ['d'] , 'Expected to filter on an 8-digit string value'
+
+        objs = PackedIntFieldModel.objects.filter(num=b'-1234567').all()
+        assert [ obj.name for obj in objs ] == ['e'] , 'Expected to filter on an 8-character bytes value'
+
+        PackedIntFieldModel.objects.reindex()
+
+        objs = PackedIntFieldModel.objects.filter(num=-5).all()
+        assert [ obj.name for obj in objs ] == ['b'] , 'Expected to filter on an int value after reindex'
+
+        objs = PackedIntFieldModel.objects.filter(num='12345678').all()
+        assert [ obj.name for obj in objs ] == ['d'] , 'Expected to filter on an 8-digit string value after reindex'
+
+
+if __name__ == '__main__':
+    os.execvp('GoodTests.py', ['GoodTests.py', '-n1', sys.argv[0]] + sys.argv[1:])
+
+# vim: set ts=4 sw=4 expandtab
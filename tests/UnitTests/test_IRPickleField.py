@@ -12,9 +12,11 @@ import TestProperties
 
 
 import sys
-import subprocess
+import os
+import pickle
 from IndexedRedis import IndexedRedisModel
 from IndexedRedis.fields import IRPickleField, IRField
+from IndexedRedis.fields.pickle_field import DEFAULT_PICKLE_PROTOCOL
 
 # vim: ts=4 sw=4 expandtab
 
@@ -44,6 +46,16 @@ class TestIRField(object):
 
             self.model = SimpleIRFieldModel
 
+        elif testMethod == self.test_pickleProtocol:
+            class PickleProtocolModel(IndexedRedisModel):
+
+                FIELDS = [ IRField('name'), IRPickleField('data'), IRPickleField('data2', pickleProtocol=2) ]
+                INDEXED_FIELDS = ['name']
+
+                KEY_NAME = 'Test_PickleProtocolModel'
+
+            self.model = PickleProtocolModel
+
         # If KEEP_DATA is False (debug flag), then delete all objects before so prior test doesn't interfere
         if self.KEEP_DATA is False and self.model:
             self.model.deleter.destroyModel()
@@ -158,8 +170,44 @@ class TestIRField(object):
 
         
 
+    def test_pickleProtocol(self):
+        '''
+            test_pickleProtocol - Test that the pickle protocol can be set, and data from any protocol can be read
+        '''
+        PickleProtocolModel = self.model
+
+        someData = { 'one' : [1, 2, 3], 'two' : b'\x11\x22\x33' }
+
+        myObj = PickleProtocolModel(name='test1', data=someData, data2=someData)
+
+        dictForStorage = myObj.asDict(forStorage=True, strKeys=True)
+
+        assert dictForStorage['data'] == pickle.dumps(someData, protocol=DEFAULT_PICKLE_PROTOCOL) , 'Expected default field to use DEFAULT_PICKLE_PROTOCOL'
+        assert dictForStorage['data2'] == pickle.dumps(someData, protocol=2) , 'Expected field with pickleProtocol=2 to use protocol 2'
+
+        myObj.save()
+
+        myObjRefetched = PickleProtocolModel.objects.filter(name='test1').first()
+
+        assert myObjRefetched.data == someData , 'Expected to fetch data pickled with default protocol. Got: %s' %(repr(myObjRefetched.data), )
+        assert myObjRefetched.data2 == someData , 'Expected to fetch data pickled with protocol 2. Got: %s' %(repr(myObjRefetched.data2), )
+
+        defaultField = PickleProtocolModel.FIELDS[1]
+        for protocol in range(0, pickle.HIGHEST_PROTOCOL + 1):
+            assert defaultField.fromStorage(pickle.dumps(someData, protocol=protocol)) == someData , 'Expected to be able to read data pickled with protocol %d' %(protocol, )
+
+        assert PickleProtocolModel.FIELDS[2].copy().pickleProtocol == 2 , 'Expected pickleProtocol to be retained on copy'
+
+        gotException = False
+        try:
+            IRPickleField('data', pickleProtocol=pickle.HIGHEST_PROTOCOL + 1)
+        except ValueError:
+            gotException = True
+
+        assert gotException , 'Expected ValueError on unsupported pickleProtocol'
+
 
 if __name__ == '__main__':
-    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+    os.execvp('GoodTests.py', ['GoodTests.py', '-n1', sys.argv[0]] + sys.argv[1:])
 
 # vim: set ts=4 sw=4 expandtab
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# TestIdentityMap - GoodTests unit tests validating models with IDENTITY_MAP
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+# vim: set ts=4 sw=4 expandtab
+
+
+import gc
+import sys
+import os
+
+import redis
+
+import IndexedRedis
+
+from IndexedRedis import IndexedRedisModel, IndexedRedisQuery
+from IndexedRedis.fields import IRField, IRForeignLinkField
+
+# vim: ts=4 sw=4 expandtab
+
+class IdentityMapModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('num', valueType=int) ]
+    INDEXED_FIELDS = ['name']
+
+    KEY_NAME = 'Test_IdentityMapModel'
+
+    IDENTITY_MAP = True
+
+
+class IdentityMapLinkModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRForeignLinkField('other', IdentityMapModel) ]
+    INDEXED_FIELDS = ['name']
+
+    KEY_NAME = 'Test_IdentityMapLinkModel'
+
+
+class IdentityMapCycleModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name') ]
+    INDEXED_FIELDS = ['name']
+
+    KEY_NAME = 'Test_IdentityMapCycleModel'
+
+    IDENTITY_MAP = True
+
+# Links to its own model, so objects can link to each other in a cycle
+IdentityMapCycleModel.FIELDS.append(IRForeignLinkField('other', IdentityMapCycleModel))
+
+
+class TestIdentityMap(object):
+    '''
+        TestIdentityMap - Test models with IDENTITY_MAP = True
+    '''
+
+    KEEP_DATA = False
+
+    def setup_method(self, testMethod):
+        '''
+            setup_method - Called before every method.
+
+            @param testMethod - Instance method of test about to be called.
+        '''
+        self.models = [ IdentityMapModel, IdentityMapLinkModel, IdentityMapCycleModel ]
+
+        self.numFetches = 0
+        self._origFetchOne = IndexedRedisQuery._fetchOne
+        self._origFetchMultiple = IndexedRedisQuery._fetchMultiple
+
+        # Count the object fetches which go to Redis
+        def _countingFetchOne(query, *args, **kwargs):
+            self.numFetches += 1
+            return self._origFetchOne(query, *args, **kwargs)
+
+        def _countingFetchMultiple(query, *args, **kwargs):
+            self.numFetches += 1
+            return self._origFetchMultiple(query, *args, **kwargs)
+
+        IndexedRedisQuery._fetchOne = _countingFetchOne
+        IndexedRedisQuery._fetchMultiple = _countingFetchMultiple
+
+        # If KEEP_DATA is False (debug flag), then delete all objects before so prior test doesn't interfere
+        if self.KEEP_DATA is False:
+            for model in self.models:
+                model.deleter.destroyModel()
+
+    def teardown_method(self, testMethod):
+        '''
+            teardown_method - Called after every method.
+
+                Will delete all objects relating to the models. To retain objects for debugging, set TestIdentityMap.KEEP_DATA to True.
+        '''
+        IndexedRedisQuery._fetchOne = self._origFetchOne
+        IndexedRedisQuery._fetchMultiple = self._origFetchMultiple
+
+        if self.KEEP_DATA is False:
+            for model in self.models:
+                model.deleter.destroyModel()
+
+    def test_sameInstance(self):
+        myObj = IdentityMapModel(name='one', num=1)
+        myObj.save()
+
+        assert IdentityMapModel.objects.get(myObj._id) is myObj , 'Expected get to return the saved instance'
+        assert IdentityMapModel.objects.filter(name='one').first() is myObj , 'Expected first to return the saved instance'
+        assert self.numFetches == 0 , 'Expected no fetches for an instance which is already loaded. Got %d' %(self.numFetches, )
+
+        otherObj = IdentityMapModel(name='two', num=2)
+        otherObj.save()
+
+        objs = IdentityMapModel.objects.all()
+        assert sorted( [ obj.name for obj in objs ] ) == ['one', 'two'] , 'Expected all to return all objects'
+        assert sorted( [ id(obj) for obj in objs ] ) == sorted( [ id(myObj), id(otherObj) ] ) , 'Expected all to return the loaded instances'
+        assert self.numFetches == 0 , 'Expected no fetches for instances which are already loaded. Got %d' %(self.numFetches, )
+
+        # Once no longer referenced, it is fetched again (once)
+        otherId = otherObj._id
+        del otherObj, objs
+        gc.collect()
+
+        otherObj = IdentityMapModel.objects.get(otherId)
+        assert otherObj.name == 'two' , 'Expected object to be fetched after it was no longer referenced'
+        objs = IdentityMapModel.objects.getMultiple( [ myObj._id, otherId ] )
+        assert objs[0] is myObj and objs[1] is otherObj , 'Expected getMultiple to return the loaded instances'
+        assert self.numFetches == 1 , 'Expected one fetch for an instance which was no longer referenced. Got %d' %(self.numFetches, )
+
+    def test_reloadAndDelete(self):
+        myObj = IdentityMapModel(name='one', num=1)
+        myObj.save()
+        myId = myObj._id
+
+        myObj.num = 5
+        assert IdentityMapModel.objects.get(myId).num == 5 , 'Expected the loaded instance, with its unsaved change'
+
+        updatedFields = myObj.reload()
+        assert updatedFields == { 'num' : (5, 1) } , 'Expected reload to still fetch from Redis. Got: %s' %(repr(updatedFields), )
+
+        myObj.delete()
+
+        assert IdentityMapModel.objects.get(myId) is None , 'Expected deleted object to be forgotten'
+
+    def test_foreignLinks(self):
+        refObj = IdentityMapModel(name='ref', num=1)
+        refObj.save()
+
+        linkObjs = [ IdentityMapLinkModel(name='link%d' %(i, ), other=refObj._id) for i in range(3) ]
+        IdentityMapLinkModel.saver.save(linkObjs)
+
+        linkObjs = IdentityMapLinkModel.objects.all()
+        self.numFetches = 0
+
+        assert [ linkObj.other for linkObj in linkObjs ] == [ refObj, refObj, refObj ] , 'Expected links to resolve to the loaded instance'
+        assert linkObjs[0].other is refObj , 'Expected links to resolve to the loaded instance'
+        assert self.numFetches == 0 , 'Expected no fetches for links to a loaded instance. Got %d' %(self.numFetches, )
+
+    def test_cascadeFetchCycle(self):
+        objA = IdentityMapCycleModel(name='a')
+        objB = IdentityMapCycleModel(name='b')
+        IdentityMapCycleModel.saver.save( [ objA, objB ] )
+
+        objA.other = objB
+        objB.other = objA
+        IdentityMapCycleModel.saver.save( [ objA, objB ], cascadeSave=False)
+
+        fetchedA = IdentityMapCycleModel.objects.filter(name='a').first(cascadeFetch=True)
+        assert fetchedA is objA , 'Expected the loaded instance'
+        assert fetchedA.other is objB and fetchedA.other.other is objA , 'Expected cascade fetch of a cycle to resolve to the loaded instances'
+
+        # And when the instances are not loaded
+        del objA, objB, fetchedA
+        gc.collect()
+
+        fetchedA = IdentityMapCycleModel.objects.filter(name='a').first(cascadeFetch=True)
+        assert fetchedA.other.name == 'b' , 'Expected cascade fetch of a cycle to fetch the link'
+        assert fetchedA.other.other is fetchedA , 'Expected the link back to be the same instance'
+
+    def test_getInvalidPk(self):
+        assert IdentityMapModel.objects.get(None) is None , 'Expected get of None to return None'
+        assert IdentityMapModel.objects.get('') is None , 'Expected get of an empty pk to return None'
+
+    def test_saveToExternal(self):
+        myObj = IdentityMapModel(name='one', num=1)
+        myObj.save()
+
+        # An external Redis, on another db of the same server
+        externalParams = dict(TestProperties.REDIS_CONNECTION_PARAMS)
+        externalParams['db'] += 1
+        externalParams.pop('connection_pool', None)
+
+        # Allocate a pk in the external Redis which is the same as the loaded instance's
+        externalConn = redis.Redis(**externalParams)
+        externalIdsKey = IdentityMapModel.saver._get_next_id_key()
+        externalConn.set(externalIdsKey, int(myObj._id) - 1)
+
+        try:
+            myObj.saveToExternal(externalConn)
+
+            assert IdentityMapModel.objects.get(myObj._id) is myObj , 'Expected saveToExternal to not replace the loaded instance'
+        finally:
+            for key in externalConn.scan_iter(match=IndexedRedis.INDEXED_REDIS_PREFIX + IdentityMapModel.KEY_NAME + ':*'):
+                externalConn.delete(key)
+
+    def test_notEnabled(self):
+        linkObj = IdentityMapLinkModel(name='link')
+        linkObj.save()
+
+        assert IdentityMapLinkModel.objects.get(linkObj._id) is not linkObj , 'Expected a new instance without IDENTITY_MAP'
+
+
+if __name__ == '__main__':
+    os.execvp('GoodTests.py', ['GoodTests.py', '-n1', sys.argv[0]] + sys.argv[1:])
+
+# vim: set ts=4 sw=4 expandtab
@@ -12,7 +12,7 @@ import TestProperties
 
 import base64
 import sys
-import subprocess
+import os
 
 from IndexedRedis import IndexedRedisModel, irNull
 from IndexedRedis.compat_str import tobytes
@@ -101,8 +101,12 @@ class TestDiffModels(object):
 
         # If KEEP_DATA is False (debug flag), then delete all objects before so prior test doesn't interfere
         if self.KEEP_DATA is False and self.models:
-            for model in self.models.values():
-                model.deleter.destroyModel()
+            # Queue all onto one pipeline, so it is one round trip
+            models = list(self.models.values())
+            pipeline = models[0].deleter._get_connection().pipeline()
+            for model in models:
+                model.deleter.destroyModel(pipeline)
+            pipeline.execute()
 
     def teardown_method(self, testMethod):
         '''
@@ -112,8 +116,12 @@ class TestDiffModels(object):
         '''
 
         if self.KEEP_DATA is False and self.models:
-            for model in self.models.values():
-                model.deleter.destroyModel()
+            # Queue all onto one pipeline, so it is one round trip
+            models = list(self.models.values())
+            pipeline = models[0].deleter._get_connection().pipeline()
+            for model in models:
+                model.deleter.destroyModel(pipeline)
+            pipeline.execute()
 
 
 
@@ -189,6 +197,6 @@ class TestDiffModels(object):
 
 
 if __name__ == '__main__':
-    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+    os.execvp('GoodTests.py', ['GoodTests.py', '-n1', sys.argv[0]] + sys.argv[1:])
 
 # vim: set ts=4 sw=4 expandtab
@@ -11,7 +11,7 @@ import TestProperties
 # vim: set ts=4 sw=4 expandtab
 
 import sys
-import subprocess
+import os
 from IndexedRedis import IndexedRedisModel, IRField, InvalidModelException, validatedModels
 
 # vim: ts=4 sw=4 expandtab
@@ -151,6 +151,6 @@ class TestModelValidation(object):
 
             
 if __name__ == '__main__':
-    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+    os.execvp('GoodTests.py', ['GoodTests.py', '-n1', sys.argv[0]] + sys.argv[1:])
 
 # vim: set ts=4 sw=4 expandtab
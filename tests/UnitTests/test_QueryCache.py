@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# TestQueryCache - GoodTests unit tests validating allCached and firstCached
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+# vim: set ts=4 sw=4 expandtab
+
+
+import sys
+import os
+
+from IndexedRedis import IndexedRedisModel, IndexedRedisQuery
+from IndexedRedis.fields import IRField
+
+# vim: ts=4 sw=4 expandtab
+
+class TestQueryCache(object):
+    '''
+        TestQueryCache - Test the cached query functions, allCached and firstCached
+    '''
+
+    KEEP_DATA = False
+
+    def setup_method(self, testMethod):
+        '''
+            setup_method - Called before every method. Should set "self.model" to the model needed for the test.
+
+            @param testMethod - Instance method of test about to be called.
+        '''
+
+        class QueryCacheModel(IndexedRedisModel):
+
+            FIELDS = [ IRField('name'), IRField('value'), IRField('num', valueType=int) ]
+            INDEXED_FIELDS = ['name', 'value']
+
+            KEY_NAME = 'Test_QueryCacheModel'
+
+        self.model = QueryCacheModel
+
+        self.numFetches = 0
+        self._origGetPrimaryKeys = IndexedRedisQuery.getPrimaryKeys
+
+        # Count the queries which go to Redis
+        def _countingGetPrimaryKeys(query, *args, **kwargs):
+            self.numFetches += 1
+            return self._origGetPrimaryKeys(query, *args, **kwargs)
+
+        IndexedRedisQuery.getPrimaryKeys = _countingGetPrimaryKeys
+
+        # If KEEP_DATA is False (debug flag), then delete all objects before so prior test doesn't interfere
+        if self.KEEP_DATA is False:
+            self.model.deleter.destroyModel()
+
+    def teardown_method(self, testMethod):
+        '''
+            teardown_method - Called after every method.
+
+                If self.model is set, will delete all objects relating to that model. To retain objects for debugging, set TestQueryCache.KEEP_DATA to True.
+        '''
+        IndexedRedisQuery.getPrimaryKeys = self._origGetPrimaryKeys
+
+        if self.KEEP_DATA is False:
+            self.model.deleter.destroyModel()
+
+    def test_allCached(self):
+        QueryCacheModel = self.model
+
+        QueryCacheModel.saver.save( [ QueryCacheModel(name='one', value='a', num=1), QueryCacheModel(name='two', value='a', num=2), QueryCacheModel(name='three', value='b', num=3) ] )
+
+        objs = QueryCacheModel.objects.filter(value='a').allCached()
+        assert [ obj.name for obj in objs ] == ['one', 'two'] , 'Expected allCached to return matching objects, oldest first. Got: %s' %(repr([ obj.name for obj in objs ]), )
+        assert objs[0].num == 1 and objs[0]._id , 'Expected values and id to be converted on cached objects'
+        assert not objs[0].hasUnsavedChanges() , 'Expected cached objects to have no unsaved changes'
+        assert self.numFetches == 1 , 'Expected first allCached to query Redis'
+
+        objs[0].num = 55
+
+        objsAgain = QueryCacheModel.objects.filter(value='a').allCached()
+        assert self.numFetches == 1 , 'Expected repeated allCached to not query Redis'
+        assert objsAgain[0] is not objs[0] , 'Expected allCached to return new objects each call'
+        assert objsAgain[0].num == 1 , 'Expected changes to returned objects to not affect the cache. Got: %s' %(repr(objsAgain[0].num), )
+
+        objs = QueryCacheModel.objects.filter(value='b').allCached()
+        assert [ obj.name for obj in objs ] == ['three'] , 'Expected different filters to be cached separately. Got: %s' %(repr([ obj.name for obj in objs ]), )
+        assert self.numFetches == 2 , 'Expected a new filter to query Redis'
+
+        objs = QueryCacheModel.objects.filter(value__ne='b').allCached()
+        assert [ obj.name for obj in objs ] == ['one', 'two'] , 'Expected negative filters to be cached separately. Got: %s' %(repr([ obj.name for obj in objs ]), )
+        assert self.numFetches == 3 , 'Expected a new negative filter to query Redis'
+
+        # Saving invalidates
+        objsAgain[1].value = 'b'
+        objsAgain[1].save()
+
+        objs = QueryCacheModel.objects.filter(value='a').allCached()
+        assert [ obj.name for obj in objs ] == ['one'] , 'Expected save to invalidate cached results. Got: %s' %(repr([ obj.name for obj in objs ]), )
+        assert self.numFetches == 4 , 'Expected allCached after save to query Redis'
+
+        # Deleting invalidates
+        objs[0].delete()
+
+        objs = QueryCacheModel.objects.filter(value='a').allCached()
+        assert objs == [] , 'Expected delete to invalidate cached results. Got: %s' %(repr(objs), )
+
+        objs = QueryCacheModel.objects.allCached()
+        assert [ obj.name for obj in objs ] == ['two', 'three'] , 'Expected allCached with no filters to return all objects. Got: %s' %(repr([ obj.name for obj in objs ]), )
+
+    def test_firstCached(self):
+        QueryCacheModel = self.model
+
+        assert QueryCacheModel.objects.firstCached() is None , 'Expected firstCached to return None with no objects'
+
+        QueryCacheModel.saver.save( [ QueryCacheModel(name='one', value='a', num=1), QueryCacheModel(name='two', value='a', num=2) ] )
+
+        obj = QueryCacheModel.objects.filter(value='a').firstCached()
+        assert obj and obj.name == 'one' , 'Expected firstCached to return the oldest matching object. Got: %s' %(repr(obj), )
+
+        numFetches = self.numFetches
+
+        obj = QueryCacheModel.objects.filter(value='a').firstCached()
+        assert obj.name == 'one' , 'Expected repeated firstCached to return the same object'
+        assert self.numFetches == numFetches , 'Expected repeated firstCached to not query Redis'
+
+        QueryCacheModel.objects.filter(name='one').delete()
+
+        obj = QueryCacheModel.objects.filter(value='a').firstCached()
+        assert obj and obj.name == 'two' , 'Expected delete to invalidate firstCached. Got: %s' %(repr(obj), )
+
+        QueryCacheModel.deleter.destroyModel()
+
+        assert QueryCacheModel.objects.filter(value='a').firstCached() is None , 'Expected destroyModel to invalidate firstCached'
+
+    def test_queuedPipeline(self):
+        QueryCacheModel = self.model
+
+        myObj = QueryCacheModel(name='one', value='a', num=1)
+        myObj.save()
+
+        assert [ obj.num for obj in QueryCacheModel.objects.allCached() ] == [1] , 'Expected allCached to return the saved object'
+
+        # Writes queued on a pipeline only happen on execute, so nothing is cached until clearCached
+        pipeline = QueryCacheModel.saver._get_connection().pipeline()
+        myObj.num = 2
+        QueryCacheModel.saver.save(myObj, usePipeline=False, conn=pipeline)
+
+        assert [ obj.num for obj in QueryCacheModel.objects.allCached() ] == [1] , 'Expected queued save to not be written before execute'
+
+        pipeline.execute()
+
+        numFetches = self.numFetches
+        nums = [ obj.num for obj in QueryCacheModel.objects.allCached() ]
+        assert nums == [2] , 'Expected results fetched after the pipeline executed to not be stale. Got: %s' %(repr(nums), )
+        QueryCacheModel.objects.allCached()
+        assert self.numFetches == numFetches + 2 , 'Expected allCached to fetch each time while writes are queued on a pipeline'
+
+        QueryCacheModel.objects.clearCached()
+        QueryCacheModel.objects.allCached()
+        QueryCacheModel.objects.allCached()
+        assert self.numFetches == numFetches + 3 , 'Expected allCached to cache again after clearCached'
+
+        otherObj = QueryCacheModel(name='two', value='a', num=3)
+        otherObj.save()
+        assert len(QueryCacheModel.objects.allCached()) == 2 , 'Expected allCached to return both objects'
+
+        pipeline = QueryCacheModel.saver._get_connection().pipeline()
+        QueryCacheModel.deleter.deleteOne(otherObj, pipeline)
+        assert len(QueryCacheModel.objects.allCached()) == 2 , 'Expected queued delete to not be written before execute'
+        pipeline.execute()
+
+        names = [ obj.name for obj in QueryCacheModel.objects.allCached() ]
+        assert names == ['one'] , 'Expected results after executing a queued delete to not be stale. Got: %s' %(repr(names), )
+        QueryCacheModel.objects.clearCached()
+
+        pipeline = QueryCacheModel.saver._get_connection().pipeline()
+        QueryCacheModel.deleter.destroyModel(pipeline)
+        assert len(QueryCacheModel.objects.allCached()) == 1 , 'Expected queued destroyModel to not be written before execute'
+        pipeline.execute()
+
+        assert QueryCacheModel.objects.allCached() == [] , 'Expected results after executing a queued destroyModel to not be stale'
+        QueryCacheModel.objects.clearCached()
+
+        # Saves and deletes which run their own pipeline invalidate once it is executed
+        QueryCacheModel.saver.save( [ QueryCacheModel(name='three', value='a', num=4), QueryCacheModel(name='four', value='a', num=5) ] )
+        assert len(QueryCacheModel.objects.allCached()) == 2 , 'Expected save of multiple to invalidate'
+        QueryCacheModel.deleter.deleteMultiple(QueryCacheModel.objects.all())
+        assert QueryCacheModel.objects.allCached() == [] , 'Expected deleteMultiple to invalidate'
+
+        numFetches = self.numFetches
+        QueryCacheModel.objects.allCached()
+        assert self.numFetches == numFetches , 'Expected allCached to be cached when no writes are queued on a pipeline'
+
+    def test_cacheSize(self):
+        import IndexedRedis
+
+        QueryCacheModel = self.model
+
+        QueryCacheModel.saver.save( [ QueryCacheModel(name=str(i), value='a', num=i) for i in range(3) ] )
+
+        for i in range(IndexedRedis._QUERY_RESULTS_CACHE_SIZE + 10):
+            QueryCacheModel.objects.filter(name=str(i)).allCached()
+
+        assert len(IndexedRedis._queryResultsCache) <= IndexedRedis._QUERY_RESULTS_CACHE_SIZE , 'Expected the number of cached queries to be bounded'
+
+        # The most recently used are kept
+        numFetches = self.numFetches
+        QueryCacheModel.objects.filter(name=str(IndexedRedis._QUERY_RESULTS_CACHE_SIZE + 9)).allCached()
+        assert self.numFetches == numFetches , 'Expected the most recently used query to still be cached'
+
+        QueryCacheModel.objects.filter(name='0').allCached()
+        assert self.numFetches == numFetches + 1 , 'Expected the least recently used query to have been dropped'
+
+
+if __name__ == '__main__':
+    os.execvp('GoodTests.py', ['GoodTests.py', '-n1', sys.argv[0]] + sys.argv[1:])
+
+# vim: set ts=4 sw=4 expandtab
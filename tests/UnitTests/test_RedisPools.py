@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# TestRedisPools - GoodTests unit tests validating the managed connection pools
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+# vim: set ts=4 sw=4 expandtab
+
+
+import sys
+import os
+import threading
+import time
+
+import redis
+
+import IndexedRedis
+from IndexedRedis import IndexedRedisModel, getRedisPool
+from IndexedRedis.fields import IRField
+
+# vim: ts=4 sw=4 expandtab
+
+class TestRedisPools(object):
+    '''
+        TestRedisPools - Test the managed connection pools, and connecting to other Redis instances
+    '''
+
+    KEEP_DATA = False
+
+    # EXTERNAL_DB - A db number, on the same server as TestProperties, to use as the "external" Redis
+    EXTERNAL_DB = 1
+
+    def setup_method(self, testMethod):
+        '''
+            setup_method - Called before every method. Should set "self.model" to the model needed for the test.
+
+            @param testMethod - Instance method of test about to be called.
+        '''
+
+        class PoolModel(IndexedRedisModel):
+
+            FIELDS = [ IRField('name'), IRField('value') ]
+            INDEXED_FIELDS = ['name']
+
+            KEY_NAME = 'Test_PoolModel'
+
+        self.model = PoolModel
+        self.externalModel = PoolModel.connectAlt( { 'db' : self.EXTERNAL_DB } )
+
+        # If KEEP_DATA is False (debug flag), then delete all objects before so prior test doesn't interfere
+        if self.KEEP_DATA is False:
+            self.model.deleter.destroyModel()
+            self.externalModel.deleter.destroyModel()
+
+    def teardown_method(self, testMethod):
+        '''
+            teardown_method - Called after every method.
+
+                If self.model is set, will delete all objects relating to that model. To retain objects for debugging, set TestRedisPools.KEEP_DATA to True.
+        '''
+
+        if self.KEEP_DATA is False:
+            self.model.deleter.destroyModel()
+            self.externalModel.deleter.destroyModel()
+
+    def test_poolMaxSize(self):
+        pool = getRedisPool( { 'db' : self.EXTERNAL_DB } )
+
+        assert pool.max_connections == IndexedRedis.REDIS_DEFAULT_POOL_MAX_SIZE , 'Expected pool to be capped at REDIS_DEFAULT_POOL_MAX_SIZE. Got: %s' %(repr(pool.max_connections), )
+        assert isinstance(pool, redis.BlockingConnectionPool) , 'Expected the default capped pool to wait for a free connection. Got: %s' %(pool.__class__.__name__, )
+
+        # Using every connection, another user waits for one to be freed rather than failing
+        conns = [ pool.get_connection('PING') for i in range(pool.max_connections) ]
+        gotConns = []
+        waiter = threading.Thread(target=lambda : gotConns.append(pool.get_connection('PING')))
+        waiter.start()
+        time.sleep(.1)
+        assert not gotConns , 'Expected getting a connection with all in use to wait'
+
+        pool.release(conns.pop())
+        waiter.join(5)
+        assert len(gotConns) == 1 , 'Expected waiting for a connection to get the one released'
+
+        for conn in conns + gotConns:
+            pool.release(conn)
+
+        assert getRedisPool( { 'db' : self.EXTERNAL_DB } ) is pool , 'Expected same connection params to share a pool'
+
+        otherPool = getRedisPool( { 'db' : self.EXTERNAL_DB, 'max_connections' : 5 } )
+
+        assert otherPool.max_connections == 5 , 'Expected explicit max_connections to be used. Got: %s' %(repr(otherPool.max_connections), )
+
+    def test_saveToExternal(self):
+        PoolModel = self.model
+        ExternalModel = self.externalModel
+
+        myObj = PoolModel(name='one', value='hello')
+        assert myObj.save() , 'Failed to save object'
+
+        externalParams = { 'db' : self.EXTERNAL_DB }
+
+        myObj.saveToExternal(externalParams)
+        assert 'connection_pool' not in externalParams , 'Expected saveToExternal to not modify the given params dict'
+
+        myObj.saveToExternal(externalParams)
+
+        externalConn = redis.Redis(connection_pool=getRedisPool( { 'db' : self.EXTERNAL_DB } ))
+        myObj.saveToExternal(externalConn)
+
+        assert PoolModel.objects.count() == 1 , 'Expected saveToExternal to not add objects to the original Redis'
+
+        externalObjs = ExternalModel.objects.filter(name='one').all()
+        assert len(externalObjs) == 3 , 'Expected one object in the external Redis per saveToExternal call. Got: %d' %(len(externalObjs), )
+        assert sorted([ obj._id for obj in externalObjs ]) == [1, 2, 3] , 'Expected new primary keys in the external Redis. Got: %s' %(repr([ obj._id for obj in externalObjs ]), )
+
+        for externalObj in externalObjs:
+            assert externalObj.value == 'hello' , 'Expected values to be copied to the external Redis. Got: %s' %(repr(externalObj.value), )
+
+        gotException = False
+        try:
+            myObj.saveToExternal('notAConnection')
+        except ValueError:
+            gotException = True
+
+        assert gotException , 'Expected ValueError on invalid redisCon'
+
+
+if __name__ == '__main__':
+    os.execvp('GoodTests.py', ['GoodTests.py', '-n1', sys.argv[0]] + sys.argv[1:])
+
+# vim: set ts=4 sw=4 expandtab
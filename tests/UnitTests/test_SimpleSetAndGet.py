@@ -11,8 +11,8 @@ import TestProperties
 # vim: set ts=4 sw=4 expandtab
 
 import sys
-import subprocess
-from IndexedRedis import IndexedRedisModel, IRClassicField, IRField, irNull
+import os
+from IndexedRedis import IndexedRedisModel, IndexedRedisQuery, IRClassicField, IRField, InvalidModelException, irNull
 
 # vim: ts=4 sw=4 expandtab
 
@@ -24,6 +24,16 @@ class SimpleSetAndGetModel(IndexedRedisModel):
 
     KEY_NAME = 'Test_SimpleSetAndGet'
 
+class VersionedReloadModel(IndexedRedisModel):
+
+    FIELDS = [IRClassicField('a'), IRClassicField('b'), IRClassicField('c')]
+
+    INDEXED_FIELDS = ['a']
+
+    KEY_NAME = 'Test_SimpleSetAndGetVersionedReload'
+
+    VERSIONED_RELOAD = True
+
 class TestSimpleSetAndGet(object):
 
 
@@ -32,9 +42,11 @@ class TestSimpleSetAndGet(object):
 
     def setup_method(self, *args, **kwargs):
         SimpleSetAndGetModel.deleter.destroyModel()
+        VersionedReloadModel.deleter.destroyModel()
 
     def teardown_method(self, *args, **kwargs):
         SimpleSetAndGetModel.deleter.destroyModel()
+        VersionedReloadModel.deleter.destroyModel()
 
     def test_createAndFetch(self):
         myObj = SimpleSetAndGetModel(a='one', b='two', c='three')
@@ -189,9 +201,146 @@ class TestSimpleSetAndGet(object):
         objFetched = ModelDefaultNulls.objects.filter(b=irNull).first()
         assert not objFetched , 'Expected to not be able to fetch empty string by filtering irNull on index'
 
+    def test_saveMultiple(self):
+        existingObj = SimpleSetAndGetModel(a='one', b='two', c='three')
+        ids = existingObj.save()
+        assert ids and ids[0] , 'Failed to save new object.'
+
+        existingId = existingObj._id
+
+        existingObj.b = 'twoplus'
+
+        newObjs = [ SimpleSetAndGetModel(a='new', b=str(i), c='x') for i in range(3) ]
+
+        ids = SimpleSetAndGetModel.saver.save( [ newObjs[0], existingObj, newObjs[1], newObjs[2] ] )
+
+        assert ids[1] == existingId , 'Expected existing object to keep its id. Got: %s' %(repr(ids), )
+        assert [ids[0], ids[2], ids[3]] == [existingId + 1, existingId + 2, existingId + 3] , 'Expected new objects to be given the next ids, in order. Got: %s' %(repr(ids), )
+        assert [ obj._id for obj in newObjs ] == [ids[0], ids[2], ids[3]] , 'Expected ids to be set on the new objects'
+
+        assert SimpleSetAndGetModel.objects.count() == 4 , 'Expected 4 objects after saving. Got: %d' %(SimpleSetAndGetModel.objects.count(), )
+
+        fetchedObj = SimpleSetAndGetModel.objects.get(existingId)
+        assert fetchedObj.b == 'twoplus' , 'Expected existing object to be updated'
+
+        fetchedObjs = SimpleSetAndGetModel.objects.filter(a='new').all()
+        assert sorted([ obj.b for obj in fetchedObjs ]) == ['0', '1', '2'] , 'Expected new objects to be saved and indexed'
+
+        # A False in forceID means "do not force", which must still update (not re-insert) an existing object
+        existingObj.c = 'threeplus'
+        newObj = SimpleSetAndGetModel(a='forced', b='b', c='c')
+
+        ids = SimpleSetAndGetModel.saver.save( [ existingObj, newObj ], forceID=[False, 100] )
+
+        assert ids == [existingId, 100] , 'Expected forceID of False to keep existing id, and the forced id to be used. Got: %s' %(repr(ids), )
+        assert SimpleSetAndGetModel.objects.count() == 5 , 'Expected existing object to be updated, not inserted again. Got %d objects' %(SimpleSetAndGetModel.objects.count(), )
+        assert SimpleSetAndGetModel.objects.get(existingId).c == 'threeplus' , 'Expected existing object to be updated with forceID of False'
+
+    def test_reload(self):
+        origFetchOne = IndexedRedisQuery._fetchOne
+        fetchCalls = []
+        def _countingFetchOne(self, *args, **kwargs):
+            fetchCalls.append(args)
+            return origFetchOne(self, *args, **kwargs)
+
+        IndexedRedisQuery._fetchOne = _countingFetchOne
+        try:
+            myObj = SimpleSetAndGetModel(a='one', b='two', c='three')
+            myObj.save()
+
+            # Without VERSIONED_RELOAD, reload always fetches, and sees changes not made through IndexedRedis
+            conn = SimpleSetAndGetModel.objects._get_connection()
+            conn.hset(SimpleSetAndGetModel.objects._get_key_for_id(myObj._id), 'b', 'direct')
+
+            updatedFields = myObj.reload()
+            assert updatedFields == { 'b' : ('two', 'direct') } , 'Expected reload to pick up a change set directly in Redis. Got: %s' %(repr(updatedFields), )
+            assert len(fetchCalls) == 1 , 'Expected reload without VERSIONED_RELOAD to fetch the object. Got %d fetches' %(len(fetchCalls), )
+
+            fetchCalls[:] = []
+
+            myObj = VersionedReloadModel(a='one', b='two', c='three')
+            myObj.save()
+
+            otherObj = VersionedReloadModel.objects.get(myObj._id)
+            fetchCalls[:] = []
+
+            updatedFields = myObj.reload()
+            assert not updatedFields , 'Expected no updates reloading an unchanged object. Got: %s' %(repr(updatedFields), )
+            assert not fetchCalls , 'Expected reload of an unchanged object to not fetch the object'
+
+            otherObj.b = 'twoplus'
+            otherObj.save()
+
+            updatedFields = myObj.reload()
+            assert updatedFields == { 'b' : ('two', 'twoplus') } , 'Expected reload to pick up change saved from another instance. Got: %s' %(repr(updatedFields), )
+            assert myObj.b == 'twoplus' , 'Expected reload to apply the change'
+            assert not myObj.hasUnsavedChanges() , 'Expected no unsaved changes after reload'
+
+            assert not myObj.reload() , 'Expected no updates reloading again'
+            assert not fetchCalls , 'Expected reload to not fetch the object when it has no local changes'
+
+            myObj.c = 'local'
+            updatedFields = myObj.reload()
+            assert updatedFields == { 'c' : ('local', 'three') } , 'Expected reload to revert local changes. Got: %s' %(repr(updatedFields), )
+            assert myObj.c == 'three' , 'Expected local change to be reverted'
+            assert len(fetchCalls) == 1 , 'Expected reload with local changes to fetch the object. Got %d fetches' %(len(fetchCalls), )
+        finally:
+            IndexedRedisQuery._fetchOne = origFetchOne
+
+        otherObj.delete()
+
+        gotException = False
+        try:
+            myObj.reload()
+        except KeyError:
+            gotException = True
+
+        assert gotException , 'Expected KeyError reloading an object which was deleted'
+
+    def test_versionField(self):
+        conn = SimpleSetAndGetModel.objects._get_connection()
+
+        myObj = SimpleSetAndGetModel(a='one', b='two', c='three')
+        myObj.save()
+        myObj.b = 'twoplus'
+        myObj.save()
+
+        storedFields = [x.decode('utf-8') for x in conn.hkeys(SimpleSetAndGetModel.objects._get_key_for_id(myObj._id))]
+        assert '_ir_ver' not in storedFields , 'Expected no version field stored without VERSIONED_RELOAD. Got: %s' %(repr(storedFields), )
+
+        versionedObj = VersionedReloadModel(a='one', b='two', c='three')
+        versionedObj.save()
+
+        storedFields = [x.decode('utf-8') for x in conn.hkeys(VersionedReloadModel.objects._get_key_for_id(versionedObj._id))]
+        assert '_ir_ver' in storedFields , 'Expected version field stored with VERSIONED_RELOAD. Got: %s' %(repr(storedFields), )
+
+        class PlainVersionFieldModel(IndexedRedisModel):
+
+            FIELDS = [IRField('a'), IRField('_ir_ver')]
+
+            KEY_NAME = 'Test_SimpleSetAndGetPlainVersionField'
+
+        PlainVersionFieldModel.validateModel()
+
+        class VersionedVersionFieldModel(IndexedRedisModel):
+
+            FIELDS = [IRField('a'), IRField('_ir_ver')]
+
+            KEY_NAME = 'Test_SimpleSetAndGetVersionedVersionField'
+
+            VERSIONED_RELOAD = True
+
+        gotException = False
+        try:
+            VersionedVersionFieldModel.validateModel()
+        except InvalidModelException:
+            gotException = True
+
+        assert gotException , 'Expected a field named _ir_ver to be rejected with VERSIONED_RELOAD'
+
 
             
 if __name__ == '__main__':
-    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+    os.execvp('GoodTests.py', ['GoodTests.py', '-n1', sys.argv[0]] + sys.argv[1:])
 
 # vim: set ts=4 sw=4 expandtab